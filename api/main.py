@@ -1,15 +1,41 @@
 import time
-from fastapi import FastAPI, Request
-from api.routes import swarm, eval, todo, chat
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Request
+from api.routes import swarm, eval, todo, chat, usage, metrics
 from core.config import settings
+from core.llm_pool import client_registry
+from core.metrics import metrics_registry
+from core.usage import set_usage_route, usage_ledger
 from utils.logger import get_logger, set_correlation_id
 
 logger = get_logger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Release pooled provider connections when the server shuts down."""
+    yield
+    await client_registry.aclose()
+    usage_ledger.flush()
+
+def _route_template(request: Request) -> str:
+    """
+    Path template of the route serving `request` (e.g. /swarm/status/{job_id}).
+
+    Used for usage and metric labels so ids in the URL do not create a new
+    bucket per request. Only known once routing has run.
+    """
+    return getattr(request.scope.get("route"), "path", "unmatched")
+
+async def _scope_usage_route(request: Request) -> None:
+    """App-wide dependency: attribute usage to the matched route template."""
+    set_usage_route(f"{request.method} {_route_template(request)}")
+
 app = FastAPI(
     title=settings.app_name,
     description="Backend API for AgentForge AI Platform",
-    version=settings.version
+    version=settings.version,
+    lifespan=lifespan,
+    dependencies=[Depends(_scope_usage_route)]
 )
 
 @app.middleware("http")
@@ -20,6 +46,8 @@ async def observability_middleware(request: Request, call_next):
     # 1. Track Correlation ID
     incoming_cid = request.headers.get("X-Correlation-ID")
     cid = set_correlation_id(incoming_cid)
+    # Refined to the route template by _scope_usage_route once the request is routed
+    set_usage_route(f"{request.method} unmatched")
     
     # 2. Track Time
     start_time = time.time()
@@ -28,13 +56,30 @@ async def observability_middleware(request: Request, call_next):
     response = await call_next(request)
     
     # 4. Finalize Metrics
+    # X-Process-Time covers time-to-headers; streamed bodies are timed to completion below
     duration = time.time() - start_time
     response.headers["X-Process-Time"] = f"{duration:.4f}"
     response.headers["X-Correlation-ID"] = cid
     
     logger.info(f"DONE | {request.method} {request.url.path} | Status: {response.status_code} | Duration: {duration:.4f}s")
+    if hasattr(response, "body_iterator"):
+        response.body_iterator = _timed_body(response.body_iterator, request, start_time)
     return response
 
+async def _timed_body(body_iterator, request: Request, start_time: float):
+    """Pass the body through, recording total time until the last byte is sent."""
+    try:
+        async for chunk in body_iterator:
+            yield chunk
+    finally:
+        total = time.time() - start_time
+        metrics_registry.observe(
+            "http_response_complete_seconds", total,
+            method=request.method, path=_route_template(request)
+        )
+        if request.url.path.endswith("/stream"):
+            logger.info(f"STREAM DONE | {request.method} {request.url.path} | Total: {total:.4f}s")
+
 @app.get("/")
 async def root():
     return {
@@ -48,6 +93,8 @@ app.include_router(swarm.router)
 app.include_router(eval.router)
 app.include_router(todo.router)
 app.include_router(chat.router)
+app.include_router(usage.router)
+app.include_router(metrics.router)
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,9 +1,9 @@
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
-from core.llm_client import LLMClient
+from core.llm_router import build_llm_client
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -13,6 +13,8 @@ class ChatRequest(BaseModel):
     message: str
     provider: str = "gemini"
     system_prompt: Optional[str] = None
+    fallback_providers: Optional[List[str]] = None
+    hedge: Optional[bool] = None
 
 @router.post("/stream")
 async def chat_stream(request: ChatRequest):
@@ -23,7 +25,11 @@ async def chat_stream(request: ChatRequest):
     logger.info(f"Received Chat Stream Request: {request.message[:50]}...")
     
     try:
-        client = LLMClient(provider=request.provider)
+        client = build_llm_client(
+            provider=request.provider,
+            fallback_providers=request.fallback_providers,
+            hedge=request.hedge
+        )
         
         async def event_generator():
             try:
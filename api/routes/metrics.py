@@ -0,0 +1,23 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+
+from core.metrics import metrics_registry
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+@router.get("")
+async def get_metrics(prefix: Optional[str] = None):
+    """
+    Latency histograms (TTFT, inter-chunk gaps, stream duration, tokens/sec).
+    """
+    return {"histograms": metrics_registry.snapshot(prefix=prefix)}
+
+@router.get("/prometheus", response_class=PlainTextResponse)
+async def get_metrics_prometheus():
+    """
+    Same histograms in Prometheus text exposition format.
+    """
+    return metrics_registry.render_prometheus()
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, HTTPException
+from typing import Optional
+
+from core.usage import usage_ledger
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+router = APIRouter(prefix="/usage", tags=["usage"])
+
+@router.get("/summary")
+async def usage_summary(route: Optional[str] = None, model: Optional[str] = None):
+    """
+    Token usage and estimated spend aggregated per route and model.
+    """
+    rows = usage_ledger.summary(route=route, model=model)
+    return {
+        "total_cost": round(sum(row["cost"] for row in rows), 6),
+        "total_tokens": sum(row["input_tokens"] + row["output_tokens"] for row in rows),
+        "breakdown": rows
+    }
+
+@router.get("/correlation/{correlation_id}")
+async def usage_for_request(correlation_id: str):
+    """
+    Token usage attributed to a single request (X-Correlation-ID).
+    """
+    totals = usage_ledger.for_correlation_id(correlation_id)
+    if totals is None:
+        raise HTTPException(status_code=404, detail="No usage recorded for this correlation id")
+    return {"correlation_id": correlation_id, **totals}
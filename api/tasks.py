@@ -4,6 +4,7 @@ Asynchronous Celery tasks for AgentForge.
 import asyncio
 from core.celery_app import celery_app
 from core.agents import create_swarm_graph
+from core.usage import set_usage_route
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -17,6 +18,7 @@ def run_swarm_task(task_topic: str, provider: str = "gemini"):
     logger.info(f"STARTING ASYNC TASK | Swarm: {task_topic}")
     
     async def _run():
+        set_usage_route("celery:run_swarm_task")
         graph = create_swarm_graph(provider=provider)
         result = await graph.ainvoke({"topic": task_topic})
         return result
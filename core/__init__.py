@@ -1,4 +1,20 @@
 """Core package initialization."""
-from core.llm_client import LLMClient, LLMProvider, LLMResponse, get_available_providers
+from core.llm_client import (
+    BatchItem,
+    BatchResult,
+    LLMClient,
+    LLMProvider,
+    LLMResponse,
+    Message,
+    get_available_providers,
+)
 
-__all__ = ["LLMClient", "LLMProvider", "LLMResponse", "get_available_providers"]
+__all__ = [
+    "BatchItem",
+    "BatchResult",
+    "LLMClient",
+    "LLMProvider",
+    "LLMResponse",
+    "Message",
+    "get_available_providers",
+]
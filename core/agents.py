@@ -20,6 +20,7 @@ import requests
 from bs4 import BeautifulSoup
 
 from core.llm_client import LLMClient
+from core.llm_router import build_llm_client
 from core.config import settings
 from core.tools import list_files, read_file
 from utils.logger import get_logger
@@ -148,7 +149,8 @@ def create_swarm_graph(provider: str = None):
     Creates a Parallel Swarm Graph:
     Planner -> [Market, Tech, Risk] (Parallel) -> Aggregator
     """
-    client = LLMClient(provider=provider)
+    # Fails over across settings.llm_fallback_providers when configured
+    client = build_llm_client(provider=provider)
     llm = client.get_langchain_model()
 
     def planner_node(state: SwarmState):
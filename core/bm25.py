@@ -0,0 +1,196 @@
+"""
+BM25 - Persisted inverted index for keyword and hybrid retrieval.
+
+Demonstrates:
+- Okapi BM25 scoring over an inverted index (postings per term)
+- Incremental add/remove with SQLite persistence next to the vector store
+- Reciprocal Rank Fusion (RRF) for combining keyword and semantic rankings
+
+Queries only touch the postings of their own terms, so cost grows with
+the number of matching documents rather than with the corpus size.
+"""
+import heapq
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have in is it its of on or that the this to was were "
+    "will with what which who how".split()
+)
+
+# Standard RRF damping constant (Cormack et al., 2009)
+RRF_K = 60
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens without stopwords."""
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = RRF_K) -> List[Tuple[str, float]]:
+    """
+    Fuse several ranked id lists.
+
+    Returns:
+        (id, score) pairs, best first; score is sum(1 / (k + rank)).
+    """
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+
+
+class BM25Index:
+    """
+    Thread-safe BM25 inverted index.
+
+    The whole index lives in memory for querying; every change is also
+    written to SQLite so it survives restarts without a rebuild.
+
+    Args:
+        path: SQLite file (None keeps the index in memory only)
+        k1: Term-frequency saturation
+        b: Document-length normalisation
+    """
+
+    def __init__(self, path: Optional[str] = None, k1: float = 1.5, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        # Forward map (doc -> its distinct terms) so removal touches only that doc's postings
+        self._doc_terms: Dict[str, List[str]] = defaultdict(list)
+        self._doc_len: Dict[str, int] = {}
+        self._total_len = 0
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS docs (doc_id TEXT PRIMARY KEY, length INTEGER NOT NULL)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS postings (term TEXT NOT NULL, doc_id TEXT NOT NULL, tf INTEGER NOT NULL, "
+                "PRIMARY KEY (term, doc_id))"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id)")
+            self._db.commit()
+            self._load()
+
+    def reload(self) -> None:
+        """Re-read the SQLite file, picking up writes made through other instances."""
+        with self._lock:
+            if self._db is None:
+                return
+            self._postings.clear()
+            self._doc_terms.clear()
+            self._doc_len.clear()
+            self._total_len = 0
+            self._load()
+
+    def _load(self) -> None:
+        for doc_id, length in self._db.execute("SELECT doc_id, length FROM docs"):
+            self._doc_len[doc_id] = length
+            self._total_len += length
+        for term, doc_id, tf in self._db.execute("SELECT term, doc_id, tf FROM postings"):
+            self._postings[term][doc_id] = tf
+            self._doc_terms[doc_id].append(term)
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_len
+
+    def add(self, ids: Sequence[str], texts: Sequence[str]) -> None:
+        """Index documents (re-indexing any id that already exists)."""
+        with self._lock:
+            self._remove_locked([i for i in ids if i in self._doc_len])
+            doc_rows, posting_rows = [], []
+            for doc_id, text in zip(ids, texts):
+                terms = tokenize(text)
+                self._doc_len[doc_id] = len(terms)
+                self._total_len += len(terms)
+                doc_rows.append((doc_id, len(terms)))
+                counts = Counter(terms)
+                self._doc_terms[doc_id] = list(counts)
+                for term, tf in counts.items():
+                    self._postings[term][doc_id] = tf
+                    posting_rows.append((term, doc_id, tf))
+            if self._db is not None:
+                self._db.executemany("INSERT OR REPLACE INTO docs VALUES (?, ?)", doc_rows)
+                self._db.executemany("INSERT OR REPLACE INTO postings VALUES (?, ?, ?)", posting_rows)
+                self._db.commit()
+
+    def remove(self, ids: Iterable[str]) -> None:
+        with self._lock:
+            self._remove_locked([i for i in ids if i in self._doc_len])
+
+    def _remove_locked(self, ids: List[str]) -> None:
+        if not ids:
+            return
+        for doc_id in set(ids):
+            self._total_len -= self._doc_len.pop(doc_id)
+            for term in self._doc_terms.pop(doc_id, ()):
+                postings = self._postings[term]
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+        if self._db is not None:
+            self._db.executemany("DELETE FROM docs WHERE doc_id = ?", [(i,) for i in ids])
+            self._db.executemany("DELETE FROM postings WHERE doc_id = ?", [(i,) for i in ids])
+            self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._postings.clear()
+            self._doc_terms.clear()
+            self._doc_len.clear()
+            self._total_len = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM docs")
+                self._db.execute("DELETE FROM postings")
+                self._db.commit()
+
+    def scores(self, query: str) -> Dict[str, float]:
+        """BM25 score of every document matching at least one query term."""
+        with self._lock:
+            n = len(self._doc_len)
+            if not n:
+                return {}
+            avg_len = self._total_len / n or 1.0
+            scores: Dict[str, float] = defaultdict(float)
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_len[doc_id] / avg_len)
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+            return scores
+
+    def search(self, query: str, k: Optional[int] = None) -> List[Tuple[str, float]]:
+        """(doc_id, score) pairs, best first (all matches when k is None)."""
+        scores = self.scores(query)
+        if k is None:
+            return sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+        return heapq.nlargest(k, scores.items(), key=lambda kv: kv[1])
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Optional
+from typing import List, Optional
 
 class Settings(BaseSettings):
     """
@@ -15,6 +15,93 @@ class Settings(BaseSettings):
     gemini_model: str = "gemini-1.5-flash"
     claude_model: str = "claude-3-5-sonnet-20241022"
     
+    # Provider Connection Pooling
+    llm_max_connections: int = 20
+    llm_max_keepalive_connections: int = 10
+    llm_keepalive_expiry: float = 30.0
+    llm_request_timeout: float = 60.0
+    
+    # Response Cache (None disables; "memory" or "redis")
+    llm_cache_backend: Optional[str] = None
+    llm_cache_ttl: int = 3600
+    llm_cache_max_entries: int = 1024
+    
+    # Request Coalescing (identical in-flight temperature-0 calls share one upstream call;
+    # sampled requests and streams only coalesce when called with coalesce=True)
+    llm_coalesce_requests: bool = True
+    
+    # Rate Limiting & Retries (per provider+model; 0 disables a limit)
+    llm_requests_per_minute: int = 0
+    llm_tokens_per_minute: int = 0
+    llm_max_retries: int = 3
+    llm_retry_base_delay: float = 1.0
+    llm_retry_max_delay: float = 30.0
+    
+    # Provider Routing (failover order after the requested provider)
+    llm_fallback_providers: List[str] = []
+    llm_hedge_requests: bool = False
+    llm_hedge_delay: float = 2.0
+    llm_hedge_min_samples: int = 20
+    
+    # Local Stub Provider (deterministic offline backend for benchmarks)
+    enable_local_stub: bool = False
+    stub_model: str = "local-stub-1"
+    stub_latency_ms: float = 200.0
+    stub_latency_distribution: str = "lognormal"  # "fixed", "uniform" or "lognormal"
+    stub_latency_jitter: float = 0.5
+    stub_tokens_per_second: float = 80.0
+    stub_response_tokens: int = 64
+    stub_error_rate: float = 0.0
+    stub_seed: int = 42
+    
+    # Embeddings ("google" or "local" for the offline feature-hashing provider)
+    default_embedding_provider: str = "google"
+    local_embedding_dim: int = 384
+    
+    # Embedding Cache (content-addressed; empty path keeps it in memory only)
+    embedding_cache_enabled: bool = True
+    embedding_cache_path: Optional[str] = "./.embedding_cache/embeddings.sqlite3"
+    embedding_cache_max_entries: int = 10000
+    
+    # Embedding Pipeline (batch limits per provider request; 0 chars = unlimited)
+    embedding_batch_size: int = 100
+    embedding_max_batch_chars: int = 0
+    embedding_max_workers: int = 4
+    
+    # Vector Store Backend ("chroma", "numpy" exact, or "ivf" approximate)
+    vector_backend: str = "chroma"
+    vector_ivf_lists: int = 0  # 0 = sqrt(collection size)
+    vector_ivf_probe: int = 8
+    vector_pq_subvectors: int = 0  # 0 disables product quantization
+    vector_ivf_background_training: bool = True  # False trains inline on the write path
+    
+    # Search Result Cache (per VectorStore; cleared whenever the collection changes)
+    search_cache_max_entries: int = 1024  # 0 disables
+    
+    # Diversity ("mmr" search mode): relevance weight, candidate pool multiple, duplicate cutoff
+    mmr_lambda: float = 0.5
+    mmr_fetch_factor: int = 4
+    dedupe_threshold: float = 0.8  # word-shingle Jaccard/containment
+    
+    # Metadata Indexes (filters matching at most prefilter_max_candidates rows are searched exactly)
+    metadata_index_keys: List[str] = ["source", "page", "tenant"]
+    prefilter_max_candidates: int = 2000
+    
+    # Store Registry (shared VectorStores; idle ones release their files and memory)
+    store_idle_seconds: float = 900.0  # 0 = never
+    store_max_open: int = 16  # 0 = unlimited
+    
+    # Document Ingestion (chunks per embed/upsert batch; batches buffered between stages)
+    ingest_chunk_size: int = 1000
+    ingest_chunk_overlap: int = 100
+    ingest_batch_size: int = 100
+    ingest_queue_size: int = 4
+    ingest_parse_workers: int = 0  # PDF parsing processes (0 = CPU count, 1 = in-process)
+    ingest_pages_per_task: int = 8
+    
+    # Usage Metering
+    usage_flush_interval: float = 60.0
+    
     # Infrastructure
     backend_url: str = "http://localhost:8000"
     redis_url: str = "redis://localhost:6379/0"
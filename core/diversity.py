@@ -0,0 +1,102 @@
+"""
+Diversity - Maximal Marginal Relevance and near-duplicate suppression.
+
+Demonstrates:
+- MMR reranking (Carbonell & Goldstein, 1998) vectorized with NumPy
+- Word-shingle Jaccard similarity for near-duplicate detection
+
+Overlapping chunks and re-uploaded documents make plain top-k retrieval
+return the same passage several times. Collapsing duplicates and then
+trading relevance against redundancy yields more distinct evidence for
+the same context budget.
+"""
+import re
+import zlib
+from typing import FrozenSet, List, Sequence
+
+import numpy as np
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def shingles(text: str, size: int = 3) -> FrozenSet[int]:
+    """Hashed word `size`-grams of `text` (short texts yield one shingle)."""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) <= size:
+        return frozenset([zlib.crc32(" ".join(words).encode("utf-8"))])
+    return frozenset(
+        zlib.crc32(" ".join(words[i:i + size]).encode("utf-8")) for i in range(len(words) - size + 1)
+    )
+
+
+def jaccard(a: FrozenSet[int], b: FrozenSet[int]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def collapse_near_duplicates(texts: Sequence[str], threshold: float = 0.8, size: int = 3) -> List[int]:
+    """
+    Indices of `texts` to keep, in order.
+
+    A text is dropped when its shingle Jaccard similarity to an already
+    kept (i.e. better-ranked) text reaches `threshold`. Overlap is measured
+    against the smaller set too, so a chunk contained in another counts
+    as a duplicate.
+    """
+    kept: List[int] = []
+    kept_shingles: List[FrozenSet[int]] = []
+    for i, text in enumerate(texts):
+        current = shingles(text, size)
+        duplicate = False
+        for other in kept_shingles:
+            overlap = len(current & other)
+            containment = overlap / min(len(current), len(other)) if current and other else 0.0
+            if jaccard(current, other) >= threshold or containment >= threshold:
+                duplicate = True
+                break
+        if not duplicate:
+            kept.append(i)
+            kept_shingles.append(current)
+    return kept
+
+
+def mmr(query: np.ndarray, candidates: np.ndarray, k: int, lambda_mult: float = 0.5) -> List[int]:
+    """
+    Select `k` candidate rows by Maximal Marginal Relevance.
+
+    Each step picks argmax(lambda * sim(query, c) - (1 - lambda) * max sim(c, selected)).
+    The candidate similarity matrix is computed once, and the running
+    "max similarity to the selection" is updated with one vector op per pick.
+
+    Args:
+        query: (dim,) query embedding
+        candidates: (n, dim) candidate embeddings
+        k: Number of rows to select
+        lambda_mult: 1.0 = pure relevance, 0.0 = pure diversity
+
+    Returns:
+        Selected row indices, in selection order
+    """
+    n = len(candidates)
+    if not n or k <= 0:
+        return []
+    matrix = np.asarray(candidates, dtype=np.float32)
+    matrix = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    query = np.asarray(query, dtype=np.float32)
+    query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+    relevance = matrix @ query
+    pairwise = matrix @ matrix.T
+    redundancy = np.full(n, -np.inf, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    selected: List[int] = []
+    for _ in range(min(k, n)):
+        penalty = np.where(np.isfinite(redundancy), redundancy, 0.0)
+        scores = lambda_mult * relevance - (1.0 - lambda_mult) * penalty
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, pairwise[best])
+    return selected
@@ -0,0 +1,159 @@
+"""
+Embedding Cache - Content-addressed vector cache for EmbeddingModel.
+
+Demonstrates:
+- Content hashing (sha256 of the text) as a stable cache key
+- Two tiers: in-memory LRU in front of a persistent SQLite store
+- Compact float32 BLOB storage, scoped by provider/model/task
+
+The scope keeps vectors from different models (or query vs. document
+embeddings, which some providers compute differently) from ever mixing.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.config import settings
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def content_hash(text: str) -> str:
+    """Stable key for a piece of text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class EmbeddingCacheStats:
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / total if total else 0.0
+
+
+class EmbeddingCache:
+    """
+    Thread-safe two-tier embedding cache.
+
+    Args:
+        path: SQLite file for the persistent tier (None keeps it memory-only)
+        max_entries: Capacity of the in-memory LRU tier
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 10_000):
+        self.path = path
+        self.max_entries = max_entries
+        self.stats = EmbeddingCacheStats()
+        self._memory: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "scope TEXT NOT NULL, hash TEXT NOT NULL, dim INTEGER NOT NULL, vector BLOB NOT NULL, "
+                "PRIMARY KEY (scope, hash))"
+            )
+            self._db.commit()
+
+    def _remember(self, key: Tuple[str, str], vector: np.ndarray) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, scope: str, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Cached float32 vectors for `texts` (None where missing)."""
+        hashes = [content_hash(t) for t in texts]
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for h in hashes:
+                vector = self._memory.get((scope, h))
+                if vector is not None:
+                    self._memory.move_to_end((scope, h))
+                    found[h] = vector
+                    self.stats.memory_hits += 1
+
+            missing = [h for h in dict.fromkeys(hashes) if h not in found]
+            if missing and self._db is not None:
+                # SQLite caps bound parameters, so look up in chunks
+                for start in range(0, len(missing), 500):
+                    chunk = missing[start:start + 500]
+                    rows = self._db.execute(
+                        f"SELECT hash, vector FROM embeddings WHERE scope = ? AND hash IN ({','.join('?' * len(chunk))})",
+                        [scope, *chunk],
+                    ).fetchall()
+                    for h, blob in rows:
+                        vector = np.frombuffer(blob, dtype=np.float32)
+                        found[h] = vector
+                        self._remember((scope, h), vector)
+                        self.stats.disk_hits += 1
+
+            self.stats.misses += sum(1 for h in hashes if h not in found)
+        return [found.get(h) for h in hashes]
+
+    def set_many(self, scope: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        """Store vectors for `texts` in both tiers."""
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                array = np.asarray(vector, dtype=np.float32)
+                h = content_hash(text)
+                self._remember((scope, h), array)
+                rows.append((scope, h, array.shape[0], array.tobytes()))
+            if rows and self._db is not None:
+                self._db.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+                self._db.commit()
+
+    def count(self, scope: Optional[str] = None) -> int:
+        """Entries in the persistent tier (or the memory tier when memory-only)."""
+        with self._lock:
+            if self._db is None:
+                return sum(1 for s, _ in self._memory if scope is None or s == scope)
+            if scope is None:
+                return self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            return self._db.execute("SELECT COUNT(*) FROM embeddings WHERE scope = ?", (scope,)).fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM embeddings")
+                self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_default_cache: Optional[EmbeddingCache] = None
+_default_lock = threading.Lock()
+
+
+def get_default_embedding_cache() -> Optional[EmbeddingCache]:
+    """Process-wide cache configured by settings (None when disabled)."""
+    global _default_cache
+    if not settings.embedding_cache_enabled:
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = EmbeddingCache(
+                path=settings.embedding_cache_path or None,
+                max_entries=settings.embedding_cache_max_entries,
+            )
+        return _default_cache
@@ -0,0 +1,157 @@
+"""
+Embedding Pipeline - Batched, concurrent embedding of large corpora.
+
+Demonstrates:
+- Splitting inputs into provider-sized batches (count and character limits)
+- Bounded concurrency with a thread pool or an asyncio semaphore
+- Per-batch retries with backoff, then bisection to isolate bad inputs
+  (input/size errors only; transient and auth errors propagate)
+- Order-preserving reassembly into one contiguous float32 matrix
+
+`EmbeddingModel.embed_documents` routes through this, so ingesting
+thousands of chunks scales with `max_workers` instead of running one
+provider call after another.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.config import settings
+from core.rate_limit import RetryPolicy, acall_with_retry, call_with_retry, is_input_error
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+EmbedFn = Callable[[List[str]], List[List[float]]]
+AsyncEmbedFn = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+
+def split_batches(
+    texts: Sequence[str],
+    batch_size: int,
+    max_chars: int = 0
+) -> List[Tuple[int, List[str]]]:
+    """
+    Split `texts` into (offset, batch) pairs.
+
+    A batch closes when it reaches `batch_size` items or would exceed
+    `max_chars` characters (0 disables the character limit).
+    """
+    batches: List[Tuple[int, List[str]]] = []
+    start, current, chars = 0, [], 0
+    for i, text in enumerate(texts):
+        too_long = max_chars and current and chars + len(text) > max_chars
+        if len(current) >= batch_size or too_long:
+            batches.append((start, current))
+            start, current, chars = i, [], 0
+        current.append(text)
+        chars += len(text)
+    if current:
+        batches.append((start, current))
+    return batches
+
+
+class EmbeddingPipeline:
+    """
+    Embeds texts in concurrent batches.
+
+    Args:
+        embed_fn: Synchronous provider call for one batch
+        aembed_fn: Native async provider call (falls back to embed_fn in a thread)
+        batch_size: Maximum texts per provider request
+        max_chars: Maximum characters per provider request (0 = unlimited)
+        max_workers: Maximum batches in flight
+        retry_policy: Backoff for transient batch failures
+    """
+
+    def __init__(
+        self,
+        embed_fn: EmbedFn,
+        aembed_fn: Optional[AsyncEmbedFn] = None,
+        batch_size: Optional[int] = None,
+        max_chars: Optional[int] = None,
+        max_workers: Optional[int] = None,
+        retry_policy: Optional[RetryPolicy] = None
+    ):
+        self.embed_fn = embed_fn
+        self.aembed_fn = aembed_fn
+        self.batch_size = batch_size or settings.embedding_batch_size
+        self.max_chars = max_chars if max_chars is not None else settings.embedding_max_batch_chars
+        self.max_workers = max_workers or settings.embedding_max_workers
+        self.retry_policy = retry_policy or RetryPolicy()
+
+    def _embed_batch(self, batch: List[str]) -> np.ndarray:
+        try:
+            vectors = call_with_retry(lambda: self.embed_fn(batch), self.retry_policy, "embedding batch")
+        except Exception as e:
+            # Halving cannot fix an outage or a bad key: leave those to the caller
+            if len(batch) == 1 or not is_input_error(e):
+                raise
+            # Retry the halves individually so one bad input does not sink the batch
+            logger.warning(f"Embedding batch of {len(batch)} failed ({e}); splitting")
+            mid = len(batch) // 2
+            return np.vstack([self._embed_batch(batch[:mid]), self._embed_batch(batch[mid:])])
+        return self._check(batch, vectors)
+
+    async def _aembed_batch(self, batch: List[str]) -> np.ndarray:
+        async def attempt() -> List[List[float]]:
+            if self.aembed_fn is not None:
+                return await self.aembed_fn(batch)
+            return await asyncio.to_thread(self.embed_fn, batch)
+
+        try:
+            vectors = await acall_with_retry(attempt, self.retry_policy, "embedding batch")
+        except Exception as e:
+            if len(batch) == 1 or not is_input_error(e):
+                raise
+            logger.warning(f"Embedding batch of {len(batch)} failed ({e}); splitting")
+            mid = len(batch) // 2
+            return np.vstack([await self._aembed_batch(batch[:mid]), await self._aembed_batch(batch[mid:])])
+        return self._check(batch, vectors)
+
+    @staticmethod
+    def _check(batch: List[str], vectors: List[List[float]]) -> np.ndarray:
+        if len(vectors) != len(batch):
+            raise RuntimeError(f"Provider returned {len(vectors)} embeddings for {len(batch)} texts")
+        # Convert per batch so the nested-list form never exists for the whole corpus
+        return np.asarray(vectors, dtype=np.float32)
+
+    def run(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed `texts` using a bounded thread pool; rows keep input order."""
+        batches = split_batches(texts, self.batch_size, self.max_chars)
+        if not batches:
+            return np.empty((0, 0), dtype=np.float32)
+        start = time.perf_counter()
+        if len(batches) == 1:
+            results = [self._embed_batch(batches[0][1])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as pool:
+                results = list(pool.map(self._embed_batch, [batch for _, batch in batches]))
+        self._log(len(texts), len(batches), start)
+        return np.vstack(results)
+
+    async def arun(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed `texts` with at most `max_workers` batches in flight."""
+        batches = split_batches(texts, self.batch_size, self.max_chars)
+        if not batches:
+            return np.empty((0, 0), dtype=np.float32)
+        start = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def run_one(batch: List[str]) -> np.ndarray:
+            async with semaphore:
+                return await self._aembed_batch(batch)
+
+        results = await asyncio.gather(*(run_one(batch) for _, batch in batches))
+        self._log(len(texts), len(batches), start)
+        return np.vstack(results)
+
+    def _log(self, count: int, batches: int, start: float) -> None:
+        if batches > 1:
+            logger.info(
+                f"Embedded {count} texts in {batches} batches "
+                f"({time.perf_counter() - start:.2f}s, {self.max_workers} workers)"
+            )
@@ -4,20 +4,34 @@ Embeddings Interface - Support for Local and API-based Embeddings.
 Demonstrates:
 - Vector Database fundamentals
 - Hybrid embedding strategies (Cost vs. Performance)
+- Content-addressed caching so identical text is only embedded once
+- Batched, concurrent document embedding (see core/embedding_pipeline.py)
+- Contiguous float32 / quantized matrices (see core/quantization.py)
+- Async methods that never block the event loop
 """
+import asyncio
 import os
+import threading
 from enum import Enum
-from typing import List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
 
 from core.config import settings
+from core.embedding_cache import EmbeddingCache, get_default_embedding_cache
+from core.embedding_pipeline import EmbeddingPipeline
+from core.quantization import QuantizedEmbeddings, as_matrix
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Task type Google applies to embed_query; batched queries must request it explicitly
+QUERY_TASK_TYPE = "RETRIEVAL_QUERY"
+
 
 class EmbeddingProvider(Enum):
     """Supported embedding providers."""
-    # LOCAL = "local"  # Disabled due to Python 3.13 torch incompatibility
+    LOCAL = "local"  # Offline feature hashing (NumPy only, no torch)
     GOOGLE = "google"  # Google Generative AI
 
 
@@ -25,21 +39,38 @@ class EmbeddingModel:
     """
     Unified interface for embedding generation.
     
-    Defaults to Google embeddings (API) as local support is currently limited.
+    Defaults to Google embeddings (API). `provider="local"` selects an
+    offline hashing embedder for development, tests and low-stakes data.
     """
     
-    def __init__(self, provider: str = "google", model_name: Optional[str] = None):
+    def __init__(
+        self,
+        provider: Optional[str] = None,
+        model_name: Optional[str] = None,
+        cache: Optional[EmbeddingCache] = None
+    ):
         """
         Initialize the embedding model.
         
         Args:
-            provider: 'google' (default)
+            provider: 'google' or 'local'. Defaults to settings.
             model_name: Specific model string
+            cache: Embedding cache checked before any API call. Defaults to
+                the process-wide cache (settings.embedding_cache_*); local
+                embeddings are cheaper to recompute, so they skip it.
         """
-        self.provider = EmbeddingProvider(provider)
+        self.provider = EmbeddingProvider(provider or settings.default_embedding_provider)
         self.model_name = model_name
+        if cache is not None or self.provider == EmbeddingProvider.LOCAL:
+            self.cache = cache
+        else:
+            self.cache = get_default_embedding_cache()
         self._client = None
         self._init_client()
+        self.pipeline = EmbeddingPipeline(
+            lambda batch: self._client.embed_documents(batch),
+            aembed_fn=lambda batch: self._client.aembed_documents(batch)
+        )
 
     def _init_client(self) -> None:
         """Initialize the specific embedding client."""
@@ -56,8 +87,10 @@ class EmbeddingModel:
                     google_api_key=api_key
                 )
                 logger.info(f"Initialized Google Embeddings: {model}")
-            else:
-                 logger.warning("Local embeddings disabled. Please use 'google'.")
+            elif self.provider == EmbeddingProvider.LOCAL:
+                from core.local_embeddings import HashingEmbedder
+                self._client = HashingEmbedder(dim=settings.local_embedding_dim)
+                logger.info(f"Initialized local hashing embeddings ({settings.local_embedding_dim} dims)")
                 
         except Exception as e:
             logger.error(f"Failed to initialize embeddings: {e}")
@@ -73,30 +106,210 @@ class EmbeddingModel:
         Returns:
             List of vector embeddings
         """
+        return self.embed_documents_array(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embed a single query string.
+        
+        Args:
+            text: Query string
+            
+        Returns:
+            Vector embedding
+        """
+        return self.embed_query_array(text).tolist()
+
+    def embed_documents_array(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed a list of documents into a contiguous (n, dim) float32 matrix.
+        
+        Prefer this over embed_documents for large inputs: it avoids one
+        Python float object per dimension.
+        """
         if not self._client:
             raise RuntimeError("Embedding client not initialized")
             
         try:
-            return self._client.embed_documents(texts)
+            # Local vectors are computed in one vectorized pass; no batching needed
+            embed = self._client.embed_array if self.provider == EmbeddingProvider.LOCAL else self.pipeline.run
+            return self._cached("document", texts, embed)
         except Exception as e:
             logger.error(f"Error embedding documents: {e}")
             raise RuntimeError(f"Failed to embed documents: {e}")
 
-    def embed_query(self, text: str) -> List[float]:
+    def embed_query_array(self, text: str) -> np.ndarray:
+        """Embed a single query string into a (dim,) float32 vector."""
+        if not self._client:
+            raise RuntimeError("Embedding client not initialized")
+            
+        try:
+            if self.provider == EmbeddingProvider.LOCAL:
+                embed = self._client.embed_array
+            else:
+                embed = lambda t: [self._client.embed_query(t[0])]
+            return self._cached("query", [text], embed)[0]
+        except Exception as e:
+            logger.error(f"Error embedding query: {e}")
+            raise RuntimeError(f"Failed to embed query: {e}")
+
+    def embed_queries_array(self, texts: List[str]) -> np.ndarray:
         """
-        Embed a single query string.
+        Embed several query strings into an (n, dim) float32 matrix.
+        
+        Unlike calling embed_query_array in a loop, unseen queries go to
+        the provider in a single batched request.
+        """
+        if not self._client:
+            raise RuntimeError("Embedding client not initialized")
+            
+        try:
+            if self.provider == EmbeddingProvider.LOCAL:
+                embed = self._client.embed_array
+            else:
+                embed = lambda t: self._client.embed_documents(t, task_type=QUERY_TASK_TYPE)
+            return self._cached("query", texts, embed)
+        except Exception as e:
+            logger.error(f"Error embedding queries: {e}")
+            raise RuntimeError(f"Failed to embed queries: {e}")
+
+    def embed_documents_quantized(self, texts: List[str], dtype: str = "int8") -> QuantizedEmbeddings:
+        """
+        Embed documents into compact storage.
         
         Args:
-            text: Query string
+            texts: List of strings to embed
+            dtype: "float32", "float16" or "int8" (per-row scaled)
             
         Returns:
-            Vector embedding
+            QuantizedEmbeddings supporting dot/cosine without full dequantization
+        """
+        return QuantizedEmbeddings.quantize(self.embed_documents_array(texts), dtype)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Async embed_documents (never blocks the event loop)."""
+        return (await self.aembed_documents_array(texts)).tolist()
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Async embed_query (never blocks the event loop)."""
+        return (await self.aembed_query_array(text)).tolist()
+
+    async def aembed_documents_array(self, texts: List[str]) -> np.ndarray:
         """
+        Async embed_documents_array.
+        
+        Provider batches run concurrently on the SDK's native async client;
+        local vectors are computed in a worker thread.
+        """
+        if not self._client:
+            raise RuntimeError("Embedding client not initialized")
+            
+        try:
+            if self.provider == EmbeddingProvider.LOCAL:
+                return await self._acached("document", texts, lambda t: asyncio.to_thread(self._client.embed_array, t))
+            return await self._acached("document", texts, self.pipeline.arun)
+        except Exception as e:
+            logger.error(f"Error embedding documents: {e}")
+            raise RuntimeError(f"Failed to embed documents: {e}")
+
+    async def aembed_query_array(self, text: str) -> np.ndarray:
+        """Async embed_query_array."""
         if not self._client:
             raise RuntimeError("Embedding client not initialized")
             
         try:
-            return self._client.embed_query(text)
+            if self.provider == EmbeddingProvider.LOCAL:
+                # A single hashed query takes microseconds; no thread hop needed
+                return self.embed_query_array(text)
+
+            async def embed(t: List[str]) -> List[List[float]]:
+                return [await self._client.aembed_query(t[0])]
+
+            return (await self._acached("query", [text], embed))[0]
         except Exception as e:
             logger.error(f"Error embedding query: {e}")
             raise RuntimeError(f"Failed to embed query: {e}")
+
+    async def aembed_queries_array(self, texts: List[str]) -> np.ndarray:
+        """Async embed_queries_array."""
+        if not self._client:
+            raise RuntimeError("Embedding client not initialized")
+            
+        try:
+            if self.provider == EmbeddingProvider.LOCAL:
+                return self.embed_queries_array(texts)
+
+            async def embed(t: List[str]) -> List[List[float]]:
+                return await self._client.aembed_documents(t, task_type=QUERY_TASK_TYPE)
+
+            return await self._acached("query", texts, embed)
+        except Exception as e:
+            logger.error(f"Error embedding queries: {e}")
+            raise RuntimeError(f"Failed to embed queries: {e}")
+
+    @property
+    def cache_scope(self) -> str:
+        """Cache namespace: vectors are only reused for the same provider and model."""
+        if self.provider == EmbeddingProvider.LOCAL:
+            return f"local:{self.model_name or 'hashing'}-{settings.local_embedding_dim}"
+        return f"{self.provider.value}:{self.model_name or 'models/embedding-001'}"
+
+    def _cached(
+        self,
+        task: str,
+        texts: List[str],
+        embed: Callable[[List[str]], Any]
+    ) -> np.ndarray:
+        """Serve `texts` from the cache, embedding only unseen (deduplicated) text."""
+        if self.cache is None:
+            return as_matrix(embed(texts)) if texts else np.empty((0, 0), dtype=np.float32)
+
+        # Query and document embeddings use different task types upstream
+        scope = f"{self.cache_scope}:{task}"
+        vectors = self.cache.get_many(scope, texts)
+        missing = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+        if missing:
+            fresh = as_matrix(embed(missing))
+            self.cache.set_many(scope, missing, fresh)
+            rows = {t: fresh[i] for i, t in enumerate(missing)}
+            vectors = [v if v is not None else rows[t] for t, v in zip(texts, vectors)]
+        logger.debug(f"Embedding cache: {len(texts) - len(missing)}/{len(texts)} hits ({scope})")
+        return as_matrix(vectors) if texts else np.empty((0, 0), dtype=np.float32)
+
+    async def _acached(
+        self,
+        task: str,
+        texts: List[str],
+        embed: Callable[[List[str]], Awaitable[Any]]
+    ) -> np.ndarray:
+        """Async _cached: SQLite lookups and writes are offloaded to a thread."""
+        if self.cache is None:
+            return as_matrix(await embed(texts)) if texts else np.empty((0, 0), dtype=np.float32)
+
+        scope = f"{self.cache_scope}:{task}"
+        vectors = await asyncio.to_thread(self.cache.get_many, scope, texts)
+        missing = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+        if missing:
+            fresh = as_matrix(await embed(missing))
+            await asyncio.to_thread(self.cache.set_many, scope, missing, fresh)
+            rows = {t: fresh[i] for i, t in enumerate(missing)}
+            vectors = [v if v is not None else rows[t] for t, v in zip(texts, vectors)]
+        return as_matrix(vectors) if texts else np.empty((0, 0), dtype=np.float32)
+
+
+_shared_models: Dict[Tuple[str, Optional[str]], EmbeddingModel] = {}
+_shared_lock = threading.Lock()
+
+
+def get_embedding_model(provider: Optional[str] = None, model_name: Optional[str] = None) -> EmbeddingModel:
+    """
+    Process-wide EmbeddingModel per (provider, model) configuration.
+
+    Vector stores share these instead of building a provider client each.
+    """
+    key = (provider or settings.default_embedding_provider, model_name)
+    with _shared_lock:
+        model = _shared_models.get(key)
+        if model is None:
+            model = _shared_models[key] = EmbeddingModel(provider=key[0], model_name=model_name)
+        return model
@@ -6,10 +6,11 @@ Demonstrates:
 - Semantic Similarity scoring (using Cosine Similarity of embeddings)
 - Faithfulness checks (LLM-as-a-Judge)
 """
-import numpy as np
+import asyncio
 from typing import Dict
 from core.llm_client import LLMClient
 from core.embeddings import EmbeddingModel
+from core.quantization import cosine_similarity
 
 class RAGEvaluator:
     def __init__(self, provider=None):
@@ -24,28 +25,25 @@ class RAGEvaluator:
         metrics = {}
         
         # 1. Answer Relevance (Cosine Similarity with Ground Truth)
+        # 2. Faithfulness (LLM as Judge)
+        # Both are non-blocking, so they run concurrently
+        faithfulness = self._check_faithfulness(answer, context)
         if ground_truth:
-            metrics["correctness"] = self._calculate_similarity(answer, ground_truth)
-        
-        # 2. Faithfulness (LLM as Judge) - Async call
-        metrics["faithfulness"] = await self._check_faithfulness(answer, context)
+            metrics["correctness"], metrics["faithfulness"] = await asyncio.gather(
+                self._calculate_similarity(answer, ground_truth), faithfulness
+            )
+        else:
+            metrics["faithfulness"] = await faithfulness
         
         return metrics
 
-    def _calculate_similarity(self, text1: str, text2: str) -> float:
+    async def _calculate_similarity(self, text1: str, text2: str) -> float:
         """Calculate cosine similarity between two texts using embeddings."""
-        vec1 = self.embedding_model.embed_query(text1)
-        vec2 = self.embedding_model.embed_query(text2)
-        
-        # Cosine similarity
-        dot_product = np.dot(vec1, vec2)
-        norm_a = np.linalg.norm(vec1)
-        norm_b = np.linalg.norm(vec2)
-        
-        if norm_a == 0 or norm_b == 0:
-            return 0.0
-            
-        return float(dot_product / (norm_a * norm_b))
+        vec1, vec2 = await asyncio.gather(
+            self.embedding_model.aembed_query_array(text1),
+            self.embedding_model.aembed_query_array(text2),
+        )
+        return cosine_similarity(vec1, vec2)
 
     async def _check_faithfulness(self, answer: str, context: str) -> float:
         """
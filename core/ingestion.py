@@ -0,0 +1,331 @@
+"""
+Ingestion Pipeline - Streaming, bounded-memory document indexing.
+
+Demonstrates:
+- Generator-based stages: load page -> split -> embed batch -> upsert batch
+- Bounded queues between stages (backpressure instead of unbounded buffering)
+- Overlapping I/O: parsing, embedding and writing run concurrently
+- Progress callbacks after every committed batch
+- Parallel PDF text extraction across a process pool, merged in page order
+
+Only a few batches are ever held in memory, so a 2,000-page upload uses
+the same memory as a 20-page one, and the first pages are searchable
+while the rest are still being embedded.
+"""
+import multiprocessing
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+
+from core.config import settings
+from core.rag_engine import content_id
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+Splitter = Callable[[str], List[str]]
+
+_DONE = object()
+
+
+@dataclass
+class Page:
+    """One unit of loaded text (typically a PDF page) and its metadata."""
+    text: str
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class IngestionProgress:
+    """Running totals, reported after every batch written to the store."""
+    pages: int = 0
+    chunks: int = 0
+    indexed: int = 0
+    skipped: int = 0
+    removed: int = 0
+    batches: int = 0
+    elapsed: float = 0.0
+
+
+def iter_pdf_pages(source: Union[str, BinaryIO], name: Optional[str] = None) -> Iterator[Page]:
+    """
+    Lazily yield the pages of a PDF (path or file-like object).
+
+    pypdf parses each page on access, so only the current page's text is
+    in memory. Metadata carries `source` and the 0-based `page` number.
+    """
+    from pypdf import PdfReader
+
+    reader = PdfReader(source)
+    name = name or getattr(source, "name", None) or str(source)
+    for number, page in enumerate(reader.pages):
+        text = page.extract_text() or ""
+        if text.strip():
+            yield Page(text=text, metadata={"source": name, "page": number})
+
+
+def _extract_page_range(path: str, name: str, start: int, stop: int) -> List[Page]:
+    """Process-pool task: text of pages [start, stop) of one PDF."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    pages = []
+    for number in range(start, stop):
+        text = reader.pages[number].extract_text() or ""
+        if text.strip():
+            pages.append(Page(text=text, metadata={"source": name, "page": number}))
+    return pages
+
+
+def iter_pdf_pages_parallel(
+    sources: Sequence[Union[str, BinaryIO]],
+    max_workers: Optional[int] = None,
+    pages_per_task: Optional[int] = None
+) -> Iterator[Page]:
+    """
+    Yield the pages of several PDFs, extracting text in worker processes.
+
+    Files are cut into page ranges that run on a ProcessPoolExecutor;
+    results are yielded in file and page order as soon as the head of
+    the line is ready. Only about two ranges per worker are in flight at
+    once, so memory stays bounded. Uploaded file objects are spooled to a
+    temp file so workers receive a path rather than a pickled copy of the PDF.
+
+    Args:
+        sources: PDF paths or file-like objects (named by their `.name`)
+        max_workers: Worker processes (default settings.ingest_parse_workers,
+            0 = one per CPU, 1 = parse serially in this process)
+        pages_per_task: Pages per worker task
+    """
+    workers = max_workers if max_workers is not None else settings.ingest_parse_workers
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for source in sources:
+            yield from iter_pdf_pages(source)
+        return
+
+    from pypdf import PdfReader
+
+    step = pages_per_task or settings.ingest_pages_per_task
+    temp_dir = tempfile.mkdtemp(prefix="agentforge_pdf_")
+    # Never fork: callers (Streamlit, the ingestion threads) are multithreaded, and a
+    # forked child can inherit locks held by other threads. Spawned workers import
+    # this module fresh, so the task function must stay at module level.
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    pending: Deque[Future] = deque()
+    try:
+        for index, source in enumerate(sources):
+            name = getattr(source, "name", None) or str(source)
+            if isinstance(source, (str, os.PathLike)):
+                path = str(source)
+            else:
+                path = os.path.join(temp_dir, f"{index}.pdf")
+                if hasattr(source, "seek"):
+                    source.seek(0)
+                with open(path, "wb") as f:
+                    shutil.copyfileobj(source, f)
+
+            total = len(PdfReader(path).pages)
+            for start in range(0, total, step):
+                pending.append(executor.submit(_extract_page_range, path, name, start, min(start + step, total)))
+                # Drain in order once enough ranges are queued to keep every worker busy
+                while len(pending) >= workers * 2:
+                    yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def default_splitter(chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None) -> Splitter:
+    """Recursive character splitter with the configured chunk size/overlap."""
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size or settings.ingest_chunk_size,
+        chunk_overlap=chunk_overlap if chunk_overlap is not None else settings.ingest_chunk_overlap
+    )
+    return splitter.split_text
+
+
+class IngestionPipeline:
+    """
+    Streams pages into a VectorStore in fixed-size batches.
+
+    A loader thread splits pages into chunks, an embedding thread turns
+    full batches into vectors, and the calling thread upserts them. Each
+    hand-off is a bounded queue, so a slow stage blocks the one before it
+    rather than letting work pile up.
+
+    Chunks get content-hash ids (see `content_id`); ones already stored are
+    skipped before embedding, so re-ingesting costs only what changed.
+    With `replace_sources`, chunks of an ingested source that were not
+    seen in this run (its stale version) are deleted at the end.
+
+    Args:
+        store: VectorStore to index into
+        splitter: Function splitting page text into chunks
+        batch_size: Chunks per embed/upsert batch
+        queue_size: Batches buffered between stages
+        on_progress: Called on the calling thread after each upsert
+        replace_sources: Delete stale chunks of every ingested source
+    """
+
+    def __init__(
+        self,
+        store: Any,
+        splitter: Optional[Splitter] = None,
+        batch_size: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        on_progress: Optional[Callable[[IngestionProgress], None]] = None,
+        replace_sources: bool = True
+    ):
+        self.store = store
+        self.splitter = splitter or default_splitter()
+        self.batch_size = batch_size or settings.ingest_batch_size
+        self.queue_size = queue_size or settings.ingest_queue_size
+        self.on_progress = on_progress
+        self.replace_sources = replace_sources
+
+    def run(self, pages: Iterable[Page]) -> IngestionProgress:
+        """
+        Index `pages`, returning the final totals.
+
+        Raises the first error from any stage after stopping the others.
+        """
+        progress = IngestionProgress()
+        start = time.perf_counter()
+        chunks: queue.Queue = queue.Queue(maxsize=self.batch_size * self.queue_size)
+        batches: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        errors: List[BaseException] = []
+        seen: Dict[str, Set[str]] = defaultdict(set)
+
+        def put(q: queue.Queue, item: Any) -> bool:
+            # Block while the next stage is behind, but give up once stopped
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def load() -> None:
+            try:
+                for page in pages:
+                    progress.pages += 1
+                    for text in self.splitter(page.text):
+                        progress.chunks += 1
+                        if not put(chunks, (text, dict(page.metadata))):
+                            return
+            except BaseException as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                # Release the source early (e.g. a parser's worker pool) if we stopped mid-way
+                if hasattr(pages, "close"):
+                    pages.close()
+                put(chunks, _DONE)
+
+        def embed() -> None:
+            try:
+                for texts, metadatas in self._batched(chunks, stop):
+                    if not put(batches, self._embed_new(texts, metadatas, seen)):
+                        return
+            except BaseException as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                put(batches, _DONE)
+
+        workers = [
+            threading.Thread(target=load, name="ingest-load", daemon=True),
+            threading.Thread(target=embed, name="ingest-embed", daemon=True),
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            while not stop.is_set():
+                try:
+                    item = batches.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if item is _DONE:
+                    break
+                ids, texts, vectors, metadatas, skipped = item
+                if ids:
+                    self.store.add_embeddings(ids, texts, vectors, metadatas)
+                progress.indexed += len(ids)
+                progress.skipped += skipped
+                progress.batches += 1
+                progress.elapsed = time.perf_counter() - start
+                if self.on_progress:
+                    self.on_progress(progress)
+        finally:
+            stop.set()
+            for worker in workers:
+                worker.join()
+        if errors:
+            raise errors[0]
+
+        if self.replace_sources:
+            # Only after a complete run: a partial one has not seen every current chunk
+            for source, ids in seen.items():
+                progress.removed += self.store.sync_source(source, ids)
+        progress.elapsed = time.perf_counter() - start
+        logger.info(
+            f"Ingested {progress.pages} pages -> {progress.indexed} new chunks, "
+            f"{progress.skipped} unchanged, {progress.removed} stale removed "
+            f"in {progress.batches} batches ({progress.elapsed:.2f}s)"
+        )
+        return progress
+
+    def _batched(self, chunks: queue.Queue, stop: threading.Event) -> Iterator[Tuple[List[str], List[Dict[str, Any]]]]:
+        texts: List[str] = []
+        metadatas: List[Dict[str, Any]] = []
+        while not stop.is_set():
+            try:
+                item = chunks.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                break
+            texts.append(item[0])
+            metadatas.append(item[1])
+            if len(texts) >= self.batch_size:
+                yield texts, metadatas
+                texts, metadatas = [], []
+        if texts and not stop.is_set():
+            yield texts, metadatas
+
+    def _embed_new(
+        self,
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        seen: Dict[str, Set[str]]
+    ) -> Tuple[List[str], List[str], Optional[np.ndarray], List[Dict[str, Any]], int]:
+        """Embed the chunks of a batch that are neither stored nor already seen this run."""
+        ids = [content_id(t, m.get("source", "unknown"), m.get("page")) for t, m in zip(texts, metadatas)]
+        existing = self.store.existing_ids(ids)
+        keep = []
+        for i, doc_id in enumerate(ids):
+            source_ids = seen[metadatas[i].get("source", "unknown")]
+            if doc_id not in existing and doc_id not in source_ids:
+                keep.append(i)
+            source_ids.add(doc_id)
+        if not keep:
+            return [], [], None, [], len(ids)
+        new_texts = [texts[i] for i in keep]
+        vectors = self.store.embedding_model.embed_documents_array(new_texts)
+        return [ids[i] for i in keep], new_texts, vectors, [metadatas[i] for i in keep], len(ids) - len(keep)
@@ -0,0 +1,268 @@
+"""
+LLM Response Cache - Opt-in memoization of identical generations.
+
+Demonstrates:
+- Content-addressed cache keys
+- Tiered backends (in-process LRU+TTL in front of shared Redis)
+- Hit/miss instrumentation
+
+Only deterministic requests (temperature == 0) are cached unless a caller
+explicitly forces it, since sampling at temperature > 0 is expected to vary.
+"""
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from core.config import settings
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def make_cache_key(
+    provider: str,
+    model: str,
+    system_prompt: Optional[str],
+    prompt: str,
+    temperature: float,
+    max_tokens: int
+) -> str:
+    """Stable hash of every input that influences the generated output."""
+    payload = json.dumps(
+        [provider, model, system_prompt, prompt, temperature, max_tokens],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    """Counters for cache effectiveness."""
+    hits: int = 0
+    misses: int = 0
+    sets: int = 0
+    errors: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "sets": self.sets,
+            "errors": self.errors,
+            "hit_rate": round(self.hit_rate, 4),
+        }
+
+
+class ResponseCache(ABC):
+    """
+    Base class for response cache backends.
+
+    Values are plain dicts (see `LLMResponse` serialization in llm_client) so
+    every backend can store them without knowing the response type.
+    """
+
+    def __init__(self, ttl: Optional[int] = None):
+        self.ttl = ttl if ttl is not None else settings.llm_cache_ttl
+        self.stats = CacheStats()
+        self._stats_lock = threading.Lock()
+
+    def _record(self, field: str) -> None:
+        with self._stats_lock:
+            setattr(self.stats, field, getattr(self.stats, field) + 1)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached value or None, updating hit/miss counters."""
+        try:
+            value = self._get(key)
+        except Exception as e:
+            logger.warning(f"Response cache read failed: {e}")
+            self._record("errors")
+            value = None
+        self._record("hits" if value is not None else "misses")
+        return value
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a value, never raising on backend failure."""
+        try:
+            self._set(key, value)
+            self._record("sets")
+        except Exception as e:
+            logger.warning(f"Response cache write failed: {e}")
+            self._record("errors")
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        """Async lookup; network backends are offloaded to a worker thread."""
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: Dict[str, Any]) -> None:
+        """Async store; network backends are offloaded to a worker thread."""
+        await asyncio.to_thread(self.set, key, value)
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Drop all cached entries."""
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Backend lookup (may raise; `get` handles errors)."""
+
+    @abstractmethod
+    def _set(self, key: str, value: Dict[str, Any]) -> None:
+        """Backend store (may raise; `set` handles errors)."""
+
+
+class InMemoryResponseCache(ResponseCache):
+    """Process-local LRU cache with per-entry TTL."""
+
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[int] = None):
+        super().__init__(ttl=ttl)
+        self.max_entries = max_entries or settings.llm_cache_max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.get(key)
+
+    async def aset(self, key: str, value: Dict[str, Any]) -> None:
+        self.set(key, value)
+
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisResponseCache(ResponseCache):
+    """Shared cache tier backed by Redis (reuses settings.redis_url)."""
+
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        ttl: Optional[int] = None,
+        namespace: str = "agentforge:llm"
+    ):
+        super().__init__(ttl=ttl)
+        import redis
+        self.namespace = namespace
+        self._redis = redis.Redis.from_url(redis_url or settings.redis_url)
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = self._redis.get(self._key(key))
+        return json.loads(raw) if raw else None
+
+    def _set(self, key: str, value: Dict[str, Any]) -> None:
+        self._redis.set(self._key(key), json.dumps(value), ex=self.ttl)
+
+    def clear(self) -> None:
+        for key in self._redis.scan_iter(match=f"{self.namespace}:*"):
+            self._redis.delete(key)
+
+
+class TieredResponseCache(ResponseCache):
+    """
+    Read-through in-process tier in front of a shared cache.
+
+    Hot keys are served from local memory without a network round trip;
+    misses fall through to the shared tier and are copied into memory.
+    Each tier handles its own errors, so a Redis outage degrades to the
+    memory tier instead of failing.
+    """
+
+    def __init__(self, local: ResponseCache, shared: ResponseCache):
+        super().__init__(ttl=shared.ttl)
+        self.local = local
+        self.shared = shared
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.local.get(key)
+        if value is None:
+            value = await asyncio.to_thread(self.shared.get, key)
+            if value is not None:
+                self.local.set(key, value)
+        self._record("hits" if value is not None else "misses")
+        return value
+
+    async def aset(self, key: str, value: Dict[str, Any]) -> None:
+        self.local.set(key, value)
+        await asyncio.to_thread(self.shared.set, key, value)
+        self._record("sets")
+
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.local.get(key)
+        if value is None:
+            value = self.shared.get(key)
+            if value is not None:
+                self.local.set(key, value)
+        return value
+
+    def _set(self, key: str, value: Dict[str, Any]) -> None:
+        self.local.set(key, value)
+        self.shared.set(key, value)
+
+    def clear(self) -> None:
+        self.local.clear()
+        self.shared.clear()
+
+
+_default_cache: Optional[ResponseCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> Optional[ResponseCache]:
+    """
+    Return the process-wide cache configured by settings.llm_cache_backend.
+
+    Returns:
+        A shared cache instance, or None when caching is disabled.
+    """
+    global _default_cache
+    backend = (settings.llm_cache_backend or "").lower()
+    if not backend:
+        return None
+
+    with _default_cache_lock:
+        if _default_cache is None:
+            if backend == "redis":
+                _default_cache = TieredResponseCache(InMemoryResponseCache(), RedisResponseCache())
+            elif backend == "memory":
+                _default_cache = InMemoryResponseCache()
+            else:
+                raise ValueError(f"Unsupported LLM cache backend: {backend}")
+            logger.info(f"LLM response cache enabled: {backend}")
+        return _default_cache
@@ -1,14 +1,36 @@
 """
 Unified LLM Client - Multi-provider support for Gemini and Claude.
 
+A deterministic `local_stub` provider is also available for offline load and
+latency benchmarking (see core/local_stub.py).
+
 Provides a consistent interface for interacting with different LLM providers,
 including direct SDK access and LangChain compatibility.
 """
-from dataclasses import dataclass
+import asyncio
+import base64
+import json
+import time
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import Any, Dict, Generator, Optional, Union, AsyncGenerator
+from typing import Any, Dict, Generator, List, Optional, Sequence, Union, AsyncGenerator
 
 from core.config import settings
+from core.llm_cache import ResponseCache, get_default_cache, make_cache_key
+from core.llm_pool import client_registry
+from core.local_stub import get_stub_engine
+from core.metrics import StreamTimer
+from core.rate_limit import (
+    RetryPolicy,
+    acall_with_retry,
+    aretry_stream,
+    call_with_retry,
+    estimate_tokens,
+    get_rate_limiter,
+    retry_stream,
+)
+from core.singleflight import singleflight
+from core.usage import UsageCallbackHandler, UsageRecord, estimate_cost, usage_ledger
 from utils.logger import get_logger
 
 # Import LangChain models only when needed
@@ -21,6 +43,7 @@ class LLMProvider(Enum):
     """Supported LLM providers."""
     GEMINI = "gemini"
     CLAUDE = "claude"
+    LOCAL_STUB = "local_stub"
 
 
 @dataclass
@@ -29,8 +52,205 @@ class LLMResponse:
     content: str
     provider: LLMProvider
     model: str
-    tokens_used: Optional[int] = None
+    tokens_used: Optional[int] = None  # input + output
     finish_reason: Optional[str] = None
+    input_tokens: Optional[int] = None  # includes cached prompt tokens
+    output_tokens: Optional[int] = None
+    cached_tokens: Optional[int] = None
+
+    @property
+    def cost(self) -> float:
+        """Estimated USD cost of this response."""
+        return estimate_cost(
+            self.model, self.input_tokens or 0, self.output_tokens or 0, self.cached_tokens or 0
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize to a JSON-compatible dict (used by response caches)."""
+        return {
+            "content": self.content,
+            "provider": self.provider.value,
+            "model": self.model,
+            "tokens_used": self.tokens_used,
+            "finish_reason": self.finish_reason,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cached_tokens": self.cached_tokens,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LLMResponse":
+        """Rebuild a response serialized with `to_dict`."""
+        return cls(
+            content=data["content"],
+            provider=LLMProvider(data["provider"]),
+            model=data["model"],
+            tokens_used=data.get("tokens_used"),
+            finish_reason=data.get("finish_reason"),
+            input_tokens=data.get("input_tokens"),
+            output_tokens=data.get("output_tokens"),
+            cached_tokens=data.get("cached_tokens"),
+        )
+
+
+def _claude_usage(usage: Any) -> Dict[str, int]:
+    """Normalize Anthropic usage (input_tokens excludes prompt-cache reads/writes)."""
+    if usage is None:
+        return {}
+    cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+    cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+    return {
+        "input_tokens": (usage.input_tokens or 0) + cache_read + cache_write,
+        "output_tokens": usage.output_tokens or 0,
+        "cached_tokens": cache_read,
+    }
+
+
+def _gemini_usage(response: Any) -> Dict[str, int]:
+    """Normalize Gemini usage_metadata (prompt count already includes cached tokens)."""
+    meta = getattr(response, "usage_metadata", None)
+    if not meta:
+        return {}
+    return {
+        "input_tokens": getattr(meta, "prompt_token_count", 0) or 0,
+        "output_tokens": getattr(meta, "candidates_token_count", 0) or 0,
+        "cached_tokens": getattr(meta, "cached_content_token_count", 0) or 0,
+    }
+
+
+DEFAULT_SYSTEM_PROMPT = "You are a helpful AI assistant."
+
+# Anthropic accepts at most four cache_control breakpoints per request
+CLAUDE_MAX_CACHE_BREAKPOINTS = 4
+
+
+@dataclass
+class Message:
+    """
+    One conversation turn for the messages API.
+
+    `content` is plain text or a list of blocks: {"type": "text", "text": ...}
+    or {"type": "image", "mime_type": ..., "data": <base64>}. Set `cache=True`
+    on the last turn of a stable prefix (large documents, images, earlier
+    history) so providers with prompt caching can reuse it on later calls.
+    """
+    role: str  # "user" or "assistant"
+    content: Union[str, List[Dict[str, Any]]]
+    cache: bool = False
+
+    @property
+    def blocks(self) -> List[Dict[str, Any]]:
+        if isinstance(self.content, str):
+            return [{"type": "text", "text": self.content}]
+        return list(self.content)
+
+    @property
+    def text(self) -> str:
+        return "\n".join(b["text"] for b in self.blocks if b.get("type") == "text")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"role": self.role, "content": self.content, "cache": self.cache}
+
+
+def _claude_payload(
+    messages: Sequence[Message],
+    system_prompt: Optional[str],
+    cache_system: bool
+) -> Dict[str, Any]:
+    """Anthropic `system`/`messages` with cache_control on the marked prefixes."""
+    system: Dict[str, Any] = {"type": "text", "text": system_prompt or DEFAULT_SYSTEM_PROMPT}
+    budget = CLAUDE_MAX_CACHE_BREAKPOINTS
+    if cache_system:
+        system["cache_control"] = {"type": "ephemeral"}
+        budget -= 1
+
+    # Later breakpoints cover longer prefixes, so keep the last ones
+    flagged = [i for i, m in enumerate(messages) if m.cache]
+    cached = set(flagged[-budget:]) if budget > 0 else set()
+
+    payload = []
+    for i, message in enumerate(messages):
+        blocks = []
+        for block in message.blocks:
+            if block.get("type") == "image":
+                blocks.append({
+                    "type": "image",
+                    "source": {"type": "base64", "media_type": block["mime_type"], "data": block["data"]},
+                })
+            else:
+                blocks.append({"type": "text", "text": block["text"]})
+        if i in cached:
+            blocks[-1]["cache_control"] = {"type": "ephemeral"}
+        payload.append({"role": message.role, "content": blocks})
+    return {"system": [system], "messages": payload}
+
+
+def _gemini_contents(messages: Sequence[Message]) -> List[Dict[str, Any]]:
+    """Gemini `contents` (assistant turns use the "model" role)."""
+    contents = []
+    for message in messages:
+        parts = []
+        for block in message.blocks:
+            if block.get("type") == "image":
+                parts.append({"mime_type": block["mime_type"], "data": base64.b64decode(block["data"])})
+            else:
+                parts.append(block["text"])
+        contents.append({"role": "model" if message.role == "assistant" else "user", "parts": parts})
+    return contents
+
+
+def _flatten_messages(messages: Sequence[Message]) -> str:
+    return "\n".join(f"{m.role}: {m.text}" for m in messages)
+
+
+@dataclass
+class BatchItem:
+    """Outcome of a single prompt within a batch."""
+    index: int
+    prompt: str
+    response: Optional[LLMResponse] = None
+    error: Optional[Exception] = None
+    latency: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class BatchResult:
+    """Ordered batch outcomes plus aggregate latency/token statistics."""
+    items: List[BatchItem] = field(default_factory=list)
+    wall_time: float = 0.0
+
+    @property
+    def responses(self) -> List[Optional[LLMResponse]]:
+        """Responses in prompt order (None where the item failed)."""
+        return [item.response for item in self.items]
+
+    def stats(self) -> Dict[str, Any]:
+        """Aggregate counts, latency percentiles and token usage."""
+        latencies = sorted(item.latency for item in self.items)
+        succeeded = [item for item in self.items if item.ok]
+        # Coalesced duplicates share one response object: count its tokens once per flight
+        unique = list({id(item.response): item.response for item in succeeded}.values())
+
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(round(p * (len(latencies) - 1))))]
+
+        return {
+            "total": len(self.items),
+            "succeeded": len(succeeded),
+            "failed": len(self.items) - len(succeeded),
+            "wall_time": round(self.wall_time, 4),
+            "latency_mean": round(sum(latencies) / len(latencies), 4) if latencies else 0.0,
+            "latency_p50": round(percentile(0.50), 4),
+            "latency_p95": round(percentile(0.95), 4),
+            "latency_max": round(latencies[-1], 4) if latencies else 0.0,
+            "tokens_used": sum(response.tokens_used or 0 for response in unique),
+        }
 
 
 class LLMClient:
@@ -43,14 +263,20 @@ class LLMClient:
     def __init__(
         self,
         provider: Optional[str] = None,
-        model: Optional[str] = None
+        model: Optional[str] = None,
+        cache: Optional[ResponseCache] = None,
+        retry_policy: Optional[RetryPolicy] = None
     ):
         """
         Initialize the LLM client.
 
         Args:
-            provider: LLM provider ("gemini" or "claude"). Defaults to settings.
+            provider: LLM provider ("gemini", "claude" or "local_stub"). Defaults to settings.
             model: Specific model name. Defaults to settings.
+            cache: Response cache for generate/agenerate. Defaults to the
+                backend configured by settings.llm_cache_backend (off by default).
+            retry_policy: Backoff policy for transient provider errors.
+                Defaults to the settings.llm_max_retries configuration.
         """
         provider_val = provider or settings.default_llm_provider
         self.provider = LLMProvider(provider_val)
@@ -60,10 +286,17 @@ class LLMClient:
             self.model = model
         elif self.provider == LLMProvider.GEMINI:
             self.model = settings.gemini_model
+        elif self.provider == LLMProvider.LOCAL_STUB:
+            self.model = settings.stub_model
         else:
             self.model = settings.claude_model
 
-        # Initialize provider client (Lazy initialization)
+        self.cache = cache if cache is not None else get_default_cache()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.rate_limiter = get_rate_limiter(self.provider.value, self.model)
+        self.last_usage: Optional[UsageRecord] = None
+
+        # Provider clients are borrowed lazily from the process-wide pool
         self._client = None
         self._async_client = None
 
@@ -74,6 +307,8 @@ class LLMClient:
 
         if self.provider == LLMProvider.GEMINI:
             self._init_gemini()
+        elif self.provider == LLMProvider.LOCAL_STUB:
+            self._client = get_stub_engine(self.model)
         else:
             self._init_claude()
 
@@ -83,12 +318,18 @@ class LLMClient:
             return
             
         if self.provider == LLMProvider.CLAUDE:
-            from anthropic import AsyncAnthropic
-            self._async_client = AsyncAnthropic(api_key=settings.anthropic_api_key)
+            if not settings.anthropic_api_key:
+                logger.warning("ANTHROPIC_API_KEY not set")
+                return
+            self._async_client = client_registry.get_async_client(
+                self.provider.value, self.model, settings.anthropic_api_key
+            )
         elif self.provider == LLMProvider.GEMINI:
             # Gemini's main client handles async via generate_content_async
             self._init_gemini()
             self._async_client = self._client
+        elif self.provider == LLMProvider.LOCAL_STUB:
+            self._async_client = get_stub_engine(self.model)
 
     def _init_gemini(self) -> None:
         """Initialize Google Gemini client."""
@@ -98,10 +339,8 @@ class LLMClient:
             return
 
         try:
-            import google.generativeai as genai
-            genai.configure(api_key=api_key)
-            self._client = genai.GenerativeModel(self.model)
-            logger.info(f"Gemini client initialized with model: {self.model}")
+            self._client = client_registry.get_client(self.provider.value, self.model, api_key)
+            logger.debug(f"Gemini client acquired for model: {self.model}")
         except ImportError:
             logger.error("google-generativeai not installed")
         except Exception as e:
@@ -115,9 +354,8 @@ class LLMClient:
             return
 
         try:
-            from anthropic import Anthropic
-            self._client = Anthropic(api_key=api_key)
-            logger.info(f"Claude client initialized with model: {self.model}")
+            self._client = client_registry.get_client(self.provider.value, self.model, api_key)
+            logger.debug(f"Claude client acquired for model: {self.model}")
         except ImportError:
             logger.error("anthropic not installed")
         except Exception as e:
@@ -133,6 +371,10 @@ class LLMClient:
         Returns a LangChain-compatible chat model instance.
         """
         temperature = kwargs.get("temperature", 0.0)
+        # Meter graph/agent usage into the same ledger as direct calls
+        kwargs["callbacks"] = list(kwargs.get("callbacks") or []) + [
+            UsageCallbackHandler(self.provider.value, self.model)
+        ]
         
         if self.provider == LLMProvider.GEMINI:
             from langchain_google_genai import ChatGoogleGenerativeAI
@@ -155,6 +397,13 @@ class LLMClient:
                 temperature=temperature,
                 **{k: v for k, v in kwargs.items() if k != "temperature"}
             )
+        elif self.provider == LLMProvider.LOCAL_STUB:
+            from core.local_stub import StubChatModel
+            return StubChatModel(
+                model=self.model,
+                temperature=temperature,
+                **{k: v for k, v in kwargs.items() if k != "temperature"}
+            )
         raise ValueError(f"Unsupported provider: {self.provider}")
 
     def generate(
@@ -165,15 +414,37 @@ class LLMClient:
         temperature: float = 0.7,
         **kwargs
     ) -> LLMResponse:
-        """Generate a response from the LLM (Synchronous)."""
+        """
+        Generate a response from the LLM (Synchronous).
+
+        Pass force_cache=True to cache a request even when temperature > 0.
+        """
+        cache_key = self._cache_key(prompt, system_prompt, max_tokens, temperature, kwargs)
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return LLMResponse.from_dict(cached)
+
         if not self.is_available():
             raise RuntimeError(f"{self.provider.value} client not initialized")
 
-        if self.provider == LLMProvider.GEMINI:
-            return self._generate_gemini(prompt, system_prompt, max_tokens, temperature)
-        else:
+        estimate = estimate_tokens(prompt, system_prompt) + max_tokens
+
+        def attempt() -> LLMResponse:
+            self.rate_limiter.acquire(estimate)
+            if self.provider == LLMProvider.GEMINI:
+                return self._generate_gemini(prompt, system_prompt, max_tokens, temperature)
+            if self.provider == LLMProvider.LOCAL_STUB:
+                return self._stub_response(self._client.generate(prompt, system_prompt, max_tokens))
             return self._generate_claude(prompt, system_prompt, max_tokens, temperature)
 
+        response = call_with_retry(attempt, self.retry_policy, f"{self.provider.value} generate")
+        self._account(response, estimate)
+
+        if cache_key:
+            self.cache.set(cache_key, response.to_dict())
+        return response
+
     async def agenerate(
         self,
         prompt: str,
@@ -182,7 +453,100 @@ class LLMClient:
         temperature: float = 0.7,
         **kwargs
     ) -> LLMResponse:
-        """Generate a response from the LLM (Asynchronous)."""
+        """
+        Generate a response from the LLM (Asynchronous).
+
+        Pass force_cache=True to cache a request even when temperature > 0.
+        Concurrent identical calls at temperature 0 share one upstream
+        request; pass coalesce=True/False to override (see `_should_coalesce`).
+        """
+        cache_key = self._cache_key(prompt, system_prompt, max_tokens, temperature, kwargs)
+        if cache_key:
+            cached = await self.cache.aget(cache_key)
+            if cached is not None:
+                return LLMResponse.from_dict(cached)
+
+        if self._should_coalesce(temperature, kwargs):
+            flight_key = make_cache_key(
+                self.provider.value, self.model, system_prompt, prompt, temperature, max_tokens
+            )
+            response = await singleflight.do(
+                flight_key,
+                lambda: self._agenerate_uncached(prompt, system_prompt, max_tokens, temperature)
+            )
+        else:
+            response = await self._agenerate_uncached(prompt, system_prompt, max_tokens, temperature)
+
+        if cache_key:
+            await self.cache.aset(cache_key, response.to_dict())
+        return response
+
+    async def _agenerate_uncached(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        max_tokens: int,
+        temperature: float
+    ) -> LLMResponse:
+        """Issue the provider call for agenerate under rate limiting and retries."""
+        estimate = estimate_tokens(prompt, system_prompt) + max_tokens
+
+        async def attempt() -> LLMResponse:
+            await self.rate_limiter.aacquire(estimate)
+            return await self._agenerate_provider(prompt, system_prompt, max_tokens, temperature)
+
+        response = await acall_with_retry(attempt, self.retry_policy, f"{self.provider.value} agenerate")
+        self._account(response, estimate)
+        return response
+
+    def _response(self, content: str, finish_reason: Optional[str], usage: Dict[str, int]) -> LLMResponse:
+        """Build an LLMResponse with normalized token counts."""
+        total = usage["input_tokens"] + usage["output_tokens"] if usage else None
+        return LLMResponse(
+            content=content,
+            provider=self.provider,
+            model=self.model,
+            tokens_used=total,
+            finish_reason=finish_reason,
+            input_tokens=usage.get("input_tokens"),
+            output_tokens=usage.get("output_tokens"),
+            cached_tokens=usage.get("cached_tokens"),
+        )
+
+    def _stub_response(self, result: Dict[str, Any]) -> LLMResponse:
+        return self._response(result["content"], result["finish_reason"], result["usage"])
+
+    def _record_usage(self, usage: Dict[str, int]) -> None:
+        """Write provider-reported usage to the process-wide ledger."""
+        if not usage:
+            return
+        self.last_usage = usage_ledger.record(UsageRecord(
+            provider=self.provider.value,
+            model=self.model,
+            input_tokens=usage.get("input_tokens", 0),
+            output_tokens=usage.get("output_tokens", 0),
+            cached_tokens=usage.get("cached_tokens", 0),
+        ))
+
+    def _account(self, response: LLMResponse, estimate: int) -> None:
+        """Ledger the response and refund over-reserved rate-limit tokens."""
+        if response.tokens_used is None:
+            return
+        self.rate_limiter.reconcile(estimate, response.tokens_used)
+        self._record_usage({
+            "input_tokens": response.input_tokens or 0,
+            "output_tokens": response.output_tokens or 0,
+            "cached_tokens": response.cached_tokens or 0,
+        })
+
+    async def _agenerate_provider(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        max_tokens: int,
+        temperature: float
+    ) -> LLMResponse:
+        """Single raw async provider call."""
         self._init_async_client()
         if not self._async_client:
             raise RuntimeError(f"{self.provider.value} async client not initialized")
@@ -192,27 +556,241 @@ class LLMClient:
                 f"{system_prompt}\n\n{prompt}" if system_prompt else prompt,
                 generation_config={"max_output_tokens": max_tokens, "temperature": temperature}
             )
-            return LLMResponse(
-                content=response.text,
-                provider=self.provider,
-                model=self.model,
-                finish_reason=response.candidates[0].finish_reason.name if response.candidates else None
+            return self._gemini_response(response)
+        elif self.provider == LLMProvider.LOCAL_STUB:
+            return self._stub_response(
+                await self._async_client.agenerate(prompt, system_prompt, max_tokens)
             )
         else:
             response = await self._async_client.messages.create(
                 model=self.model,
                 max_tokens=max_tokens,
                 temperature=temperature,
-                system=system_prompt or "You are a helpful AI assistant.",
+                system=system_prompt or DEFAULT_SYSTEM_PROMPT,
                 messages=[{"role": "user", "content": prompt}]
             )
-            return LLMResponse(
-                content=response.content[0].text,
-                provider=self.provider,
+            return self._claude_response(response)
+
+    async def agenerate_many(
+        self,
+        prompts: Sequence[str],
+        concurrency: int = 8,
+        system_prompt: Optional[str] = None,
+        max_tokens: int = 2048,
+        temperature: float = 0.7,
+        **kwargs
+    ) -> BatchResult:
+        """
+        Run many prompts concurrently on the current event loop.
+
+        Args:
+            prompts: Prompts to generate for
+            concurrency: Maximum number of in-flight provider calls
+            system_prompt, max_tokens, temperature, kwargs: Passed to agenerate
+
+        Returns:
+            BatchResult whose items follow the order of `prompts`. A failing
+            item records its exception instead of aborting the batch.
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def run_one(index: int, prompt: str) -> BatchItem:
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await self.agenerate(
+                        prompt,
+                        system_prompt=system_prompt,
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                        **kwargs
+                    )
+                    return BatchItem(index, prompt, response=response, latency=time.perf_counter() - start)
+                except Exception as e:
+                    logger.warning(f"Batch item {index} failed: {e}")
+                    return BatchItem(index, prompt, error=e, latency=time.perf_counter() - start)
+
+        start = time.perf_counter()
+        items = await asyncio.gather(*(run_one(i, p) for i, p in enumerate(prompts)))
+        result = BatchResult(items=list(items), wall_time=time.perf_counter() - start)
+        logger.info(f"Batch completed | {result.stats()}")
+        return result
+
+    def generate_messages(
+        self,
+        messages: Sequence[Message],
+        system_prompt: Optional[str] = None,
+        max_tokens: int = 2048,
+        temperature: float = 0.7,
+        cache_system: bool = False,
+        **kwargs
+    ) -> LLMResponse:
+        """
+        Generate a reply to a multi-turn conversation (Synchronous).
+
+        Args:
+            messages: Conversation turns, oldest first, ending with a user turn
+            system_prompt: System instructions
+            max_tokens: Maximum tokens to generate
+            temperature: Sampling temperature
+            cache_system: Mark the system prompt as a cacheable prefix
+
+        Returns:
+            LLMResponse whose cached_tokens reports prompt-cache reads
+        """
+        cache_key = self._messages_cache_key(messages, system_prompt, max_tokens, temperature, cache_system, kwargs)
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return LLMResponse.from_dict(cached)
+
+        if not self.is_available():
+            raise RuntimeError(f"{self.provider.value} client not initialized")
+
+        estimate = estimate_tokens(_flatten_messages(messages), system_prompt) + max_tokens
+
+        def attempt() -> LLMResponse:
+            self.rate_limiter.acquire(estimate)
+            if self.provider == LLMProvider.GEMINI:
+                response = self._gemini_model(system_prompt).generate_content(
+                    _gemini_contents(messages),
+                    generation_config={"max_output_tokens": max_tokens, "temperature": temperature}
+                )
+                return self._gemini_response(response)
+            if self.provider == LLMProvider.LOCAL_STUB:
+                return self._stub_response(
+                    self._client.generate(_flatten_messages(messages), system_prompt, max_tokens)
+                )
+            response = self._client.messages.create(
+                model=self.model,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                **_claude_payload(messages, system_prompt, cache_system)
+            )
+            return self._claude_response(response)
+
+        response = call_with_retry(attempt, self.retry_policy, f"{self.provider.value} generate_messages")
+        self._account(response, estimate)
+
+        if cache_key:
+            self.cache.set(cache_key, response.to_dict())
+        return response
+
+    async def agenerate_messages(
+        self,
+        messages: Sequence[Message],
+        system_prompt: Optional[str] = None,
+        max_tokens: int = 2048,
+        temperature: float = 0.7,
+        cache_system: bool = False,
+        **kwargs
+    ) -> LLMResponse:
+        """Generate a reply to a multi-turn conversation (Asynchronous)."""
+        cache_key = self._messages_cache_key(messages, system_prompt, max_tokens, temperature, cache_system, kwargs)
+        if cache_key:
+            cached = await self.cache.aget(cache_key)
+            if cached is not None:
+                return LLMResponse.from_dict(cached)
+
+        self._init_async_client()
+        if not self._async_client:
+            raise RuntimeError(f"{self.provider.value} async client not initialized")
+
+        estimate = estimate_tokens(_flatten_messages(messages), system_prompt) + max_tokens
+
+        async def attempt() -> LLMResponse:
+            await self.rate_limiter.aacquire(estimate)
+            if self.provider == LLMProvider.GEMINI:
+                response = await self._gemini_model(system_prompt).generate_content_async(
+                    _gemini_contents(messages),
+                    generation_config={"max_output_tokens": max_tokens, "temperature": temperature}
+                )
+                return self._gemini_response(response)
+            if self.provider == LLMProvider.LOCAL_STUB:
+                return self._stub_response(
+                    await self._async_client.agenerate(_flatten_messages(messages), system_prompt, max_tokens)
+                )
+            response = await self._async_client.messages.create(
                 model=self.model,
-                tokens_used=response.usage.output_tokens if hasattr(response, 'usage') else None,
-                finish_reason=response.stop_reason
+                max_tokens=max_tokens,
+                temperature=temperature,
+                **_claude_payload(messages, system_prompt, cache_system)
             )
+            return self._claude_response(response)
+
+        response = await acall_with_retry(attempt, self.retry_policy, f"{self.provider.value} agenerate_messages")
+        self._account(response, estimate)
+
+        if cache_key:
+            await self.cache.aset(cache_key, response.to_dict())
+        return response
+
+    def _gemini_model(self, system_prompt: Optional[str]):
+        """
+        Gemini model for a messages call.
+
+        A system prompt becomes `system_instruction`, keeping it a stable
+        prefix that Gemini's implicit context caching can reuse.
+        """
+        if not system_prompt:
+            return self._client
+        return client_registry.get_gemini_model(self.model, settings.google_api_key, system_prompt)
+
+    def _gemini_response(self, response: Any) -> LLMResponse:
+        return self._response(
+            response.text,
+            response.candidates[0].finish_reason.name if response.candidates else None,
+            _gemini_usage(response)
+        )
+
+    def _claude_response(self, response: Any) -> LLMResponse:
+        return self._response(
+            response.content[0].text,
+            response.stop_reason,
+            _claude_usage(getattr(response, "usage", None))
+        )
+
+    def _messages_cache_key(
+        self,
+        messages: Sequence[Message],
+        system_prompt: Optional[str],
+        max_tokens: int,
+        temperature: float,
+        cache_system: bool,
+        options: Dict[str, Any]
+    ) -> Optional[str]:
+        prompt = json.dumps([m.to_dict() for m in messages], sort_keys=True)
+        return self._cache_key(prompt, f"{cache_system}:{system_prompt}", max_tokens, temperature, options)
+
+    def _cache_key(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        max_tokens: int,
+        temperature: float,
+        options: Dict[str, Any]
+    ) -> Optional[str]:
+        """Return the cache key for a request, or None if it must bypass the cache."""
+        if self.cache is None:
+            return None
+        if temperature > 0 and not options.get("force_cache", False):
+            return None
+        return make_cache_key(
+            self.provider.value, self.model, system_prompt, prompt, temperature, max_tokens
+        )
+
+    @staticmethod
+    def _should_coalesce(temperature: Optional[float], options: Dict[str, Any]) -> bool:
+        """
+        Whether identical in-flight calls may share one upstream request.
+
+        Same rule as the response cache: sharing a sampled (temperature > 0)
+        answer would hand every caller the same "random" draw, so only
+        deterministic requests coalesce unless the caller passes coalesce=True.
+        """
+        if options.get("coalesce") is not None:
+            return bool(options["coalesce"])
+        return settings.llm_coalesce_requests and temperature == 0
 
     async def astream(
         self,
@@ -222,26 +800,90 @@ class LLMClient:
     ) -> AsyncGenerator[str, None]:
         """
         Stream response chunks from the LLM (Asynchronous).
+
+        Transient failures are retried only until the first chunk is emitted.
+        Streams sample at the provider's default temperature, so they are
+        only coalesced (one upstream stream fanned out to every caller)
+        when coalesce=True is passed.
         """
+        if self._should_coalesce(None, kwargs):
+            flight_key = make_cache_key(
+                f"{self.provider.value}:stream", self.model, system_prompt, prompt, None, 2048
+            )
+            source = singleflight.stream(flight_key, lambda: self._astream_uncached(prompt, system_prompt))
+        else:
+            source = self._astream_uncached(prompt, system_prompt)
+        try:
+            async for chunk in source:
+                yield chunk
+        finally:
+            await source.aclose()
+
+    async def _astream_uncached(
+        self,
+        prompt: str,
+        system_prompt: Optional[str]
+    ) -> AsyncGenerator[str, None]:
+        """Upstream stream with rate limiting, retries, metering and timing."""
         self._init_async_client()
         if not self._async_client:
             raise RuntimeError(f"{self.provider.value} async client not initialized")
-            
+
+        estimate = estimate_tokens(prompt, system_prompt) + 2048
+        usage: Dict[str, int] = {}
+
+        async def attempt() -> AsyncGenerator[str, None]:
+            usage.clear()
+            await self.rate_limiter.aacquire(estimate)
+            async for chunk in self._astream_provider(prompt, system_prompt, usage):
+                yield chunk
+
+        timer = StreamTimer(self.provider.value, self.model)
+        status = "ok"
+        try:
+            async for chunk in aretry_stream(attempt, self.retry_policy, f"{self.provider.value} astream"):
+                timer.chunk(chunk)
+                yield chunk
+        except (GeneratorExit, asyncio.CancelledError):
+            status = "cancelled"
+            raise
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            self._record_usage(usage)
+            timer.finish(usage.get("output_tokens"), status)
+
+    async def _astream_provider(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        usage: Dict[str, int]
+    ) -> AsyncGenerator[str, None]:
+        """Single raw async provider stream; fills `usage` once it completes."""
         if self.provider == LLMProvider.GEMINI:
              full_prompt = f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
              response = await self._async_client.generate_content_async(full_prompt, stream=True)
+             last_chunk = None
              async for chunk in response:
+                 last_chunk = chunk
                  if chunk.text:
                      yield chunk.text
+             usage.update(_gemini_usage(last_chunk))
+        elif self.provider == LLMProvider.LOCAL_STUB:
+            async for text in self._async_client.astream(prompt, system_prompt, usage=usage):
+                yield text
         else:
             async with self._async_client.messages.stream(
                 model=self.model,
                 max_tokens=2048,
-                system=system_prompt or "You are a helpful AI assistant.",
+                system=system_prompt or DEFAULT_SYSTEM_PROMPT,
                 messages=[{"role": "user", "content": prompt}]
             ) as stream:
                 async for text in stream.text_stream:
                     yield text
+                final = await stream.get_final_message()
+                usage.update(_claude_usage(final.usage))
 
     def _generate_gemini(
         self,
@@ -261,12 +903,7 @@ class LLMClient:
             }
         )
 
-        return LLMResponse(
-            content=response.text,
-            provider=self.provider,
-            model=self.model,
-            finish_reason=response.candidates[0].finish_reason.name if response.candidates else None
-        )
+        return self._gemini_response(response)
 
     def _generate_claude(
         self,
@@ -282,17 +919,11 @@ class LLMClient:
             model=self.model,
             max_tokens=max_tokens,
             temperature=temperature,
-            system=system_prompt or "You are a helpful AI assistant.",
+            system=system_prompt or DEFAULT_SYSTEM_PROMPT,
             messages=messages
         )
 
-        return LLMResponse(
-            content=response.content[0].text,
-            provider=self.provider,
-            model=self.model,
-            tokens_used=response.usage.output_tokens if hasattr(response, 'usage') else None,
-            finish_reason=response.stop_reason
-        )
+        return self._claude_response(response)
 
     def stream(
         self,
@@ -304,38 +935,69 @@ class LLMClient:
         if not self.is_available():
             raise RuntimeError(f"{self.provider.value} client not initialized")
 
-        if self.provider == LLMProvider.GEMINI:
-            yield from self._stream_gemini(prompt, system_prompt)
-        else:
-            yield from self._stream_claude(prompt, system_prompt)
+        estimate = estimate_tokens(prompt, system_prompt) + 2048
+        usage: Dict[str, int] = {}
+
+        def attempt() -> Generator[str, None, None]:
+            usage.clear()
+            self.rate_limiter.acquire(estimate)
+            if self.provider == LLMProvider.GEMINI:
+                yield from self._stream_gemini(prompt, system_prompt, usage)
+            elif self.provider == LLMProvider.LOCAL_STUB:
+                yield from self._client.stream(prompt, system_prompt, usage=usage)
+            else:
+                yield from self._stream_claude(prompt, system_prompt, usage)
+
+        timer = StreamTimer(self.provider.value, self.model)
+        status = "ok"
+        try:
+            for chunk in retry_stream(attempt, self.retry_policy, f"{self.provider.value} stream"):
+                timer.chunk(chunk)
+                yield chunk
+        except GeneratorExit:
+            status = "cancelled"
+            raise
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            self._record_usage(usage)
+            timer.finish(usage.get("output_tokens"), status)
 
     def _stream_gemini(
         self,
         prompt: str,
-        system_prompt: Optional[str]
+        system_prompt: Optional[str],
+        usage: Dict[str, int]
     ) -> Generator[str, None, None]:
         """Stream response from Gemini."""
         full_prompt = f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
         response = self._client.generate_content(full_prompt, stream=True)
 
+        last_chunk = None
         for chunk in response:
+            last_chunk = chunk
             if chunk.text:
                 yield chunk.text
+        # usage_metadata on the final chunk covers the whole stream
+        usage.update(_gemini_usage(last_chunk))
 
     def _stream_claude(
         self,
         prompt: str,
-        system_prompt: Optional[str]
+        system_prompt: Optional[str],
+        usage: Dict[str, int]
     ) -> Generator[str, None, None]:
         """Stream response from Claude."""
         with self._client.messages.stream(
             model=self.model,
             max_tokens=2048,
-            system=system_prompt or "You are a helpful AI assistant.",
+            system=system_prompt or DEFAULT_SYSTEM_PROMPT,
             messages=[{"role": "user", "content": prompt}]
         ) as stream:
             for text in stream.text_stream:
                 yield text
+            usage.update(_claude_usage(stream.get_final_message().usage))
 
 
 def get_available_providers() -> Dict[str, bool]:
@@ -343,4 +1005,6 @@ def get_available_providers() -> Dict[str, bool]:
     providers = {}
     providers["gemini"] = bool(settings.google_api_key)
     providers["claude"] = bool(settings.anthropic_api_key and settings.anthropic_api_key.startswith("sk-ant-"))
+    if settings.enable_local_stub:
+        providers["local_stub"] = True
     return providers
\ No newline at end of file
@@ -0,0 +1,221 @@
+"""
+Provider Client Pool - Process-wide reuse of LLM SDK clients.
+
+Demonstrates:
+- Connection pooling with bounded keep-alive limits
+- Event-loop aware async client management
+- Explicit resource lifecycle (close / aclose)
+
+Every `LLMClient` used to build its own SDK client, paying TCP/TLS setup per
+request. The registry below hands out long-lived clients keyed by
+(provider, model, api key) so all callers share a single connection pool.
+"""
+import asyncio
+import atexit
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from core.config import settings
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+ClientKey = Tuple[str, str, str]
+
+# Gemini binds the system prompt to the model object; keep this many variants
+MAX_GEMINI_SYSTEM_MODELS = 64
+
+
+def _http_limits():
+    """Build the keep-alive limits shared by every pooled HTTP client."""
+    import httpx
+    return httpx.Limits(
+        max_connections=settings.llm_max_connections,
+        max_keepalive_connections=settings.llm_max_keepalive_connections,
+        keepalive_expiry=settings.llm_keepalive_expiry,
+    )
+
+
+class ClientRegistry:
+    """
+    Thread-safe registry of long-lived provider SDK clients.
+
+    Sync clients are shared process-wide. Async clients hold connections bound
+    to the event loop that created them, so they are additionally keyed by loop
+    and dropped once that loop is closed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sync_clients: Dict[ClientKey, Any] = {}
+        self._async_clients: Dict[Tuple[ClientKey, int], Tuple[weakref.ref, Any]] = {}
+        self._gemini_models: "OrderedDict[Tuple[ClientKey, str], Any]" = OrderedDict()
+
+    @staticmethod
+    def make_key(provider: str, model: str, api_key: Optional[str]) -> ClientKey:
+        """Registry key for a provider/model/credential combination."""
+        return (provider, model, api_key or "")
+
+    def get_client(self, provider: str, model: str, api_key: str) -> Any:
+        """
+        Return the shared synchronous client, creating it on first use.
+
+        Args:
+            provider: Provider value ("gemini" or "claude")
+            model: Model name
+            api_key: Credential used to build the client
+
+        Returns:
+            Provider SDK client instance
+        """
+        key = self.make_key(provider, model, api_key)
+        with self._lock:
+            client = self._sync_clients.get(key)
+            if client is None:
+                client = self._build_sync(provider, model, api_key)
+                self._sync_clients[key] = client
+                logger.info(f"Pooled {provider} client created for model: {model}")
+            return client
+
+    def get_async_client(self, provider: str, model: str, api_key: str) -> Any:
+        """
+        Return the shared async client for the running event loop.
+
+        Args:
+            provider: Provider value ("gemini" or "claude")
+            model: Model name
+            api_key: Credential used to build the client
+
+        Returns:
+            Provider SDK async client instance
+        """
+        if provider == "gemini":
+            # GenerativeModel exposes generate_content_async on the same object
+            return self.get_client(provider, model, api_key)
+
+        loop = asyncio.get_running_loop()
+        key = (self.make_key(provider, model, api_key), id(loop))
+        with self._lock:
+            self._prune_closed_loops()
+            entry = self._async_clients.get(key)
+            if entry is not None and entry[0]() is loop:
+                return entry[1]
+            client = self._build_async(provider, api_key)
+            self._async_clients[key] = (weakref.ref(loop), client)
+            logger.info(f"Pooled async {provider} client created for model: {model}")
+            return client
+
+    def get_gemini_model(self, model: str, api_key: str, system_instruction: str) -> Any:
+        """
+        Return a shared Gemini model bound to `system_instruction`.
+
+        Gemini takes the system prompt at construction time, so each distinct
+        prompt needs its own GenerativeModel. The most recently used
+        MAX_GEMINI_SYSTEM_MODELS are kept; all share the configured transport.
+
+        Args:
+            model: Model name
+            api_key: Credential used to configure the SDK
+            system_instruction: System prompt baked into the model
+
+        Returns:
+            google.generativeai GenerativeModel
+        """
+        key = (self.make_key("gemini", model, api_key), system_instruction)
+        with self._lock:
+            client = self._gemini_models.get(key)
+            if client is not None:
+                self._gemini_models.move_to_end(key)
+                return client
+            import google.generativeai as genai
+            genai.configure(api_key=api_key)
+            client = genai.GenerativeModel(model, system_instruction=system_instruction)
+            self._gemini_models[key] = client
+            while len(self._gemini_models) > MAX_GEMINI_SYSTEM_MODELS:
+                self._gemini_models.popitem(last=False)
+            return client
+
+    def _prune_closed_loops(self) -> None:
+        """Forget async clients whose event loop is gone or closed."""
+        stale = [
+            key for key, (loop_ref, _) in self._async_clients.items()
+            if loop_ref() is None or loop_ref().is_closed()
+        ]
+        for key in stale:
+            del self._async_clients[key]
+
+    def _build_sync(self, provider: str, model: str, api_key: str) -> Any:
+        """Construct a synchronous SDK client with pooled HTTP transport."""
+        if provider == "gemini":
+            import google.generativeai as genai
+            genai.configure(api_key=api_key)
+            return genai.GenerativeModel(model)
+
+        from anthropic import Anthropic, DefaultHttpxClient
+        return Anthropic(
+            api_key=api_key,
+            max_retries=0,  # Retries are handled by core.rate_limit
+            http_client=DefaultHttpxClient(
+                limits=_http_limits(),
+                timeout=settings.llm_request_timeout,
+            ),
+        )
+
+    def _build_async(self, provider: str, api_key: str) -> Any:
+        """Construct an async SDK client with pooled HTTP transport."""
+        from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
+        return AsyncAnthropic(
+            api_key=api_key,
+            max_retries=0,  # Retries are handled by core.rate_limit
+            http_client=DefaultAsyncHttpxClient(
+                limits=_http_limits(),
+                timeout=settings.llm_request_timeout,
+            ),
+        )
+
+    def close(self) -> None:
+        """Close all pooled sync clients and forget async ones."""
+        with self._lock:
+            clients = list(self._sync_clients.values())
+            self._sync_clients.clear()
+            self._async_clients.clear()
+            self._gemini_models.clear()
+        for client in clients:
+            close = getattr(client, "close", None)
+            if callable(close):
+                try:
+                    close()
+                except Exception as e:
+                    logger.warning(f"Error closing pooled client: {e}")
+
+    async def aclose(self) -> None:
+        """Close async clients owned by the running loop, then sync clients."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            owned = [
+                key for key, (loop_ref, _) in self._async_clients.items()
+                if loop_ref() is loop
+            ]
+            clients = [self._async_clients.pop(key)[1] for key in owned]
+        for client in clients:
+            try:
+                await client.close()
+            except Exception as e:
+                logger.warning(f"Error closing pooled async client: {e}")
+        self.close()
+
+    def stats(self) -> Dict[str, int]:
+        """Number of live pooled clients (useful for leak checks)."""
+        with self._lock:
+            return {
+                "sync": len(self._sync_clients),
+                "async": len(self._async_clients),
+                "gemini_system_models": len(self._gemini_models),
+            }
+
+
+# Global registry instance
+client_registry = ClientRegistry()
+atexit.register(client_registry.close)
@@ -0,0 +1,338 @@
+"""
+LLM Router - Provider failover and hedged requests.
+
+Demonstrates:
+- Ordered provider failover
+- Hedged (speculative) requests with p95-derived deadlines
+- Cancellation of the losing request
+
+A router wraps one `LLMClient` per provider and exposes the same
+generate/agenerate/astream surface, so callers can swap it in transparently.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncGenerator, Deque, Dict, List, Optional, Sequence, Union
+
+from core.config import settings
+from core.llm_client import LLMClient, LLMResponse
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class LatencyTracker:
+    """Rolling window of observed latencies per provider/operation."""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, key: str, p: float) -> Optional[float]:
+        """Return the p-th percentile, or None until enough samples exist."""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < settings.llm_hedge_min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(round(p * (len(samples) - 1))))]
+
+
+# Global tracker shared by all routers
+latency_tracker = LatencyTracker()
+
+
+class LLMRouter:
+    """
+    Routes requests across an ordered list of providers.
+
+    Errors fail over to the next provider. With hedging enabled, a duplicate
+    request is sent to the second provider if the first has not answered
+    (or, for streams, produced its first token) by its p95 latency; the
+    slower request is cancelled.
+    """
+
+    def __init__(
+        self,
+        providers: Sequence[Union[str, LLMClient]],
+        hedge: Optional[bool] = None,
+        **client_kwargs
+    ):
+        """
+        Initialize the router.
+
+        Args:
+            providers: Ordered provider names (or pre-built LLMClient instances)
+            hedge: Enable hedged requests. Defaults to settings.llm_hedge_requests.
+            client_kwargs: Passed to each LLMClient built from a provider name
+        """
+        if not providers:
+            raise ValueError("LLMRouter requires at least one provider")
+        self.clients: List[LLMClient] = [
+            p if isinstance(p, LLMClient) else LLMClient(provider=p, **client_kwargs)
+            for p in providers
+        ]
+        self.hedge = settings.llm_hedge_requests if hedge is None else hedge
+
+    @property
+    def primary(self) -> LLMClient:
+        return self.clients[0]
+
+    @property
+    def provider(self):
+        return self.primary.provider
+
+    @property
+    def model(self) -> str:
+        return self.primary.model
+
+    def is_available(self) -> bool:
+        return any(client.is_available() for client in self.clients)
+
+    def get_langchain_model(self, **kwargs):
+        """LangChain runnable that falls back across providers in order."""
+        models = []
+        for client in self.clients:
+            try:
+                models.append(client.get_langchain_model(**kwargs))
+            except ValueError as e:
+                logger.warning(f"Skipping {client.provider.value} for LangChain routing: {e}")
+        if not models:
+            raise ValueError("No configured provider in routing list")
+        if len(models) == 1:
+            return models[0]
+        return models[0].with_fallbacks(models[1:])
+
+    def hedge_deadline(self, client: LLMClient, operation: str) -> float:
+        """Seconds to wait on `client` before hedging (p95 or configured default)."""
+        p95 = latency_tracker.percentile(_tracker_key(client, operation), 0.95)
+        return p95 if p95 is not None else settings.llm_hedge_delay
+
+    def generate(self, prompt: str, **kwargs) -> LLMResponse:
+        """Synchronous generation with ordered failover."""
+        last_error: Optional[Exception] = None
+        for client in self.clients:
+            try:
+                return client.generate(prompt, **kwargs)
+            except Exception as e:
+                last_error = e
+                logger.warning(f"{client.provider.value} failed, failing over: {e}")
+        raise last_error
+
+    def stream(self, prompt: str, **kwargs):
+        """Synchronous streaming with failover before the first chunk."""
+        last_error: Optional[Exception] = None
+        for client in self.clients:
+            started = False
+            try:
+                for chunk in client.stream(prompt, **kwargs):
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                if started:
+                    raise
+                last_error = e
+                logger.warning(f"{client.provider.value} stream failed, failing over: {e}")
+        raise last_error
+
+    async def agenerate(self, prompt: str, **kwargs) -> LLMResponse:
+        """Async generation with failover and optional hedging."""
+        remaining = list(self.clients)
+        last_error: Optional[Exception] = None
+
+        if self.hedge and len(remaining) >= 2:
+            primary, secondary = remaining.pop(0), remaining.pop(0)
+            try:
+                return await self._hedged_generate(primary, secondary, prompt, **kwargs)
+            except Exception as e:
+                last_error = e
+
+        for client in remaining:
+            try:
+                return await self._timed_generate(client, prompt, **kwargs)
+            except Exception as e:
+                last_error = e
+                logger.warning(f"{client.provider.value} failed, failing over: {e}")
+        raise last_error
+
+    async def _timed_generate(self, client: LLMClient, prompt: str, **kwargs) -> LLMResponse:
+        start = time.perf_counter()
+        try:
+            response = await client.agenerate(prompt, **kwargs)
+        except asyncio.CancelledError:
+            # A cancelled (losing) request took at least this long; dropping it
+            # would bias the p95 downward and make hedging fire ever sooner
+            latency_tracker.record(_tracker_key(client, "generate"), time.perf_counter() - start)
+            raise
+        latency_tracker.record(_tracker_key(client, "generate"), time.perf_counter() - start)
+        return response
+
+    async def _hedged_generate(
+        self,
+        primary: LLMClient,
+        secondary: LLMClient,
+        prompt: str,
+        **kwargs
+    ) -> LLMResponse:
+        """Race primary against a delayed hedge on secondary; first success wins."""
+        first = asyncio.create_task(self._timed_generate(primary, prompt, **kwargs))
+        try:
+            done, _ = await asyncio.wait({first}, timeout=self.hedge_deadline(primary, "generate"))
+        except asyncio.CancelledError:
+            first.cancel()
+            raise
+        if done and not first.exception():
+            return first.result()
+
+        logger.info(f"Hedging {primary.provider.value} request to {secondary.provider.value}")
+        pending = {first, asyncio.create_task(self._timed_generate(secondary, prompt, **kwargs))}
+        if done:
+            # Primary already failed: this is plain failover
+            pending.discard(first)
+        return await _first_success(pending)
+
+    async def astream(self, prompt: str, **kwargs) -> AsyncGenerator[str, None]:
+        """
+        Async streaming with failover before the first chunk.
+
+        With hedging enabled, the second provider is started if the first has
+        not produced a token within its p95 time-to-first-token.
+        """
+        remaining = list(self.clients)
+        last_error: Optional[Exception] = None
+
+        while remaining:
+            client = remaining.pop(0)
+            hedge_client = remaining.pop(0) if self.hedge and remaining else None
+            try:
+                stream, first_chunk = await self._open_stream(client, hedge_client, prompt, **kwargs)
+            except Exception as e:
+                last_error = e
+                logger.warning(f"Stream open failed, failing over: {e}")
+                continue
+            try:
+                if first_chunk is None:
+                    return
+                yield first_chunk
+                async for chunk in stream:
+                    yield chunk
+                return
+            finally:
+                # Also runs when the consumer stops early, releasing the provider stream
+                await stream.aclose()
+        raise last_error
+
+    async def _open_stream(
+        self,
+        client: LLMClient,
+        hedge_client: Optional[LLMClient],
+        prompt: str,
+        **kwargs
+    ):
+        """Return (stream, first_chunk) from the fastest provider to emit a token."""
+        candidates = {}
+
+        def start(c: LLMClient) -> None:
+            stream = c.astream(prompt, **kwargs)
+            task = asyncio.create_task(_first_token(c, stream))
+            candidates[task] = stream
+
+        start(client)
+        if hedge_client is not None:
+            done, _ = await asyncio.wait(set(candidates), timeout=self.hedge_deadline(client, "ttft"))
+            if not done or next(iter(done)).exception():
+                logger.info(f"Hedging {client.provider.value} stream to {hedge_client.provider.value}")
+                start(hedge_client)
+
+        winner = None
+        errors = []
+        try:
+            pending = set(candidates)
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and winner is None:
+                        winner = task
+                    elif task.exception() is not None:
+                        errors.append(task.exception())
+        finally:
+            for task, stream in candidates.items():
+                if task is not winner:
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+                    await _close_quietly(stream)
+
+        if winner is None:
+            raise errors[-1]
+        return candidates[winner], winner.result()
+
+
+def _tracker_key(client: LLMClient, operation: str) -> str:
+    return f"{client.provider.value}:{client.model}:{operation}"
+
+
+async def _first_token(client: LLMClient, stream) -> Optional[str]:
+    """Await the first chunk of a stream (None if it ended empty), recording TTFT."""
+    start = time.perf_counter()
+    try:
+        chunk = await stream.__anext__()
+    except StopAsyncIteration:
+        chunk = None
+    except asyncio.CancelledError:
+        # Lower bound for a cancelled hedge loser (see LLMRouter._timed_generate)
+        latency_tracker.record(_tracker_key(client, "ttft"), time.perf_counter() - start)
+        raise
+    latency_tracker.record(_tracker_key(client, "ttft"), time.perf_counter() - start)
+    return chunk
+
+
+async def _close_quietly(stream) -> None:
+    try:
+        await stream.aclose()
+    except BaseException:
+        pass
+
+
+async def _first_success(tasks) -> Any:
+    """Return the first successful task result, cancelling the rest."""
+    pending = set(tasks)
+    last_error: Optional[BaseException] = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                last_error = task.exception()
+        raise last_error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def build_llm_client(
+    provider: Optional[str] = None,
+    fallback_providers: Optional[Sequence[str]] = None,
+    hedge: Optional[bool] = None,
+    **client_kwargs
+) -> Union[LLMClient, LLMRouter]:
+    """
+    Build a plain client, or a router when fallback providers are configured.
+
+    Args:
+        provider: Primary provider. Defaults to settings.default_llm_provider.
+        fallback_providers: Ordered fallbacks. Defaults to settings.llm_fallback_providers.
+        hedge: Enable hedged requests. Defaults to settings.llm_hedge_requests.
+    """
+    primary = provider or settings.default_llm_provider
+    fallbacks = settings.llm_fallback_providers if fallback_providers is None else fallback_providers
+    chain = [primary] + [p for p in fallbacks if p != primary]
+    if len(chain) == 1:
+        return LLMClient(provider=primary, **client_kwargs)
+    return LLMRouter(chain, hedge=hedge, **client_kwargs)
@@ -0,0 +1,86 @@
+"""
+Local Embeddings - CPU-only feature-hashing embedder.
+
+Demonstrates:
+- The hashing trick (signed feature hashing into a fixed dimension)
+- Word, word-bigram and character n-gram features (robust to typos/morphology)
+- A fully vectorized NumPy batch path
+
+Quality is well below a neural model, but it needs no network, no API key
+and no model download, which makes it a good fit for development, tests
+and low-stakes collections. Vectors are deterministic across processes.
+"""
+import re
+import zlib
+from functools import lru_cache
+from typing import List, Sequence
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _crc(feature: str) -> int:
+    # zlib.crc32 is stable across processes, unlike the salted built-in hash()
+    return zlib.crc32(feature.encode("utf-8"))
+
+
+@lru_cache(maxsize=100_000)
+def _word_hashes(word: str, min_n: int, max_n: int) -> np.ndarray:
+    """Hashes for a word and its character n-grams (cached: words repeat a lot)."""
+    padded = f"<{word}>"
+    features = [f"w:{word}"]
+    for n in range(min_n, max_n + 1):
+        features.extend(f"c:{padded[i:i + n]}" for i in range(len(padded) - n + 1))
+    return np.fromiter((_crc(f) for f in features), dtype=np.uint32, count=len(features))
+
+
+class HashingEmbedder:
+    """
+    Signed feature-hashing embedder with sublinear term frequency.
+
+    Exposes the same `embed_documents` / `embed_query` methods as LangChain
+    embedding clients so it can stand in for them inside EmbeddingModel.
+
+    Args:
+        dim: Output dimension
+        min_n: Smallest character n-gram
+        max_n: Largest character n-gram
+    """
+
+    def __init__(self, dim: int = 384, min_n: int = 3, max_n: int = 5):
+        self.dim = dim
+        self.min_n = min_n
+        self.max_n = max_n
+
+    def _hashes(self, text: str) -> np.ndarray:
+        words = _TOKEN_RE.findall(text.lower())
+        parts = [_word_hashes(w, self.min_n, self.max_n) for w in words]
+        bigrams = [_crc(f"b:{a} {b}") for a, b in zip(words, words[1:])]
+        if bigrams:
+            parts.append(np.asarray(bigrams, dtype=np.uint32))
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.uint32)
+
+    def embed_array(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed `texts` into an (n, dim) float32 matrix of unit vectors."""
+        hashes = [self._hashes(t) for t in texts]
+        rows = np.repeat(np.arange(len(texts)), [len(h) for h in hashes])
+        flat = np.concatenate(hashes) if hashes else np.empty(0, dtype=np.uint32)
+
+        columns = (flat % self.dim).astype(np.intp)
+        # The top bit picks the sign, so collisions tend to cancel out
+        signs = np.where(flat >> 31, 1.0, -1.0).astype(np.float32)
+
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        np.add.at(matrix, (rows, columns), signs)
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_array([text])[0].tolist()
@@ -0,0 +1,316 @@
+"""
+Local Stub Provider - Deterministic offline LLM for load and latency benchmarks.
+
+Demonstrates:
+- Reproducible synthetic completions (content derived from a prompt hash)
+- Configurable latency distributions, token rates and error injection
+- A LangChain `BaseChatModel` with tool calling, so graphs run without keys
+
+Select it with `LLMClient(provider="local_stub")`. Nothing leaves the process,
+which makes throughput numbers for the API, graphs and Celery path
+comparable from run to run.
+"""
+import asyncio
+import hashlib
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from core.config import settings
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_VOCABULARY = (
+    "agent", "analysis", "signal", "market", "latency", "vector", "context", "model",
+    "evidence", "risk", "strategy", "pipeline", "insight", "token", "summary", "growth",
+    "data", "retrieval", "system", "quality", "cost", "throughput", "report", "trend",
+)
+
+
+class StubProviderError(Exception):
+    """Injected provider failure (status codes mirror real overload/rate-limit errors)."""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@dataclass
+class StubConfig:
+    """Behaviour knobs for the stub provider (defaults come from settings)."""
+    latency_ms: float = field(default_factory=lambda: settings.stub_latency_ms)
+    latency_distribution: str = field(default_factory=lambda: settings.stub_latency_distribution)
+    latency_jitter: float = field(default_factory=lambda: settings.stub_latency_jitter)
+    tokens_per_second: float = field(default_factory=lambda: settings.stub_tokens_per_second)
+    response_tokens: int = field(default_factory=lambda: settings.stub_response_tokens)
+    error_rate: float = field(default_factory=lambda: settings.stub_error_rate)
+    seed: int = field(default_factory=lambda: settings.stub_seed)
+
+
+@dataclass
+class StubPlan:
+    """Everything needed to replay one synthetic completion."""
+    tokens: List[str]
+    first_token_delay: float
+    token_interval: float
+    error: Optional[StubProviderError]
+    usage: Dict[str, int]
+
+    @property
+    def text(self) -> str:
+        return "".join(self.tokens)
+
+
+class LocalStubEngine:
+    """
+    Synthetic completion engine.
+
+    Content depends only on the prompt, so identical prompts always produce
+    identical text. Latency and error sampling use a seeded RNG shared by all
+    callers of the same engine, so a fixed request sequence is reproducible.
+    """
+
+    def __init__(self, model: str, config: Optional[StubConfig] = None):
+        self.model = model
+        self.config = config or StubConfig()
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+
+    def _sample_latency(self) -> float:
+        base = self.config.latency_ms / 1000.0
+        jitter = self.config.latency_jitter
+        dist = self.config.latency_distribution
+        with self._lock:
+            if dist == "uniform":
+                return max(0.0, self._rng.uniform(base * (1 - jitter), base * (1 + jitter)))
+            if dist == "lognormal" and base > 0:
+                # Median equals latency_ms; jitter is the log-space sigma
+                return self._rng.lognormvariate(0.0, jitter) * base
+            return base
+
+    def _sample_error(self) -> Optional[StubProviderError]:
+        with self._lock:
+            if self._rng.random() >= self.config.error_rate:
+                return None
+            status = self._rng.choice((429, 529))
+        return StubProviderError(status, f"local_stub injected error (status {status})")
+
+    def plan(self, prompt: str, system_prompt: Optional[str] = None, max_tokens: int = 2048) -> StubPlan:
+        """Decide content, timing and failure for one request."""
+        digest = hashlib.sha256(f"{system_prompt or ''}\x00{prompt}".encode("utf-8")).digest()
+        content_rng = random.Random(digest)
+        count = max(1, min(self.config.response_tokens, max_tokens))
+        tokens = [content_rng.choice(_VOCABULARY) + " " for _ in range(count)]
+        tokens[-1] = tokens[-1].rstrip() + "."
+
+        rate = self.config.tokens_per_second
+        return StubPlan(
+            tokens=tokens,
+            first_token_delay=self._sample_latency(),
+            token_interval=1.0 / rate if rate > 0 else 0.0,
+            error=self._sample_error(),
+            usage={
+                "input_tokens": max(1, (len(prompt) + len(system_prompt or "")) // 4),
+                "output_tokens": count,
+                "cached_tokens": 0,
+            },
+        )
+
+    def _result(self, plan: StubPlan) -> Dict[str, Any]:
+        finish = "max_tokens" if plan.usage["output_tokens"] < self.config.response_tokens else "end_turn"
+        return {"content": plan.text, "finish_reason": finish, "usage": dict(plan.usage)}
+
+    def generate(self, prompt: str, system_prompt: Optional[str] = None, max_tokens: int = 2048) -> Dict[str, Any]:
+        plan = self.plan(prompt, system_prompt, max_tokens)
+        time.sleep(plan.first_token_delay + plan.token_interval * (len(plan.tokens) - 1))
+        if plan.error:
+            raise plan.error
+        return self._result(plan)
+
+    async def agenerate(self, prompt: str, system_prompt: Optional[str] = None, max_tokens: int = 2048) -> Dict[str, Any]:
+        plan = self.plan(prompt, system_prompt, max_tokens)
+        await asyncio.sleep(plan.first_token_delay + plan.token_interval * (len(plan.tokens) - 1))
+        if plan.error:
+            raise plan.error
+        return self._result(plan)
+
+    def stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        max_tokens: int = 2048,
+        usage: Optional[Dict[str, int]] = None
+    ) -> Iterator[str]:
+        plan = self.plan(prompt, system_prompt, max_tokens)
+        time.sleep(plan.first_token_delay)
+        if plan.error:
+            raise plan.error
+        for i, token in enumerate(plan.tokens):
+            if i:
+                time.sleep(plan.token_interval)
+            yield token
+        if usage is not None:
+            usage.update(plan.usage)
+
+    async def astream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        max_tokens: int = 2048,
+        usage: Optional[Dict[str, int]] = None
+    ) -> AsyncIterator[str]:
+        plan = self.plan(prompt, system_prompt, max_tokens)
+        await asyncio.sleep(plan.first_token_delay)
+        if plan.error:
+            raise plan.error
+        for i, token in enumerate(plan.tokens):
+            if i:
+                await asyncio.sleep(plan.token_interval)
+            yield token
+        if usage is not None:
+            usage.update(plan.usage)
+
+
+_engines: Dict[str, LocalStubEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_stub_engine(model: str) -> LocalStubEngine:
+    """Return the shared engine for `model` (one RNG stream per model)."""
+    with _engines_lock:
+        engine = _engines.get(model)
+        if engine is None:
+            engine = _engines[model] = LocalStubEngine(model)
+        return engine
+
+
+def _message_text(message: BaseMessage) -> str:
+    content = message.content
+    if isinstance(content, str):
+        return content
+    return " ".join(block.get("text", "") for block in content if isinstance(block, dict))
+
+
+def _fill_args(parameters: Dict[str, Any], text: str) -> Dict[str, Any]:
+    """Deterministic arguments that satisfy a JSON schema's required fields."""
+    defaults = {"integer": 1, "number": 1.0, "boolean": True, "array": [], "object": {}}
+    args = {}
+    properties = parameters.get("properties", {})
+    for name in parameters.get("required", list(properties)):
+        kind = properties.get(name, {}).get("type", "string")
+        args[name] = text[:200] if kind == "string" else defaults.get(kind)
+    return args
+
+
+class StubChatModel(BaseChatModel):
+    """
+    LangChain chat model backed by `LocalStubEngine`.
+
+    When tools are bound, the model calls the first (or forced) tool once per
+    human turn, then answers after the tool result arrives. This exercises
+    ToolNode loops in the LangGraph agents without any network access.
+    """
+
+    model: str = "local-stub-1"
+    temperature: float = 0.0
+    max_tokens: int = 2048
+
+    @property
+    def _llm_type(self) -> str:
+        return "local_stub"
+
+    @property
+    def _engine(self) -> LocalStubEngine:
+        return get_stub_engine(self.model)
+
+    def bind_tools(self, tools: Sequence[Any], tool_choice: Optional[Any] = None, **kwargs):
+        formatted = [convert_to_openai_tool(t) for t in tools]
+        if tool_choice and tool_choice not in ("auto", "none", "any", True):
+            kwargs["tool_choice"] = tool_choice
+        elif tool_choice in ("any", True) and formatted:
+            kwargs["tool_choice"] = formatted[0]["function"]["name"]
+        return self.bind(tools=formatted, **kwargs)
+
+    def _tool_call(self, messages: List[BaseMessage], tools: Optional[List[Dict]], tool_choice: Any) -> Optional[AIMessage]:
+        if not tools:
+            return None
+        forced = tool_choice if isinstance(tool_choice, str) else None
+        if isinstance(tool_choice, dict):
+            forced = tool_choice.get("function", {}).get("name") or tool_choice.get("name")
+        if not forced and messages and isinstance(messages[-1], ToolMessage):
+            return None  # Tool already answered this turn
+        spec = next((t for t in tools if t["function"]["name"] == forced), tools[0])["function"]
+        human = next((m for m in reversed(messages) if isinstance(m, HumanMessage)), messages[-1])
+        call_id = "call_" + uuid.uuid5(uuid.NAMESPACE_OID, _message_text(human) + spec["name"]).hex[:12]
+        return AIMessage(
+            content="",
+            tool_calls=[{
+                "name": spec["name"],
+                "args": _fill_args(spec.get("parameters", {}), _message_text(human)),
+                "id": call_id,
+            }],
+        )
+
+    def _prompt(self, messages: List[BaseMessage]) -> str:
+        return "\n".join(f"{m.type}: {_message_text(m)}" for m in messages)
+
+    @staticmethod
+    def _usage_metadata(usage: Dict[str, int]) -> Dict[str, int]:
+        return {
+            "input_tokens": usage["input_tokens"],
+            "output_tokens": usage["output_tokens"],
+            "total_tokens": usage["input_tokens"] + usage["output_tokens"],
+        }
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        tool_message = self._tool_call(messages, kwargs.get("tools"), kwargs.get("tool_choice"))
+        if tool_message is not None:
+            return ChatResult(generations=[ChatGeneration(message=tool_message)])
+        result = self._engine.generate(self._prompt(messages), max_tokens=self.max_tokens)
+        message = AIMessage(content=result["content"], usage_metadata=self._usage_metadata(result["usage"]))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        tool_message = self._tool_call(messages, kwargs.get("tools"), kwargs.get("tool_choice"))
+        if tool_message is not None:
+            return ChatResult(generations=[ChatGeneration(message=tool_message)])
+        result = await self._engine.agenerate(self._prompt(messages), max_tokens=self.max_tokens)
+        message = AIMessage(content=result["content"], usage_metadata=self._usage_metadata(result["usage"]))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> Iterator[ChatGenerationChunk]:
+        usage: Dict[str, int] = {}
+        for token in self._engine.stream(self._prompt(messages), max_tokens=self.max_tokens, usage=usage):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage_metadata(usage)))
@@ -0,0 +1,185 @@
+"""
+Metadata Index - Secondary indexes for selective filtered search.
+
+Demonstrates:
+- Inverted indexes from (metadata key, value) to document ids
+- Filter planning: answer `where` clauses from the index when possible
+- SQLite persistence next to the vector store, like the BM25 index
+
+ANN indexes filter *after* graph traversal, so a filter matching 0.1% of
+the collection often returns fewer than `n_results` hits. When this index
+shows a filter is that selective, VectorStore scores the matching subset
+exactly instead (see `VectorStore._prefiltered_query`).
+"""
+import json
+import os
+import sqlite3
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Optional, Sequence, Set
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_RANGE_OPS = {
+    "$gt": lambda a, b: a > b,
+    "$gte": lambda a, b: a >= b,
+    "$lt": lambda a, b: a < b,
+    "$lte": lambda a, b: a <= b,
+}
+
+
+class MetadataIndex:
+    """
+    Thread-safe value -> ids index over a fixed set of metadata keys.
+
+    Args:
+        keys: Metadata keys to index (others are ignored)
+        path: SQLite file (None keeps the index in memory only)
+    """
+
+    def __init__(self, keys: Sequence[str], path: Optional[str] = None):
+        self.keys = frozenset(keys)
+        self.path = path
+        self._values: Dict[str, Dict[Any, Set[str]]] = defaultdict(lambda: defaultdict(set))
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            # One row per document; `fields` holds its indexed key/value pairs as JSON
+            self._db.execute("CREATE TABLE IF NOT EXISTS docs (doc_id TEXT PRIMARY KEY, fields TEXT NOT NULL)")
+            self._db.commit()
+            self._load()
+
+    def reload(self) -> None:
+        """Re-read the SQLite file, picking up writes made through other instances."""
+        with self._lock:
+            if self._db is None:
+                return
+            self._values.clear()
+            self._docs.clear()
+            self._load()
+
+    def _load(self) -> None:
+        for doc_id, fields in self._db.execute("SELECT doc_id, fields FROM docs"):
+            self._index_locked(doc_id, json.loads(fields))
+
+    def _index_locked(self, doc_id: str, fields: Dict[str, Any]) -> None:
+        self._docs[doc_id] = fields
+        for key, value in fields.items():
+            self._values[key][value].add(doc_id)
+
+    def _fields(self, metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            k: v for k, v in (metadata or {}).items()
+            if k in self.keys and isinstance(v, (str, int, float, bool))
+        }
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, ids: Sequence[str], metadatas: Sequence[Optional[Dict[str, Any]]]) -> None:
+        with self._lock:
+            self._remove_locked([i for i in ids if i in self._docs])
+            rows = []
+            for doc_id, metadata in zip(ids, metadatas):
+                fields = self._fields(metadata)
+                self._index_locked(doc_id, fields)
+                rows.append((doc_id, json.dumps(fields)))
+            if self._db is not None:
+                self._db.executemany("INSERT OR REPLACE INTO docs VALUES (?, ?)", rows)
+                self._db.commit()
+
+    def remove(self, ids: Iterable[str]) -> None:
+        with self._lock:
+            self._remove_locked([i for i in ids if i in self._docs])
+
+    def _remove_locked(self, ids: Sequence[str]) -> None:
+        if not ids:
+            return
+        for doc_id in ids:
+            for key, value in self._docs.pop(doc_id).items():
+                bucket = self._values[key]
+                bucket[value].discard(doc_id)
+                if not bucket[value]:
+                    del bucket[value]
+        if self._db is not None:
+            self._db.executemany("DELETE FROM docs WHERE doc_id = ?", [(i,) for i in ids])
+            self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+            self._docs.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM docs")
+                self._db.commit()
+
+    def candidates(self, where: Optional[Dict[str, Any]]) -> Optional[Set[str]]:
+        """
+        Ids that may match `where` (a superset of the true matches).
+
+        Returns None when the filter cannot be narrowed by indexed keys,
+        in which case the caller should fall back to a full search.
+        """
+        if not where:
+            return None
+        with self._lock:
+            return self._plan(where)
+
+    def _plan(self, where: Dict[str, Any]) -> Optional[Set[str]]:
+        parts = []
+        for key, condition in where.items():
+            if key == "$and":
+                parts.extend(self._plan(clause) for clause in condition)
+            elif key == "$or":
+                branches = [self._plan(clause) for clause in condition]
+                # A single unindexable branch could match anything
+                parts.append(None if any(b is None for b in branches) else set().union(*branches))
+            else:
+                parts.append(self._plan_field(key, condition))
+        narrowed = [p for p in parts if p is not None]
+        if not narrowed:
+            return None
+        # Unindexed parts of an AND are re-checked later, so intersecting the rest is safe
+        result = set(min(narrowed, key=len))
+        for part in narrowed:
+            result &= part
+        return result
+
+    def _plan_field(self, key: str, condition: Any) -> Optional[Set[str]]:
+        if key not in self.keys:
+            return None
+        bucket = self._values.get(key, {})
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        matched: Optional[Set[str]] = None
+        for op, operand in condition.items():
+            if op == "$eq":
+                ids = set(bucket.get(operand, ()))
+            elif op == "$in":
+                ids = set().union(*(bucket.get(v, ()) for v in operand)) if operand else set()
+            elif op in _RANGE_OPS:
+                compare = _RANGE_OPS[op]
+                ids = set()
+                for value, members in bucket.items():
+                    try:
+                        if not isinstance(value, bool) and compare(value, operand):
+                            ids |= members
+                    except TypeError:
+                        continue
+            else:
+                # $ne / $nin match most of the collection; not worth planning
+                return None
+            matched = ids if matched is None else matched & ids
+        return matched
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,174 @@
+"""
+Metrics - In-process histograms and streaming latency instrumentation.
+
+Demonstrates:
+- Fixed-bucket latency histograms (Prometheus-compatible exposition)
+- Time-to-first-token (TTFT), inter-chunk gap and throughput tracking
+- Correlation-id tagged stream summaries in logs
+"""
+import bisect
+import threading
+import time
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+RATE_BUCKETS = (1, 5, 10, 25, 50, 100, 200, 400, 800)
+
+LabelSet = FrozenSet[Tuple[str, str]]
+
+
+class Histogram:
+    """Thread-safe cumulative histogram with fixed upper bounds."""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._sum += value
+            self._count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate quantile (upper bound of the bucket containing it)."""
+        with self._lock:
+            if not self._count:
+                return None
+            target = q * self._count
+            running = 0
+            for i, count in enumerate(self._counts):
+                running += count
+                if running >= target:
+                    return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return None
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            counts, total, n = list(self._counts), self._sum, self._count
+        cumulative, running = {}, 0
+        for bound, count in zip(list(self.buckets) + ["+Inf"], counts):
+            running += count
+            cumulative[str(bound)] = running
+        return {
+            "count": n,
+            "sum": round(total, 6),
+            "mean": round(total / n, 6) if n else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": cumulative,
+        }
+
+
+class MetricsRegistry:
+    """Named, labelled histograms shared across the process."""
+
+    def __init__(self):
+        self._histograms: Dict[Tuple[str, LabelSet], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(
+        self,
+        name: str,
+        labels: Optional[Dict[str, str]] = None,
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        key = (name, frozenset((labels or {}).items()))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram(buckets)
+            return hist
+
+    def observe(self, name: str, value: float, buckets: Sequence[float] = LATENCY_BUCKETS, **labels) -> None:
+        self.histogram(name, labels, buckets).observe(value)
+
+    def snapshot(self, prefix: Optional[str] = None) -> List[Dict[str, object]]:
+        """JSON-friendly view of every histogram (optionally filtered by name prefix)."""
+        with self._lock:
+            items = list(self._histograms.items())
+        return [
+            {"name": name, "labels": dict(labels), **hist.snapshot()}
+            for (name, labels), hist in sorted(items, key=lambda kv: kv[0][0])
+            if prefix is None or name.startswith(prefix)
+        ]
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format."""
+        lines = []
+        for entry in self.snapshot():
+            label_str = ",".join(f'{k}="{v}"' for k, v in sorted(entry["labels"].items()))
+            sep = "," if label_str else ""
+            for bound, count in entry["buckets"].items():
+                lines.append(f'{entry["name"]}_bucket{{{label_str}{sep}le="{bound}"}} {count}')
+            lines.append(f'{entry["name"]}_sum{{{label_str}}} {entry["sum"]}')
+            lines.append(f'{entry["name"]}_count{{{label_str}}} {entry["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+
+# Global registry instance
+metrics_registry = MetricsRegistry()
+
+
+class StreamTimer:
+    """
+    Records streaming performance for one response.
+
+    Call `chunk()` for every emitted chunk and `finish()` exactly once.
+    """
+
+    def __init__(self, provider: str, model: str, registry: Optional[MetricsRegistry] = None):
+        self.labels = {"provider": provider, "model": model}
+        self.registry = registry or metrics_registry
+        self.start = time.perf_counter()
+        self.ttft: Optional[float] = None
+        self.chunks = 0
+        self.chars = 0
+        self.max_gap = 0.0
+        self._last = self.start
+        self._finished = False
+
+    def chunk(self, text: str) -> None:
+        now = time.perf_counter()
+        if self.ttft is None:
+            self.ttft = now - self.start
+            self.registry.observe("llm_stream_ttft_seconds", self.ttft, **self.labels)
+        else:
+            gap = now - self._last
+            self.max_gap = max(self.max_gap, gap)
+            self.registry.observe("llm_stream_inter_chunk_seconds", gap, **self.labels)
+        self._last = now
+        self.chunks += 1
+        self.chars += len(text or "")
+
+    def finish(self, output_tokens: Optional[int] = None, status: str = "ok") -> None:
+        if self._finished:
+            return
+        self._finished = True
+        duration = time.perf_counter() - self.start
+        # Fall back to a ~4 chars/token estimate when the provider reports no usage
+        tokens = output_tokens if output_tokens else self.chars / 4
+        generation_time = duration - (self.ttft or 0.0)
+        tokens_per_sec = tokens / generation_time if generation_time > 0 else 0.0
+
+        self.registry.observe("llm_stream_duration_seconds", duration, status=status, **self.labels)
+        if self.chunks:
+            self.registry.observe("llm_stream_tokens_per_second", tokens_per_sec, RATE_BUCKETS, **self.labels)
+
+        ttft = f"{self.ttft:.3f}s" if self.ttft is not None else "n/a"
+        logger.info(
+            f"STREAM | {self.labels['provider']}/{self.labels['model']} | status={status} "
+            f"ttft={ttft} duration={duration:.3f}s chunks={self.chunks} "
+            f"max_gap={self.max_gap:.3f}s tokens/s={tokens_per_sec:.1f}"
+        )
@@ -2,25 +2,64 @@
 RAG Engine - Vector Database and Retrieval Logic.
 
 Demonstrates:
-- ChromaDB integration
+- ChromaDB integration, plus in-process NumPy/IVF backends (core/vector_backends.py)
 - Semantic search implementation
+- BM25 keyword search and Reciprocal Rank Fusion (hybrid)
+- Versioned LRU cache of search results (version shared per collection)
+- MMR diversity reranking with near-duplicate collapsing (core/diversity.py)
+- Metadata secondary indexes for exact search under selective filters
 - Document management
 """
+import asyncio
+import dataclasses
+import json
 import os
 import shutil
-from typing import List, Optional, Dict, Any
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Dict, Any, Tuple
 from dataclasses import dataclass
 import uuid
 
-import chromadb
-from chromadb.config import Settings
+import numpy as np
 
-from core.embeddings import EmbeddingModel
+from core.bm25 import RRF_K, BM25Index, reciprocal_rank_fusion
+from core.config import settings
+from core.diversity import collapse_near_duplicates, mmr
+from core.embedding_cache import content_hash
+from core.embeddings import EmbeddingModel, get_embedding_model
+from core.llm_cache import CacheStats
+from core.metadata_index import MetadataIndex
+from core.vector_backends import BACKENDS, VectorBackend, create_backend, exact_query
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 
+def content_id(text: str, source: str = "unknown", page: Optional[Any] = None) -> str:
+    """
+    Deterministic chunk id from the chunk's text and location.
+
+    Identical text on two pages of one source (a repeated disclaimer or
+    table header) gets two rows, so each page stays retrievable and
+    citable. Identical text repeated within one page maps to one row.
+    Inserting a page renumbers the ones after it, so their chunks get new
+    ids; the embedding cache makes re-embedding them cheap.
+    """
+    if page is None:
+        return content_hash(f"{source}\x00{text}")
+    return content_hash(f"{source}\x00{page}\x00{text}")
+
+
+@dataclass
+class UpsertResult:
+    """Outcome of an incremental upsert."""
+    ids: List[str]
+    added: int
+    skipped: int
+
+
 @dataclass
 class SearchResult:
     """Standardized search result."""
@@ -31,40 +70,192 @@ class SearchResult:
     metadata: Dict[str, Any]
 
 
+class SearchResultCache:
+    """
+    LRU of search results.
+
+    Keys include the collection version, so a result computed while the
+    collection was being written is never served after the write.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries if max_entries is not None else settings.search_cache_max_entries
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[Tuple, List[SearchResult]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(
+        version: int,
+        query: str,
+        n_results: int,
+        filter_metadata: Optional[Dict[str, Any]],
+        mode: str
+    ) -> Tuple:
+        normalized = " ".join(query.split()).casefold()
+        where = json.dumps(filter_metadata, sort_keys=True, default=str) if filter_metadata else ""
+        return (version, normalized, n_results, where, mode)
+
+    def get(self, key: Tuple) -> Optional[List[SearchResult]]:
+        """Cached results (as copies the caller may mutate) or None."""
+        if not self.max_entries:
+            return None
+        with self._lock:
+            results = self._entries.get(key)
+            if results is None:
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+        return [dataclasses.replace(r) for r in results]
+
+    def set(self, key: Tuple, results: List[SearchResult]) -> None:
+        if not self.max_entries:
+            return
+        snapshot = [dataclasses.replace(r) for r in results]
+        with self._lock:
+            self._entries[key] = snapshot
+            self._entries.move_to_end(key)
+            self.stats.sets += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Write counters per (directory, collection, backend), shared by all VectorStores in the process
+_collection_versions: Dict[Tuple[str, str, str], int] = {}
+_versions_lock = threading.Lock()
+
+
 class VectorStore:
     """
-    Wrapper around ChromaDB for document storage and retrieval.
+    Document storage and retrieval over a pluggable vector backend.
     """
     
     def __init__(
         self,
         collection_name: str = "agentforge_docs",
         embedding_model: Optional[EmbeddingModel] = None,
-        persist_directory: str = "./.chroma_db"
+        persist_directory: str = "./.chroma_db",
+        backend: Optional[str] = None
     ):
         """
         Initialize the Vector Store.
         
         Args:
-            collection_name: Name of the Chroma collection
+            collection_name: Name of the collection
             embedding_model: Instance of EmbeddingModel class
             persist_directory: Path to save the database
+            backend: "chroma", "numpy" (exact, in-process) or "ivf"
+                (approximate, in-process). Defaults to settings.vector_backend.
         """
         self.persist_directory = persist_directory
         self.collection_name = collection_name
-        self.embedding_model = embedding_model or EmbeddingModel()
-        
-        # Initialize Client
-        self._client = chromadb.PersistentClient(path=persist_directory)
-        
-        # Get or Create Collection
-        # Note: Chroma handles the embedding function adapter, but we'll manage embeddings explicitly 
-        # to simplify swapping providers in our clean architecture.
-        self._collection = self._client.get_or_create_collection(
-            name=collection_name,
-            metadata={"hnsw:space": "cosine"}
+        self.embedding_model = embedding_model or get_embedding_model()
+        self.backend_name = backend or settings.vector_backend
+        if self.backend_name not in BACKENDS:
+            raise ValueError(f"Unknown vector backend {self.backend_name!r}; expected one of {BACKENDS}")
+
+        # Cached search results are tied to the collection's shared write counter
+        self._version_key = (os.path.abspath(persist_directory), collection_name, self.backend_name)
+        self.result_cache = SearchResultCache()
+
+        # The collection and keyword index open on first use and can be
+        # released when idle (see core/store_registry.py); they reopen on demand
+        self._backend: Optional[VectorBackend] = None
+        self._keyword_index: Optional[BM25Index] = None
+        self._metadata_index: Optional[MetadataIndex] = None
+        # Collection version each in-memory index is known to reflect
+        self._index_versions = {"keyword": -1, "metadata": -1}
+        self._open_lock = threading.RLock()
+        self.last_used = time.monotonic()
+        logger.info(
+            f"VectorStore initialized at {persist_directory}, Collection: {collection_name} "
+            f"({self.backend_name} backend)"
         )
-        logger.info(f"VectorStore initialized at {persist_directory}, Collection: {collection_name}")
+
+    @property
+    def backend(self) -> VectorBackend:
+        self.last_used = time.monotonic()
+        if self._backend is None:
+            with self._open_lock:
+                if self._backend is None:
+                    self._backend = create_backend(self.backend_name, self.persist_directory, self.collection_name)
+        return self._backend
+
+    @property
+    def keyword_index(self) -> BM25Index:
+        self.last_used = time.monotonic()
+        if self._keyword_index is None:
+            with self._open_lock:
+                if self._keyword_index is None:
+                    # Keyword index persisted next to the Chroma files
+                    index = BM25Index(os.path.join(self.persist_directory, f"{self.collection_name}.bm25.sqlite3"))
+                    self._backfill_keyword_index(index)
+                    self._keyword_index = index
+                    self._index_versions["keyword"] = self.version
+        return self._keyword_index
+
+    @property
+    def metadata_index(self) -> MetadataIndex:
+        self.last_used = time.monotonic()
+        if self._metadata_index is None:
+            with self._open_lock:
+                if self._metadata_index is None:
+                    index = MetadataIndex(
+                        settings.metadata_index_keys,
+                        os.path.join(self.persist_directory, f"{self.collection_name}.meta.sqlite3")
+                    )
+                    self._backfill_metadata_index(index)
+                    self._metadata_index = index
+                    self._index_versions["metadata"] = self.version
+        return self._metadata_index
+
+    @property
+    def is_open(self) -> bool:
+        return any(h is not None for h in (self._backend, self._keyword_index, self._metadata_index))
+
+    def release(self) -> None:
+        """Close the collection and keyword index; the next call reopens them."""
+        with self._open_lock:
+            if self._keyword_index is not None:
+                self._keyword_index.close()
+                self._keyword_index = None
+            if self._metadata_index is not None:
+                self._metadata_index.close()
+                self._metadata_index = None
+            if self._backend is not None:
+                self._backend.close()
+                self._backend = None
+            self.result_cache.clear()
+
+    def _backfill_keyword_index(self, index: BM25Index) -> None:
+        """Index collections created before the keyword index existed."""
+        total = self.backend.count()
+        if len(index) >= total:
+            return
+        step = self.backend.max_batch_size
+        for offset in range(0, total, step):
+            page = self.backend.get(limit=step, offset=offset)
+            index.add(page["ids"], page["documents"])
+        logger.info(f"Built keyword index for {total} existing documents")
+
+    def _backfill_metadata_index(self, index: MetadataIndex) -> None:
+        """Index metadata of collections created before the metadata index existed."""
+        total = self.backend.count()
+        if len(index) >= total:
+            return
+        step = self.backend.max_batch_size
+        for offset in range(0, total, step):
+            page = self.backend.get(limit=step, offset=offset)
+            index.add(page["ids"], page["metadatas"])
+        logger.info(f"Built metadata index for {total} existing documents")
 
     def add_texts(
         self,
@@ -82,90 +273,440 @@ class VectorStore:
             metadatas = [{"source": "unknown"} for _ in texts]
             
         try:
-            # Generate embeddings
-            embeddings = self.embedding_model.embed_documents(texts)
-            
-            # Add to Chroma
-            self._collection.add(
-                documents=texts,
-                embeddings=embeddings,
-                metadatas=metadatas,
-                ids=ids
-            )
-            logger.info(f"Added {len(texts)} documents to vector store")
-            return ids
+            # Generate embeddings as one contiguous float32 matrix
+            embeddings = self.embedding_model.embed_documents_array(texts)
+            return self.add_embeddings(ids, texts, embeddings, metadatas)
         except Exception as e:
             logger.error(f"Error adding texts to vector store: {e}")
             raise
 
+    def add_embeddings(
+        self,
+        ids: List[str],
+        texts: List[str],
+        embeddings: np.ndarray,
+        metadatas: List[Dict[str, Any]]
+    ) -> List[str]:
+        """
+        Add texts whose embeddings were already computed (e.g. by the
+        ingestion pipeline, which embeds the next batch while this one is written).
+        """
+        # Open (and backfill) the indexes before the new rows land
+        keyword_index, metadata_index = self.keyword_index, self.metadata_index
+        self.backend.add(ids, texts, embeddings, metadatas)
+        keyword_index.add(ids, texts)
+        metadata_index.add(ids, metadatas)
+        self._bump_version()
+        logger.info(f"Added {len(texts)} documents to vector store")
+        return ids
+
+    @property
+    def version(self) -> int:
+        """
+        Write counter of the collection, shared by every VectorStore opened on it.
+
+        A write through any store in this process changes the version that
+        every other store's cache keys use, so none of them serves stale hits.
+        """
+        return _collection_versions.get(self._version_key, 0)
+
+    def _bump_version(self) -> None:
+        """Invalidate cached search results (in every store on this collection) after a write."""
+        with _versions_lock:
+            current = _collection_versions.get(self._version_key, 0)
+            _collection_versions[self._version_key] = current + 1
+            for kind, synced in self._index_versions.items():
+                if synced == current:
+                    # Our own write, already applied to our indexes
+                    self._index_versions[kind] = current + 1
+        self.result_cache.clear()
+
+    def upsert_texts(
+        self,
+        texts: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None
+    ) -> UpsertResult:
+        """
+        Add texts under content-hash ids, embedding only chunks not yet stored.
+
+        Re-ingesting an unchanged document costs one id lookup per batch and
+        no embedding calls. Duplicates within `texts` are stored once.
+        """
+        if not metadatas:
+            metadatas = [{"source": "unknown"} for _ in texts]
+        ids = [
+            content_id(t, (m or {}).get("source", "unknown"), (m or {}).get("page"))
+            for t, m in zip(texts, metadatas)
+        ]
+
+        existing = self.existing_ids(ids)
+        rows: Dict[str, int] = {}
+        for i, doc_id in enumerate(ids):
+            if doc_id not in existing and doc_id not in rows:
+                rows[doc_id] = i
+        if rows:
+            new = list(rows.values())
+            embeddings = self.embedding_model.embed_documents_array([texts[i] for i in new])
+            self.add_embeddings(list(rows), [texts[i] for i in new], embeddings, [metadatas[i] for i in new])
+        return UpsertResult(ids=ids, added=len(rows), skipped=len(ids) - len(rows))
+
+    def existing_ids(self, ids: List[str]) -> set:
+        """The subset of `ids` already in the collection."""
+        found = set()
+        step = self.backend.max_batch_size
+        for start in range(0, len(ids), step):
+            found.update(self.backend.get(ids=ids[start:start + step])["ids"])
+        return found
+
+    def delete(self, ids: List[str]) -> None:
+        """Remove documents by id from the vector and keyword indexes."""
+        if not ids:
+            return
+        self.backend.delete(ids)
+        self.keyword_index.remove(ids)
+        self.metadata_index.remove(ids)
+        self._bump_version()
+        logger.info(f"Deleted {len(ids)} documents from vector store")
+
+    def sync_source(self, source: str, keep_ids: Iterable[str]) -> int:
+        """
+        Drop chunks of `source` that are not in `keep_ids` (its current version).
+
+        Returns:
+            Number of stale chunks removed
+        """
+        keep = set(keep_ids)
+        stale = [doc_id for doc_id in self.backend.get(where={"source": source})["ids"] if doc_id not in keep]
+        self.delete(stale)
+        return len(stale)
+
     def search(
         self,
         query: str,
         n_results: int = 4,
         filter_metadata: Optional[Dict[str, Any]] = None,
-        mode: str = "semantic" # semantic, keyword, hybrid
+        mode: str = "semantic" # semantic, keyword, hybrid, mmr
     ) -> List[SearchResult]:
         """
         Search for relevant documents.
-        Supports 'semantic' (default), 'keyword' (exact match boost), or 'hybrid'.
+        Supports 'semantic' (default), 'keyword' (BM25 over the full corpus),
+        'hybrid' (Reciprocal Rank Fusion of both rankings), or 'mmr'
+        (semantic candidates with near-duplicates collapsed, reranked for diversity).
+        Repeated queries are served from the result cache until the collection changes.
         """
         try:
-            # 1. Semantic Search (Base)
-            query_embedding = self.embedding_model.embed_query(query)
-            
-            results = self._collection.query(
-                query_embeddings=[query_embedding],
-                n_results=n_results * 2 if mode == "hybrid" else n_results,
-                where=filter_metadata
+            key = SearchResultCache.key(self.version, query, n_results, filter_metadata, mode)
+            cached = self.result_cache.get(key)
+            if cached is not None:
+                return cached
+            query_embedding = None if mode == "keyword" else self.embedding_model.embed_query_array(query)
+            results = self._search_by_embedding(query, query_embedding, n_results, filter_metadata, mode)
+            self.result_cache.set(key, results)
+            return results
+        except Exception as e:
+            logger.error(f"Error searching vector store: {e}")
+            return []
+
+    async def asearch(
+        self,
+        query: str,
+        n_results: int = 4,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        mode: str = "semantic"
+    ) -> List[SearchResult]:
+        """
+        Async search (same modes as `search`) that never blocks the event loop.
+        """
+        try:
+            key = SearchResultCache.key(self.version, query, n_results, filter_metadata, mode)
+            cached = self.result_cache.get(key)
+            if cached is not None:
+                return cached
+            query_embedding = None if mode == "keyword" else await self.embedding_model.aembed_query_array(query)
+            # Chroma's client is synchronous, so the query runs in a worker thread
+            results = await asyncio.to_thread(
+                self._search_by_embedding, query, query_embedding, n_results, filter_metadata, mode
             )
-            
-            # Parse Vector Results
-            candidates = {}
-            if results['ids'] and results['ids'][0]:
-                for i in range(len(results['ids'][0])):
-                    doc_id = results['ids'][0][i]
-                    candidates[doc_id] = SearchResult(
-                        id=doc_id,
-                        text=results['documents'][0][i],
-                        metadata=results['metadatas'][0][i] if results['metadatas'] else {},
-                        source=results['metadatas'][0][i].get('source', 'unknown') if results['metadatas'] else 'unknown',
-                        distance=results['distances'][0][i] if results['distances'] else 0.0
-                    )
+            self.result_cache.set(key, results)
+            return results
+        except Exception as e:
+            logger.error(f"Error searching vector store: {e}")
+            return []
 
-            if mode in ["keyword", "hybrid"]:
-                # 2. Simple Keyword Scoring (Reranking)
-                # In a real system, we'd query an Inverted Index. here we scan candidates.
-                # Just rerank the semantic candidates based on keyword overlap
-                query_terms = set(query.lower().split())
-                
-                for doc_id, res in candidates.items():
-                    doc_lower = res.text.lower()
-                    score = sum(1 for term in query_terms if term in doc_lower)
-                    # Normalize simple score
-                    keyword_boost = score * 0.1 
-                    # Reduce distance (which is bad in cosine distance, usually smaller is better? 
-                    # Chroma returns distance. If cosine DISTANCE, 0 is identical.
-                    # We want to reduce distance if keywords match.
-                    res.distance = max(0.0, res.distance - keyword_boost)
-
-            # Sort and Slice
-            final_results = list(candidates.values())
-            final_results.sort(key=lambda x: x.distance)
-            
-            return final_results[:n_results]
-            
+    def search_many(
+        self,
+        queries: List[str],
+        n_results: int = 4,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        mode: str = "semantic"
+    ) -> List[List[SearchResult]]:
+        """
+        Search for several queries at once (query expansion, rewrites, eval sets).
+
+        Queries missing from the result cache are embedded in one batch and
+        sent to the backend as a single multi-vector query. Returns one
+        result list per query, in order.
+        """
+        if not queries:
+            return []
+        try:
+            keys, results, missing = self._cached_results(queries, n_results, filter_metadata, mode)
+            if missing:
+                todo = [queries[i] for i in missing]
+                embeddings = None if mode == "keyword" else self.embedding_model.embed_queries_array(todo)
+                fresh = self._search_many_by_embedding(todo, embeddings, n_results, filter_metadata, mode)
+                self._fill_results(keys, results, missing, fresh)
+            return results
         except Exception as e:
             logger.error(f"Error searching vector store: {e}")
+            return [[] for _ in queries]
+
+    async def asearch_many(
+        self,
+        queries: List[str],
+        n_results: int = 4,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        mode: str = "semantic"
+    ) -> List[List[SearchResult]]:
+        """Async search_many."""
+        if not queries:
             return []
+        try:
+            keys, results, missing = self._cached_results(queries, n_results, filter_metadata, mode)
+            if missing:
+                todo = [queries[i] for i in missing]
+                embeddings = None if mode == "keyword" else await self.embedding_model.aembed_queries_array(todo)
+                fresh = await asyncio.to_thread(
+                    self._search_many_by_embedding, todo, embeddings, n_results, filter_metadata, mode
+                )
+                self._fill_results(keys, results, missing, fresh)
+            return results
+        except Exception as e:
+            logger.error(f"Error searching vector store: {e}")
+            return [[] for _ in queries]
+
+    def _cached_results(
+        self,
+        queries: List[str],
+        n_results: int,
+        filter_metadata: Optional[Dict[str, Any]],
+        mode: str
+    ) -> Tuple[List[Tuple], List[Optional[List[SearchResult]]], List[int]]:
+        """(cache keys, cached results or None, positions still to compute) per query."""
+        version = self.version
+        keys = [SearchResultCache.key(version, q, n_results, filter_metadata, mode) for q in queries]
+        results = [self.result_cache.get(key) for key in keys]
+        return keys, results, [i for i, r in enumerate(results) if r is None]
+
+    def _fill_results(
+        self,
+        keys: List[Tuple],
+        results: List[Optional[List[SearchResult]]],
+        missing: List[int],
+        fresh: List[List[SearchResult]]
+    ) -> None:
+        for i, hits in zip(missing, fresh):
+            results[i] = hits
+            self.result_cache.set(keys[i], hits)
+
+    def _search_by_embedding(
+        self,
+        query: str,
+        query_embedding: Optional[np.ndarray],
+        n_results: int,
+        filter_metadata: Optional[Dict[str, Any]],
+        mode: str
+    ) -> List[SearchResult]:
+        """Run the semantic and/or keyword retrieval for `mode`."""
+        embeddings = None if query_embedding is None else query_embedding.reshape(1, -1)
+        return self._search_many_by_embedding([query], embeddings, n_results, filter_metadata, mode)[0]
+
+    def _search_many_by_embedding(
+        self,
+        queries: List[str],
+        query_embeddings: Optional[np.ndarray],
+        n_results: int,
+        filter_metadata: Optional[Dict[str, Any]],
+        mode: str
+    ) -> List[List[SearchResult]]:
+        """Batched retrieval: one backend query for every row of `query_embeddings`."""
+        if mode == "keyword":
+            return [self._keyword_search(query, n_results, filter_metadata) for query in queries]
+
+        # 1. Semantic Search (Base); MMR needs a wider candidate pool and its vectors
+        fetch = {"hybrid": n_results * 2, "mmr": n_results * settings.mmr_fetch_factor}.get(mode, n_results)
+        results = self._prefiltered_query(query_embeddings, fetch, filter_metadata, mode == "mmr")
+        if results is None:
+            results = self.backend.query(
+                query_embeddings,
+                fetch,
+                where=filter_metadata,
+                include_embeddings=mode == "mmr"
+            )
+        batches = []
+        for q, query in enumerate(queries):
+            semantic = []
+            ids = results['ids'][q] if results['ids'] else []
+            for i in range(len(ids)):
+                metadata = results['metadatas'][q][i] if results['metadatas'] else {}
+                semantic.append(SearchResult(
+                    id=ids[i],
+                    text=results['documents'][q][i],
+                    metadata=metadata or {},
+                    source=(metadata or {}).get('source', 'unknown'),
+                    distance=results['distances'][q][i] if results['distances'] else 0.0
+                ))
+            if mode == "hybrid":
+                semantic = self._fuse(query, semantic, n_results, filter_metadata)
+            elif mode == "mmr":
+                semantic = self._diversify(query_embeddings[q], semantic, results['embeddings'][q], n_results)
+            batches.append(semantic[:n_results])
+        return batches
+
+    def _prefiltered_query(
+        self,
+        query_embeddings: np.ndarray,
+        n_results: int,
+        filter_metadata: Optional[Dict[str, Any]],
+        include_embeddings: bool
+    ) -> Optional[Dict[str, List[Any]]]:
+        """
+        Exact search over the rows a selective filter allows.
+
+        Returns None (use the backend's own filtered search) when the filter
+        touches no indexed key or matches more than settings.prefilter_max_candidates.
+        """
+        if not filter_metadata:
+            return None
+        index = self._synced_metadata_index()
+        if index is None:
+            return None
+        candidates = index.candidates(filter_metadata)
+        if candidates is None or len(candidates) > settings.prefilter_max_candidates:
+            return None
+        if not candidates:
+            # Nothing matches (and Chroma rejects a get with an empty id list)
+            empty = {"ids": [], "documents": [], "metadatas": [], "embeddings": np.empty((0, 0), dtype=np.float32)}
+            return exact_query(empty, query_embeddings, n_results, include_embeddings)
+        # `where` is re-applied, so unindexed parts of the filter stay exact
+        rows = self.backend.get(ids=sorted(candidates), where=filter_metadata, include_embeddings=True)
+        return exact_query(rows, query_embeddings, n_results, include_embeddings)
+
+    def _sync_index(self, kind: str, index: Any, backfill) -> bool:
+        """
+        Reload `index` if the collection changed underneath it.
+
+        Another VectorStore on the same collection (this process: the shared
+        version moved; another process: the row count differs) may have
+        written rows this instance's in-memory index has not seen.
+
+        Returns:
+            False if the index still disagrees with the backend after a reload
+        """
+        version = self.version
+        if self._index_versions[kind] == version and len(index) == self.backend.count():
+            return True
+        index.reload()
+        backfill(index)
+        if len(index) != self.backend.count():
+            return False
+        self._index_versions[kind] = version
+        return True
+
+    def _synced_metadata_index(self) -> Optional[MetadataIndex]:
+        """The metadata index, or None if it cannot be trusted (use backend filtering)."""
+        index = self.metadata_index
+        if not self._sync_index("metadata", index, self._backfill_metadata_index):
+            logger.warning("Metadata index out of sync with the collection; using backend filtering")
+            return None
+        return index
+
+    def _synced_keyword_index(self) -> BM25Index:
+        """The keyword index, reloaded to include other stores' writes."""
+        index = self.keyword_index
+        if not self._sync_index("keyword", index, self._backfill_keyword_index):
+            logger.warning("Keyword index out of sync with the collection; keyword results may be incomplete")
+        return index
+
+    def _diversify(
+        self,
+        query_embedding: np.ndarray,
+        candidates: List[SearchResult],
+        embeddings: np.ndarray,
+        n_results: int
+    ) -> List[SearchResult]:
+        """Collapse near-duplicate chunks, then pick `n_results` by MMR."""
+        keep = collapse_near_duplicates([r.text for r in candidates], settings.dedupe_threshold)
+        chosen = mmr(query_embedding, np.asarray(embeddings)[keep], n_results, settings.mmr_lambda)
+        return [candidates[keep[i]] for i in chosen]
+
+    def _fuse(
+        self,
+        query: str,
+        semantic: List[SearchResult],
+        n_results: int,
+        filter_metadata: Optional[Dict[str, Any]]
+    ) -> List[SearchResult]:
+        """Keyword search, fused with `semantic` by rank (scores are not comparable)."""
+        keyword = self._keyword_search(query, n_results * 2, filter_metadata)
+        by_id = {r.id: r for r in keyword}
+        by_id.update({r.id: r for r in semantic})
+        fused = reciprocal_rank_fusion([[r.id for r in semantic], [r.id for r in keyword]])
+
+        # Map the fused score onto a distance: 0.0 = ranked first by both lists
+        best = 2.0 / (RRF_K + 1)
+        final_results = []
+        for doc_id, score in fused[:n_results]:
+            result = by_id[doc_id]
+            result.distance = max(0.0, 1.0 - score / best)
+            final_results.append(result)
+        return final_results
+
+    def _keyword_search(
+        self,
+        query: str,
+        n_results: int,
+        filter_metadata: Optional[Dict[str, Any]]
+    ) -> List[SearchResult]:
+        """BM25 top hits, hydrated (and filtered) through Chroma."""
+        keyword_index = self._synced_keyword_index()
+        if filter_metadata:
+            ranked = keyword_index.search(query)
+            step = max(n_results * 4, 64)
+        else:
+            ranked = keyword_index.search(query, n_results)
+            step = n_results
+
+        results: List[SearchResult] = []
+        for start in range(0, len(ranked), step):
+            chunk = ranked[start:start + step]
+            page = self.backend.get(ids=[doc_id for doc_id, _ in chunk], where=filter_metadata)
+            found = {
+                doc_id: (doc, meta or {})
+                for doc_id, doc, meta in zip(page["ids"], page["documents"], page["metadatas"])
+            }
+            for doc_id, score in chunk:
+                if doc_id not in found:
+                    continue
+                text, metadata = found[doc_id]
+                results.append(SearchResult(
+                    id=doc_id,
+                    text=text,
+                    metadata=metadata,
+                    source=metadata.get('source', 'unknown'),
+                    distance=1.0 / (1.0 + score)
+                ))
+                if len(results) >= n_results:
+                    return results
+        return results
 
     def clear(self) -> None:
         """Clear all documents from the collection."""
         try:
-            self._client.delete_collection(self.collection_name)
-            self._collection = self._client.get_or_create_collection(
-                name=self.collection_name,
-                metadata={"hnsw:space": "cosine"}
-            )
+            self.backend.clear()
+            self.keyword_index.clear()
+            self.metadata_index.clear()
+            self._bump_version()
             logger.info("Vector store cleared")
         except Exception as e:
             logger.error(f"Error clearing vector store: {e}")
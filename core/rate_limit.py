@@ -0,0 +1,312 @@
+"""
+Provider Rate Limiting & Retries - Keep throughput at the quota ceiling.
+
+Demonstrates:
+- Token-bucket limiting (requests/min and tokens/min) shared by threads and coroutines
+- Jittered exponential backoff honoring `retry-after`
+- Retry-safe streaming (only retried before the first chunk is emitted)
+"""
+import asyncio
+import email.utils
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional, Tuple, TypeVar
+
+from core.config import settings
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+# SDK exception class names treated as transient (avoids importing optional SDKs)
+RETRYABLE_EXCEPTION_NAMES = {
+    "APIConnectionError",
+    "APITimeoutError",
+    "RateLimitError",
+    "OverloadedError",
+    "InternalServerError",
+    "ResourceExhausted",
+    "ServiceUnavailable",
+    "DeadlineExceeded",
+    "TooManyRequests",
+}
+
+# Status codes / SDK exception names meaning "this payload is bad or too big"
+INPUT_ERROR_STATUS_CODES = {400, 413, 422}
+INPUT_ERROR_EXCEPTION_NAMES = {
+    "BadRequestError",
+    "UnprocessableEntityError",
+    "InvalidArgument",
+    "PayloadTooLarge",
+}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Callers reserve capacity up front and are told how long to wait for it,
+    so the lock is never held while sleeping and async callers never block
+    the event loop.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else float(rate_per_minute)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate_per_second)
+        self._updated = now
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """
+        Reserve `amount` tokens.
+
+        Returns:
+            Seconds the caller must wait before the reservation is honored.
+        """
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate_per_second
+
+    def credit(self, amount: float) -> None:
+        """Return (positive) or charge (negative) tokens after the fact."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+    @property
+    def available(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+
+class RateLimiter:
+    """Request and token budgets for a single provider/model pair."""
+
+    def __init__(self, requests_per_minute: int = 0, tokens_per_minute: int = 0):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+
+    def _reserve(self, tokens: int) -> float:
+        wait = 0.0
+        if self.requests:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens:
+            wait = max(wait, self.tokens.reserve(tokens))
+        return wait
+
+    def acquire(self, tokens: int = 0) -> None:
+        """Block the current thread until the request fits the budget."""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            logger.debug(f"Rate limiter delaying request by {wait:.2f}s")
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: int = 0) -> None:
+        """Suspend the current coroutine until the request fits the budget."""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            logger.debug(f"Rate limiter delaying request by {wait:.2f}s")
+            await asyncio.sleep(wait)
+
+    def reconcile(self, estimated: int, actual: int) -> None:
+        """Correct the token budget once real usage is known."""
+        if self.tokens and actual is not None:
+            self.tokens.credit(estimated - actual)
+
+
+_limiters: Dict[Tuple[str, str], RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str, model: str) -> RateLimiter:
+    """Return the process-wide limiter for a provider/model pair."""
+    key = (provider, model)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = RateLimiter(settings.llm_requests_per_minute, settings.llm_tokens_per_minute)
+            _limiters[key] = limiter
+        return limiter
+
+
+def configure_rate_limiter(
+    provider: str,
+    model: str,
+    requests_per_minute: int = 0,
+    tokens_per_minute: int = 0
+) -> RateLimiter:
+    """Override the quota for a specific provider/model pair."""
+    limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+    with _limiters_lock:
+        _limiters[(provider, model)] = limiter
+    return limiter
+
+
+def estimate_tokens(*texts: Optional[str]) -> int:
+    """Cheap token estimate (~4 characters per token) for budgeting."""
+    return sum(len(t) for t in texts if t) // 4
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    for attr in ("status_code", "code"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(exc, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Whether an exception represents a transient provider failure."""
+    if type(exc).__name__ in RETRYABLE_EXCEPTION_NAMES:
+        return True
+    if _status_code(exc) in RETRYABLE_STATUS_CODES:
+        return True
+    return "overloaded" in str(exc).lower()
+
+
+def is_input_error(exc: BaseException) -> bool:
+    """Whether an exception rejects the request payload itself (bad or oversized input)."""
+    if type(exc).__name__ in INPUT_ERROR_EXCEPTION_NAMES:
+        return True
+    if _status_code(exc) in INPUT_ERROR_STATUS_CODES:
+        return True
+    # Local validation of the inputs (e.g. a provider client rejecting a text)
+    return isinstance(exc, (ValueError, TypeError)) and _status_code(exc) is None
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Parse `retry-after` / `retry-after-ms` from an exception's HTTP response."""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        millis = headers.get("retry-after-ms")
+        if millis is not None:
+            return float(millis) / 1000.0
+        value = headers.get("retry-after")
+        if value is None:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            parsed = email.utils.parsedate_to_datetime(value)
+            return max(0.0, parsed.timestamp() - time.time())
+    except Exception:
+        return None
+
+
+@dataclass
+class RetryPolicy:
+    """Jittered exponential backoff configuration."""
+    max_retries: int = field(default_factory=lambda: settings.llm_max_retries)
+    base_delay: float = field(default_factory=lambda: settings.llm_retry_base_delay)
+    max_delay: float = field(default_factory=lambda: settings.llm_retry_max_delay)
+
+    def should_retry(self, exc: BaseException, attempt: int) -> bool:
+        return attempt < self.max_retries and is_retryable(exc)
+
+    def delay_for(self, attempt: int, exc: Optional[BaseException] = None) -> float:
+        """Server-provided retry-after wins; otherwise full-jitter backoff."""
+        if exc is not None:
+            hinted = retry_after_seconds(exc)
+            if hinted is not None:
+                return min(hinted, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+def call_with_retry(fn: Callable[[], T], policy: RetryPolicy, label: str = "LLM call") -> T:
+    """Run `fn`, retrying transient failures according to `policy`."""
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except Exception as e:
+            if not policy.should_retry(e, attempt):
+                raise
+            delay = policy.delay_for(attempt, e)
+            attempt += 1
+            logger.warning(f"{label} failed ({e}); retry {attempt}/{policy.max_retries} in {delay:.2f}s")
+            time.sleep(delay)
+
+
+async def acall_with_retry(
+    fn: Callable[[], Awaitable[T]],
+    policy: RetryPolicy,
+    label: str = "LLM call"
+) -> T:
+    """Async variant of `call_with_retry`."""
+    attempt = 0
+    while True:
+        try:
+            return await fn()
+        except Exception as e:
+            if not policy.should_retry(e, attempt):
+                raise
+            delay = policy.delay_for(attempt, e)
+            attempt += 1
+            logger.warning(f"{label} failed ({e}); retry {attempt}/{policy.max_retries} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+
+def retry_stream(
+    factory: Callable[[], Iterator[T]],
+    policy: RetryPolicy,
+    label: str = "LLM stream"
+) -> Iterator[T]:
+    """Re-open a stream on transient failure, but only before the first chunk."""
+    attempt = 0
+    while True:
+        started = False
+        try:
+            for chunk in factory():
+                started = True
+                yield chunk
+            return
+        except Exception as e:
+            if started or not policy.should_retry(e, attempt):
+                raise
+            delay = policy.delay_for(attempt, e)
+            attempt += 1
+            logger.warning(f"{label} failed ({e}); retry {attempt}/{policy.max_retries} in {delay:.2f}s")
+            time.sleep(delay)
+
+
+async def aretry_stream(
+    factory: Callable[[], AsyncIterator[T]],
+    policy: RetryPolicy,
+    label: str = "LLM stream"
+) -> AsyncIterator[T]:
+    """Async variant of `retry_stream`."""
+    attempt = 0
+    while True:
+        started = False
+        try:
+            async for chunk in factory():
+                started = True
+                yield chunk
+            return
+        except Exception as e:
+            if started or not policy.should_retry(e, attempt):
+                raise
+            delay = policy.delay_for(attempt, e)
+            attempt += 1
+            logger.warning(f"{label} failed ({e}); retry {attempt}/{policy.max_retries} in {delay:.2f}s")
+            await asyncio.sleep(delay)
@@ -0,0 +1,159 @@
+"""
+Single-Flight - Coalesce identical in-flight async LLM calls.
+
+Demonstrates:
+- Sharing one upstream call between concurrent identical requests
+- Streaming fan-out with a replay buffer for late subscribers
+- Cancelling the upstream call once every caller has gone away
+
+Unlike the response cache, nothing outlives the call: a flight is removed
+as soon as it completes. LLMClient still only coalesces deterministic
+(temperature 0) requests by default, since waiters share one answer.
+"""
+import asyncio
+import weakref
+from typing import Any, AsyncGenerator, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class _Flight:
+    """A shared awaitable call."""
+
+    def __init__(self, task: "asyncio.Task[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+class _StreamFlight:
+    """A shared stream: chunks are buffered so every subscriber sees them all."""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional["asyncio.Task[None]"] = None
+        self._changed = asyncio.Event()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def pump(self, source: AsyncIterator[str]) -> None:
+        try:
+            async for chunk in source:
+                self.chunks.append(chunk)
+                self._notify()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._notify()
+
+
+class SingleFlight:
+    """
+    Per-event-loop registry of in-flight calls keyed by request hash.
+
+    Flights are bound to the loop that started them (asyncio tasks cannot be
+    awaited across loops), so each loop gets its own table.
+    """
+
+    def __init__(self):
+        self._tables: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self.started = 0
+        self.shared = 0
+
+    def _table(self) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        table = self._tables.get(loop)
+        if table is None:
+            table = self._tables[loop] = {}
+        return table
+
+    @staticmethod
+    def _discard(table: Dict[str, Any], key: str, flight: Any) -> None:
+        if table.get(key) is flight:
+            del table[key]
+
+    def in_flight(self) -> int:
+        """Number of flights on the running loop."""
+        return len(self._table())
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await `fn()`, or join an identical call already in flight.
+
+        The leader's context (correlation id, usage route) is used for the
+        upstream call, so usage is recorded exactly once.
+        """
+        table = self._table()
+        flight = table.get(key)
+        if flight is None:
+            flight = table[key] = _Flight(asyncio.ensure_future(fn()))
+            flight.task.add_done_callback(lambda _, f=flight: self._discard(table, key, f))
+            self.started += 1
+        else:
+            self.shared += 1
+            logger.debug(f"Coalesced request {key[:12]} ({flight.waiters} already waiting)")
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Nobody is left to consume the result
+                self._discard(table, key, flight)
+                flight.task.cancel()
+
+    async def stream(
+        self,
+        key: str,
+        factory: Callable[[], AsyncIterator[str]]
+    ) -> AsyncGenerator[str, None]:
+        """
+        Iterate `factory()`, or subscribe to an identical stream in flight.
+
+        Late subscribers first replay the chunks already received.
+        """
+        table = self._table()
+        flight = table.get(key)
+        if flight is None:
+            flight = table[key] = _StreamFlight()
+            flight.task = asyncio.ensure_future(flight.pump(factory()))
+            flight.task.add_done_callback(lambda _, f=flight: self._discard(table, key, f))
+            self.started += 1
+        else:
+            self.shared += 1
+            logger.debug(f"Coalesced stream {key[:12]} (replaying {len(flight.chunks)} chunks)")
+
+        flight.subscribers += 1
+        index = 0
+        try:
+            while True:
+                if index < len(flight.chunks):
+                    index += 1
+                    yield flight.chunks[index - 1]
+                    continue
+                if flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                await flight._changed.wait()
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.task.done():
+                self._discard(table, key, flight)
+                flight.task.cancel()
+
+
+# Global coalescer shared by all LLMClient instances
+singleflight = SingleFlight()
@@ -0,0 +1,144 @@
+"""
+Store Registry - Shared, lazily opened vector stores.
+
+Demonstrates:
+- Process-wide reuse of expensive handles (Chroma clients, embedding models)
+- Lazy opening: a store touches disk only on its first read or write
+- Idle eviction and an open-store cap to bound memory in long-lived apps
+
+Streamlit reruns the page script on every interaction; fetching stores
+from here makes "open" a dict lookup instead of a new client, a new
+embedding provider and a full keyword-index load each time.
+"""
+import os
+import threading
+import time
+import weakref
+from typing import Dict, Optional, Tuple
+
+from core.config import settings
+from core.embeddings import EmbeddingModel, get_embedding_model
+from core.rag_engine import VectorStore
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+StoreKey = Tuple[str, str, str, str]
+
+
+class StoreRegistry:
+    """
+    One VectorStore per (directory, collection, backend, embedding scope).
+
+    Eviction calls `VectorStore.release()`, which closes the collection and
+    keyword index but leaves the object usable: anyone still holding it
+    (e.g. Streamlit session state) transparently reopens it on next use.
+    Released stores are remembered weakly, so a later `get()` for the same
+    key hands back that instance while anyone still holds it instead of
+    opening a second store on the same files.
+
+    Args:
+        idle_seconds: Release stores unused for this long (0 = never)
+        max_open: Release the least recently used stores beyond this many
+    """
+
+    def __init__(self, idle_seconds: Optional[float] = None, max_open: Optional[int] = None):
+        self.idle_seconds = idle_seconds if idle_seconds is not None else settings.store_idle_seconds
+        self.max_open = max_open if max_open is not None else settings.store_max_open
+        self._stores: Dict[StoreKey, VectorStore] = {}
+        self._released: "weakref.WeakValueDictionary[StoreKey, VectorStore]" = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        collection_name: str,
+        persist_directory: str = "./.chroma_db",
+        backend: Optional[str] = None,
+        embedding_model: Optional[EmbeddingModel] = None
+    ) -> VectorStore:
+        """Shared store for a collection (created on first request, opened on first use)."""
+        embedding_model = embedding_model or get_embedding_model()
+        key = (
+            os.path.abspath(persist_directory),
+            collection_name,
+            backend or settings.vector_backend,
+            embedding_model.cache_scope,
+        )
+        with self._lock:
+            store = self._stores.get(key) or self._released.pop(key, None)
+            if store is None:
+                store = VectorStore(
+                    collection_name=collection_name,
+                    embedding_model=embedding_model,
+                    persist_directory=persist_directory,
+                    backend=key[2]
+                )
+            self._stores[key] = store
+            store.last_used = time.monotonic()
+        self.evict()
+        return store
+
+    def evict(self, now: Optional[float] = None) -> int:
+        """
+        Drop idle stores and those beyond `max_open`.
+
+        Returns:
+            Number of stores released
+        """
+        now = now if now is not None else time.monotonic()
+        with self._lock:
+            by_age = sorted(self._stores.items(), key=lambda kv: kv[1].last_used)
+            doomed = []
+            if self.idle_seconds:
+                doomed = [key for key, store in by_age if now - store.last_used > self.idle_seconds]
+            live = [key for key, _ in by_age if key not in doomed]
+            if self.max_open and len(live) > self.max_open:
+                doomed.extend(live[:len(live) - self.max_open])
+            released = [self._stores.pop(key) for key in doomed]
+            self._released.update(zip(doomed, released))
+        for store in released:
+            store.release()
+        if released:
+            logger.info(f"Released {len(released)} idle vector store(s); {len(self._stores)} open")
+        return len(released)
+
+    def close(
+        self,
+        collection_name: str,
+        persist_directory: str = "./.chroma_db",
+        backend: Optional[str] = None
+    ) -> None:
+        """Release every registered store for a collection."""
+        path = os.path.abspath(persist_directory)
+        name = backend or settings.vector_backend
+        with self._lock:
+            keys = [k for k in self._stores if k[:3] == (path, collection_name, name)]
+            released = [self._stores.pop(k) for k in keys]
+            self._released.update(zip(keys, released))
+        for store in released:
+            store.release()
+
+    def close_all(self) -> None:
+        """Release every store (e.g. at shutdown or between tests)."""
+        with self._lock:
+            released = list(self._stores.values())
+            self._released.update(self._stores)
+            self._stores.clear()
+        for store in released:
+            store.release()
+
+    def __len__(self) -> int:
+        return len(self._stores)
+
+
+store_registry = StoreRegistry()
+
+
+def get_vector_store(
+    collection_name: str,
+    persist_directory: str = "./.chroma_db",
+    backend: Optional[str] = None,
+    embedding_model: Optional[EmbeddingModel] = None
+) -> VectorStore:
+    """Shared VectorStore from the process-wide registry."""
+    return store_registry.get(collection_name, persist_directory, backend, embedding_model)
@@ -0,0 +1,235 @@
+"""
+Usage Ledger - Token accounting and cost metering.
+
+Demonstrates:
+- Per-request token capture (input / output / cached)
+- In-process aggregation by route, model and correlation id
+- Periodic flushing to pluggable sinks
+
+Every LLM call made through `LLMClient` (and LangChain models created via
+`get_langchain_model`) is recorded here, so spend can be queried per API
+route or per request for capacity planning.
+"""
+import atexit
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from core.config import settings
+from utils.logger import correlation_id, get_logger
+
+logger = get_logger(__name__)
+
+# Logical route (API path, Celery task, UI module) that owns the current call
+usage_route: ContextVar[str] = ContextVar("usage_route", default="unscoped")
+
+# USD per 1M tokens: (input, output, cached input). Matched by model prefix.
+MODEL_PRICING: Dict[str, Tuple[float, float, float]] = {
+    "claude-3-5-sonnet": (3.00, 15.00, 0.30),
+    "claude-3-5-haiku": (0.80, 4.00, 0.08),
+    "claude-3-opus": (15.00, 75.00, 1.50),
+    "claude-3-haiku": (0.25, 1.25, 0.03),
+    "gemini-1.5-flash": (0.075, 0.30, 0.01875),
+    "gemini-1.5-pro": (1.25, 5.00, 0.3125),
+    "gemini-2.0-flash": (0.10, 0.40, 0.025),
+}
+
+
+def set_usage_route(route: str) -> str:
+    """Attribute subsequent LLM usage in this context to `route`."""
+    usage_route.set(route)
+    return route
+
+
+def estimate_cost(
+    model: str,
+    input_tokens: int = 0,
+    output_tokens: int = 0,
+    cached_tokens: int = 0
+) -> float:
+    """
+    Estimate the USD cost of a call.
+
+    Args:
+        model: Model name (matched against MODEL_PRICING by longest prefix)
+        input_tokens: Total prompt tokens, including cached ones
+        output_tokens: Generated tokens
+        cached_tokens: Prompt tokens served from the provider's prompt cache
+
+    Returns:
+        Cost in USD (0.0 for unknown models)
+    """
+    matches = [name for name in MODEL_PRICING if model and model.startswith(name)]
+    if not matches:
+        return 0.0
+    input_price, output_price, cached_price = MODEL_PRICING[max(matches, key=len)]
+    uncached = max(0, input_tokens - cached_tokens)
+    return (uncached * input_price + cached_tokens * cached_price + output_tokens * output_price) / 1_000_000
+
+
+@dataclass
+class UsageRecord:
+    """Token usage of a single provider call."""
+    provider: str
+    model: str
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+    route: str = field(default_factory=usage_route.get)
+    correlation_id: str = field(default_factory=correlation_id.get)
+    timestamp: float = field(default_factory=time.time)
+
+    @property
+    def cost(self) -> float:
+        return estimate_cost(self.model, self.input_tokens, self.output_tokens, self.cached_tokens)
+
+
+@dataclass
+class UsageTotals:
+    """Aggregated usage for a group of records."""
+    requests: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+    cost: float = 0.0
+
+    def add(self, record: UsageRecord) -> None:
+        self.requests += 1
+        self.input_tokens += record.input_tokens
+        self.output_tokens += record.output_tokens
+        self.cached_tokens += record.cached_tokens
+        self.cost += record.cost
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["cost"] = round(self.cost, 6)
+        return data
+
+
+UsageSink = Callable[[List[UsageRecord]], None]
+
+
+def log_sink(records: List[UsageRecord]) -> None:
+    """Default sink: log one aggregated line per route/model."""
+    groups: Dict[Tuple[str, str], UsageTotals] = {}
+    for record in records:
+        groups.setdefault((record.route, record.model), UsageTotals()).add(record)
+    for (route, model), totals in groups.items():
+        logger.info(f"USAGE | route={route} model={model} | {totals.as_dict()}")
+
+
+class UsageLedger:
+    """
+    Thread-safe in-process usage ledger.
+
+    Records are aggregated immediately (for queries) and buffered for sinks,
+    which are flushed every `flush_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        flush_interval: Optional[float] = None,
+        max_correlation_ids: int = 10_000,
+        sinks: Optional[List[UsageSink]] = None
+    ):
+        self.flush_interval = flush_interval if flush_interval is not None else settings.usage_flush_interval
+        self.max_correlation_ids = max_correlation_ids
+        self.sinks: List[UsageSink] = list(sinks) if sinks is not None else [log_sink]
+        self._lock = threading.Lock()
+        self._by_route_model: Dict[Tuple[str, str, str], UsageTotals] = {}
+        self._by_correlation: "OrderedDict[str, UsageTotals]" = OrderedDict()
+        self._pending: List[UsageRecord] = []
+        self._last_flush = time.monotonic()
+
+    def record(self, record: UsageRecord) -> UsageRecord:
+        """Add a usage record, flushing sinks if the interval has elapsed."""
+        with self._lock:
+            key = (record.route, record.provider, record.model)
+            self._by_route_model.setdefault(key, UsageTotals()).add(record)
+
+            totals = self._by_correlation.get(record.correlation_id)
+            if totals is None:
+                totals = self._by_correlation[record.correlation_id] = UsageTotals()
+            self._by_correlation.move_to_end(record.correlation_id)
+            totals.add(record)
+            while len(self._by_correlation) > self.max_correlation_ids:
+                self._by_correlation.popitem(last=False)
+
+            self._pending.append(record)
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+        return record
+
+    def flush(self) -> List[UsageRecord]:
+        """Hand buffered records to every sink."""
+        with self._lock:
+            records, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+        if records:
+            for sink in self.sinks:
+                try:
+                    sink(records)
+                except Exception as e:
+                    logger.warning(f"Usage sink failed: {e}")
+        return records
+
+    def summary(
+        self,
+        route: Optional[str] = None,
+        model: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Totals per (route, provider, model), optionally filtered."""
+        with self._lock:
+            rows = [
+                {"route": r, "provider": p, "model": m, **totals.as_dict()}
+                for (r, p, m), totals in self._by_route_model.items()
+                if (route is None or r == route) and (model is None or m == model)
+            ]
+        return sorted(rows, key=lambda row: row["cost"], reverse=True)
+
+    def for_correlation_id(self, cid: str) -> Optional[Dict[str, Any]]:
+        """Totals for a single request, or None if unknown/evicted."""
+        with self._lock:
+            totals = self._by_correlation.get(cid)
+            return totals.as_dict() if totals else None
+
+    def reset(self) -> None:
+        with self._lock:
+            self._by_route_model.clear()
+            self._by_correlation.clear()
+            self._pending.clear()
+
+
+class UsageCallbackHandler(BaseCallbackHandler):
+    """LangChain callback that meters chat model calls into the ledger."""
+
+    def __init__(self, provider: str, model: str, ledger: Optional[UsageLedger] = None):
+        self.provider = provider
+        self.model = model
+        self.ledger = ledger
+
+    def on_llm_end(self, response, **kwargs) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if not usage:
+                    continue
+                details = usage.get("input_token_details") or {}
+                (self.ledger or usage_ledger).record(UsageRecord(
+                    provider=self.provider,
+                    model=self.model,
+                    input_tokens=usage.get("input_tokens", 0),
+                    output_tokens=usage.get("output_tokens", 0),
+                    cached_tokens=details.get("cache_read", 0) or 0,
+                ))
+
+
+# Global ledger instance
+usage_ledger = UsageLedger()
+atexit.register(usage_ledger.flush)
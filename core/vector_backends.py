@@ -0,0 +1,857 @@
+"""
+Vector Backends - Pluggable storage/search engines behind VectorStore.
+
+Demonstrates:
+- A small backend interface with Chroma-shaped results
+- Exact in-process search (matrix-vector product + argpartition top-k)
+- IVF (inverted file) partitioning with optional product quantization (PQ)
+- Append-only memory-mapped float32 storage with a JSONL document sidecar
+
+Backends:
+- "chroma": ChromaDB PersistentClient (HNSW); the default
+- "numpy":  exact cosine search; fastest for small-to-medium collections
+- "ivf":    approximate search over the `n_probe` nearest k-means cells,
+            optionally scoring candidates with PQ codes before an exact rerank
+"""
+import json
+import math
+import os
+import shutil
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process locking only
+    fcntl = None
+
+import numpy as np
+
+from core.config import settings
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+Where = Optional[Dict[str, Any]]
+
+_chroma_clients: Dict[str, Any] = {}
+_chroma_lock = threading.Lock()
+
+_OPERATORS = {
+    "$eq": lambda a, b: a == b,
+    "$ne": lambda a, b: a != b,
+    "$gt": lambda a, b: a is not None and a > b,
+    "$gte": lambda a, b: a is not None and a >= b,
+    "$lt": lambda a, b: a is not None and a < b,
+    "$lte": lambda a, b: a is not None and a <= b,
+    "$in": lambda a, b: a in b,
+    "$nin": lambda a, b: a not in b,
+}
+
+
+def matches_where(metadata: Dict[str, Any], where: Where) -> bool:
+    """Evaluate a Chroma-style `where` filter against one metadata dict."""
+    if not where:
+        return True
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, c) for c in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_where(metadata, c) for c in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for op, operand in condition.items():
+                if op not in _OPERATORS:
+                    raise ValueError(f"Unsupported where operator: {op}")
+                if not _OPERATORS[op](value, operand):
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.array(matrix, dtype=np.float32, ndmin=2)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first."""
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+def _kmeans(data: np.ndarray, k: int, iterations: int = 10, spherical: bool = True, seed: int = 0) -> np.ndarray:
+    """Lloyd's k-means (spherical = cosine assignment on unit vectors)."""
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), size=k, replace=False)].astype(np.float32)
+    for _ in range(iterations):
+        if spherical:
+            assign = np.argmax(data @ centroids.T, axis=1)
+        else:
+            distances = (centroids ** 2).sum(axis=1) - 2.0 * data @ centroids.T
+            assign = np.argmin(distances, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, data)
+        counts = np.bincount(assign, minlength=k)
+        filled = counts > 0  # Empty clusters keep their previous centroid
+        centroids[filled] = sums[filled] / counts[filled, None]
+        if spherical:
+            centroids = _normalize(centroids)
+    return centroids
+
+
+def get_chroma_client(persist_directory: str) -> Any:
+    """One chromadb.PersistentClient per directory for the whole process."""
+    import chromadb
+
+    path = os.path.abspath(persist_directory)
+    with _chroma_lock:
+        client = _chroma_clients.get(path)
+        if client is None:
+            client = _chroma_clients[path] = chromadb.PersistentClient(path=path)
+        return client
+
+
+class VectorBackend(ABC):
+    """
+    Storage and nearest-neighbour search for one collection.
+
+    Results use Chroma's shapes: `query` returns per-query lists under
+    ids/documents/metadatas/distances, `get` returns flat lists. Distances
+    are cosine distances (0.0 = identical).
+    """
+
+    name = "base"
+
+    @property
+    def max_batch_size(self) -> int:
+        return 5000
+
+    @abstractmethod
+    def add(
+        self,
+        ids: Sequence[str],
+        documents: Sequence[str],
+        embeddings: np.ndarray,
+        metadatas: Sequence[Dict[str, Any]]
+    ) -> None:
+        """Insert new documents (ids that already exist are skipped)."""
+
+    @abstractmethod
+    def query(
+        self,
+        query_embeddings: np.ndarray,
+        n_results: int,
+        where: Where = None,
+        include_embeddings: bool = False
+    ) -> Dict[str, List[Any]]:
+        """
+        Top `n_results` matches for every row of `query_embeddings`.
+
+        With `include_embeddings`, "embeddings" holds one (k, dim) float32
+        array of the matched vectors per query (e.g. for MMR reranking).
+        """
+
+    @abstractmethod
+    def get(
+        self,
+        ids: Optional[Sequence[str]] = None,
+        where: Where = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        include_embeddings: bool = False
+    ) -> Dict[str, List[Any]]:
+        """Documents by id and/or filter ("embeddings" is an (n, dim) array when requested)."""
+
+    @abstractmethod
+    def delete(self, ids: Sequence[str]) -> None:
+        """Remove documents by id (unknown ids are ignored)."""
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of stored documents."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove every document."""
+
+    def close(self) -> None:
+        """Release in-memory state (the backend must not be used afterwards)."""
+
+
+class ChromaBackend(VectorBackend):
+    """ChromaDB PersistentClient collection (HNSW, cosine space)."""
+
+    name = "chroma"
+
+    def __init__(self, persist_directory: str, collection_name: str):
+        self.collection_name = collection_name
+        self._client = get_chroma_client(persist_directory)
+        # Embeddings are managed explicitly to keep providers swappable
+        self._collection = self._client.get_or_create_collection(
+            name=collection_name,
+            metadata={"hnsw:space": "cosine"}
+        )
+
+    @property
+    def max_batch_size(self) -> int:
+        return self._client.get_max_batch_size()
+
+    def add(self, ids, documents, embeddings, metadatas) -> None:
+        step = self.max_batch_size
+        for start in range(0, len(ids), step):
+            end = start + step
+            # Rows become lists one batch at a time (older chromadb rejects ndarrays)
+            self._collection.add(
+                documents=list(documents[start:end]),
+                embeddings=np.asarray(embeddings[start:end], dtype=np.float32).tolist(),
+                metadatas=list(metadatas[start:end]),
+                ids=list(ids[start:end])
+            )
+
+    def query(self, query_embeddings, n_results, where=None, include_embeddings=False):
+        include = ["documents", "metadatas", "distances"]
+        if include_embeddings:
+            include.append("embeddings")
+        result = self._collection.query(
+            query_embeddings=np.asarray(query_embeddings, dtype=np.float32).tolist(),
+            n_results=n_results,
+            where=where,
+            include=include
+        )
+        if include_embeddings:
+            result = dict(result)
+            result["embeddings"] = [np.asarray(e, dtype=np.float32) for e in result["embeddings"]]
+        return result
+
+    def get(self, ids=None, where=None, limit=None, offset=0, include_embeddings=False):
+        include = ["documents", "metadatas"] + (["embeddings"] if include_embeddings else [])
+        result = self._collection.get(
+            ids=list(ids) if ids is not None else None,
+            where=where,
+            limit=limit,
+            offset=offset or None,
+            include=include
+        )
+        if include_embeddings:
+            result = dict(result)
+            result["embeddings"] = np.asarray(result["embeddings"], dtype=np.float32)
+        return result
+
+    def delete(self, ids) -> None:
+        step = self.max_batch_size
+        for start in range(0, len(ids), step):
+            self._collection.delete(ids=list(ids[start:start + step]))
+
+    def count(self) -> int:
+        return self._collection.count()
+
+    def clear(self) -> None:
+        self._client.delete_collection(self.collection_name)
+        self._collection = self._client.get_or_create_collection(
+            name=self.collection_name,
+            metadata={"hnsw:space": "cosine"}
+        )
+
+
+class NumpyBackend(VectorBackend):
+    """
+    Exact cosine search over a memory-mapped float32 matrix.
+
+    Files in `directory`:
+        vectors.f32  append-only row-major unit vectors
+        docs.jsonl   one {"id", "document", "metadata"} line per row
+        meta.json    dimension
+
+    Several instances (or processes) may share a directory: writes take an
+    exclusive lock on `<directory>.lock`, and every operation first picks
+    up rows the others appended (or reloads after they compacted), so ids
+    and vector rows always line up.
+    """
+
+    name = "numpy"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.RLock()
+        self._lock_path = os.path.abspath(directory) + ".lock"
+        self._file_lock_depth = 0
+        self._vectors_path = os.path.join(directory, "vectors.f32")
+        self._docs_path = os.path.join(directory, "docs.jsonl")
+        self._meta_path = os.path.join(directory, "meta.json")
+        self._load()
+
+    def _load(self) -> None:
+        self.dim: Optional[int] = None
+        self.ids: List[str] = []
+        self.documents: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self._rows: Dict[str, int] = {}
+        # (inode, bytes consumed) of docs.jsonl; None before the file exists
+        self._docs_state: Optional[Tuple[int, int]] = None
+        self._read_docs(0)
+        self._map_vectors()
+
+    def _read_docs(self, offset: int) -> None:
+        """Append the complete docs.jsonl lines after `offset` to the in-memory rows."""
+        if self.dim is None and os.path.exists(self._meta_path):
+            with open(self._meta_path, encoding="utf-8") as f:
+                self.dim = json.load(f).get("dim")
+        if not os.path.exists(self._docs_path):
+            return
+        with open(self._docs_path, "rb") as f:
+            inode = os.fstat(f.fileno()).st_ino
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Another writer is mid-append; pick the line up next time
+                    break
+                offset += len(line)
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                self._rows[row["id"]] = len(self.ids)
+                self.ids.append(row["id"])
+                self.documents.append(row["document"])
+                self.metadatas.append(row["metadata"])
+        self._docs_state = (inode, offset)
+
+    def _docs_marker(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self._docs_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size
+
+    def _sync(self) -> None:
+        """Catch up with writes made through other instances since we last looked."""
+        if self._docs_marker() == self._docs_state:
+            return
+        # Reload under the write lock so a compaction in progress is never seen half-done
+        with self._file_lock():
+            marker = self._docs_marker()
+            if marker == self._docs_state or (marker is None and self._docs_state is None):
+                return
+            state = self._docs_state
+            if marker is not None and state is not None and marker[0] == state[0] and marker[1] > state[1]:
+                self._load_tail()
+            else:
+                # Replaced (compacted by a delete), cleared, or first created elsewhere
+                self._load()
+
+    def _load_tail(self) -> None:
+        """Read rows appended by another instance (vectors are written before their docs lines)."""
+        start = len(self.ids)
+        self._read_docs(self._docs_state[1])
+        if len(self.ids) > start:
+            self._map_vectors()
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """Exclusive cross-instance write lock (reentrant for the thread holding `_lock`)."""
+        with self._lock:
+            if self._file_lock_depth or fcntl is None:
+                self._file_lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._file_lock_depth -= 1
+                return
+            with open(self._lock_path, "a") as handle:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+                self._file_lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._file_lock_depth -= 1
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _map_vectors(self) -> None:
+        n = len(self.ids)
+        if not n or not self.dim:
+            self._vectors = np.empty((0, self.dim or 0), dtype=np.float32)
+            return
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(n, self.dim))
+
+    def add(self, ids, documents, embeddings, metadatas) -> None:
+        with self._file_lock():
+            self._sync()
+            matrix = _normalize(embeddings)
+            seen, keep = set(self._rows), []
+            for i, doc_id in enumerate(ids):
+                if doc_id not in seen:
+                    seen.add(doc_id)
+                    keep.append(i)
+            if not keep:
+                return
+            if self.dim is None:
+                self.dim = matrix.shape[1]
+                with open(self._meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"dim": self.dim}, f)
+            elif matrix.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {matrix.shape[1]} does not match collection ({self.dim})")
+
+            # Vectors first: rows without a docs line are ignored on load
+            with open(self._vectors_path, "ab") as f:
+                f.write(np.ascontiguousarray(matrix[keep]).tobytes())
+            with open(self._docs_path, "ab") as f:
+                for i in keep:
+                    line = json.dumps({"id": ids[i], "document": documents[i], "metadata": metadatas[i]}) + "\n"
+                    f.write(line.encode("utf-8"))
+                self._docs_state = (os.fstat(f.fileno()).st_ino, f.tell())
+
+            start = len(self.ids)
+            for offset, i in enumerate(keep):
+                self.ids.append(ids[i])
+                self.documents.append(documents[i])
+                self.metadatas.append(metadatas[i])
+                self._rows[ids[i]] = start + offset
+            self._map_vectors()
+            self._on_added(start, len(self.ids))
+
+    def _on_added(self, start: int, end: int) -> None:
+        """Hook for index maintenance after rows [start, end) were appended."""
+
+    def filter_rows(self, where: Where) -> Optional[np.ndarray]:
+        """Row numbers matching `where` (None means every row)."""
+        if not where:
+            return None
+        return np.fromiter(
+            (i for i, meta in enumerate(self.metadatas) if matches_where(meta, where)),
+            dtype=np.intp
+        )
+
+    def _search(self, query: np.ndarray, n_results: int, rows: Optional[np.ndarray]) -> tuple:
+        """(rows, scores) of the best matches, best first."""
+        if rows is None:
+            scores = self._vectors @ query
+            best = _top_k(scores, n_results)
+            return best, scores[best]
+        scores = self._vectors[rows] @ query
+        best = _top_k(scores, n_results)
+        return rows[best], scores[best]
+
+    def query(self, query_embeddings, n_results, where=None, include_embeddings=False):
+        with self._lock:
+            self._sync()
+            queries = _normalize(query_embeddings)
+            rows = self.filter_rows(where)
+            result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+            if include_embeddings:
+                result["embeddings"] = []
+            for query in queries:
+                if not self.ids or (rows is not None and not len(rows)):
+                    found, scores = np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)
+                else:
+                    found, scores = self._search(query, n_results, rows)
+                result["ids"].append([self.ids[i] for i in found])
+                result["documents"].append([self.documents[i] for i in found])
+                result["metadatas"].append([self.metadatas[i] for i in found])
+                result["distances"].append([float(1.0 - s) for s in scores])
+                if include_embeddings:
+                    result["embeddings"].append(np.asarray(self._vectors[found], dtype=np.float32))
+            return result
+
+    def get(self, ids=None, where=None, limit=None, offset=0, include_embeddings=False):
+        with self._lock:
+            self._sync()
+            if ids is not None:
+                rows = [self._rows[i] for i in ids if i in self._rows]
+            else:
+                rows = range(len(self.ids))
+            rows = [r for r in rows if matches_where(self.metadatas[r], where)]
+            rows = rows[offset:offset + limit] if limit is not None else rows[offset:]
+            result = {
+                "ids": [self.ids[r] for r in rows],
+                "documents": [self.documents[r] for r in rows],
+                "metadatas": [self.metadatas[r] for r in rows],
+            }
+            if include_embeddings:
+                result["embeddings"] = (
+                    np.asarray(self._vectors[rows], dtype=np.float32) if rows
+                    else np.empty((0, self.dim or 0), dtype=np.float32)
+                )
+            return result
+
+    def delete(self, ids) -> None:
+        with self._file_lock():
+            self._sync()
+            doomed = {self._rows[i] for i in ids if i in self._rows}
+            if not doomed:
+                return
+            keep = np.array([r for r in range(len(self.ids)) if r not in doomed], dtype=np.intp)
+            vectors = np.asarray(self._vectors[keep]) if len(keep) else np.empty((0, self.dim), dtype=np.float32)
+            # Release the memmap before its file is replaced
+            self._vectors = vectors
+
+            # Deletes are rare (stale chunks of a re-ingested source), so compact eagerly
+            self.ids = [self.ids[r] for r in keep]
+            self.documents = [self.documents[r] for r in keep]
+            self.metadatas = [self.metadatas[r] for r in keep]
+            self._rows = {doc_id: i for i, doc_id in enumerate(self.ids)}
+            self._replace_file(self._vectors_path, np.ascontiguousarray(vectors).tobytes())
+            data = "".join(
+                json.dumps({"id": i, "document": d, "metadata": m}) + "\n"
+                for i, d, m in zip(self.ids, self.documents, self.metadatas)
+            ).encode("utf-8")
+            self._replace_file(self._docs_path, data)
+            self._docs_state = (os.stat(self._docs_path).st_ino, len(data))
+            self._map_vectors()
+            self._on_deleted(keep)
+
+    @staticmethod
+    def _replace_file(path: str, data: bytes) -> None:
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _on_deleted(self, keep: np.ndarray) -> None:
+        """Hook for index maintenance after compaction kept rows `keep` (old numbering)."""
+
+    def count(self) -> int:
+        with self._lock:
+            self._sync()
+            return len(self.ids)
+
+    def close(self) -> None:
+        with self._lock:
+            # Drop the memmap and the document/metadata lists; the next use reloads
+            self._vectors = np.empty((0, self.dim or 0), dtype=np.float32)
+            self.ids, self.documents, self.metadatas, self._rows = [], [], [], {}
+            self._docs_state = None
+
+    def clear(self) -> None:
+        with self._file_lock():
+            self._vectors = np.empty((0, 0), dtype=np.float32)
+            shutil.rmtree(self.directory, ignore_errors=True)
+            os.makedirs(self.directory, exist_ok=True)
+            self._load()
+
+
+class IVFBackend(NumpyBackend):
+    """
+    Approximate search: k-means cells (IVF) with optional PQ scoring.
+
+    Below `min_train_size` rows the index is untrained and search is exact.
+    Once trained, a query scans only the `n_probe` cells whose centroids are
+    closest. With `pq_subvectors` > 0, candidates are first scored from
+    uint8 PQ codes, and only the best `rerank` x n_results are re-scored
+    exactly from the memory-mapped vectors.
+
+    Training is triggered by writes, never by queries: once an add crosses
+    `min_train_size` (or doubles the collection since the last training),
+    k-means runs on a background thread while queries keep being served
+    by exact search (or the previous index) until the new one is swapped in.
+
+    Extra files: centroids.npy, assign.i32, and (with PQ) codebooks.npy, codes.u8.
+    """
+
+    name = "ivf"
+
+    def __init__(
+        self,
+        directory: str,
+        n_lists: Optional[int] = None,
+        n_probe: Optional[int] = None,
+        pq_subvectors: Optional[int] = None,
+        min_train_size: int = 1024,
+        rerank: int = 4,
+        background: Optional[bool] = None
+    ):
+        self.n_lists_setting = n_lists if n_lists is not None else settings.vector_ivf_lists
+        self.n_probe = n_probe or settings.vector_ivf_probe
+        self.pq_subvectors = pq_subvectors if pq_subvectors is not None else settings.vector_pq_subvectors
+        self.min_train_size = min_train_size
+        self.rerank = rerank
+        self.background = settings.vector_ivf_background_training if background is None else background
+        self._trainer: Optional[threading.Thread] = None
+        self._training = False
+        super().__init__(directory)
+
+    def _index_marker(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(os.path.join(self.directory, "ivf.json"))
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _load(self) -> None:
+        super()._load()
+        # Taken before reading the index files: a newer training is seen on the next sync
+        self._index_state = self._index_marker()
+        self.centroids: Optional[np.ndarray] = None
+        self.codebooks: Optional[np.ndarray] = None
+        self._lists: List[np.ndarray] = []
+        self.trained_count = 0
+        centroids_path = os.path.join(self.directory, "centroids.npy")
+        assign_path = os.path.join(self.directory, "assign.i32")
+        state_path = os.path.join(self.directory, "ivf.json")
+        if not all(os.path.exists(p) for p in (centroids_path, assign_path, state_path)):
+            return
+        self.centroids = np.load(centroids_path)
+        assign = np.fromfile(assign_path, dtype=np.int32)[:len(self.ids)]
+        codebooks_path = os.path.join(self.directory, "codebooks.npy")
+        if os.path.exists(codebooks_path):
+            self.codebooks = np.load(codebooks_path)
+        if len(assign) < len(self.ids):
+            # Rows appended after a crash mid-update: serve exact search and retrain
+            self.centroids = None
+            self._schedule_training()
+            return
+        self._build_lists(assign)
+        with open(state_path, encoding="utf-8") as f:
+            self.trained_count = json.load(f)["trained_count"]
+
+    def _sync(self) -> None:
+        super()._sync()
+        if self._index_marker() != self._index_state:
+            # Another instance (re)trained: adopt its centroids and assignments
+            with self._file_lock():
+                if self._index_marker() != self._index_state:
+                    self._load()
+
+    def _load_tail(self) -> None:
+        # The writer also appended cell assignments (or not, if untrained): reread everything
+        self._load()
+
+    def _build_lists(self, assign: np.ndarray) -> None:
+        order = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[order], np.arange(len(self.centroids) + 1))
+        self._lists = [order[bounds[j]:bounds[j + 1]] for j in range(len(self.centroids))]
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def train(self) -> None:
+        """
+        (Re)build centroids, cell assignments and PQ codebooks from all rows.
+
+        k-means runs on a sample taken under the lock but is computed
+        outside it, so concurrent queries are not blocked; only encoding
+        the rows against the new centroids holds the lock.
+        """
+        with self._lock:
+            if self._training:
+                return
+            self._training = True
+        try:
+            self._train()
+        finally:
+            self._training = False
+
+    def _train(self) -> None:
+        with self._lock:
+            self._sync()
+            n = len(self.ids)
+            if n < self.min_train_size:
+                return
+            n_lists = self.n_lists_setting or int(math.sqrt(n))
+            n_lists = max(1, min(n_lists, n))
+            sample = self._sample(max(n_lists * 40, 10_000))
+
+        centroids = _kmeans(sample, n_lists)
+        codebooks = None
+        dim = sample.shape[1]
+        if self.pq_subvectors and dim % self.pq_subvectors == 0:
+            sub = dim // self.pq_subvectors
+            k = min(256, len(sample))
+            codebooks = np.stack([
+                _kmeans(sample[:, j * sub:(j + 1) * sub], k, spherical=False)
+                for j in range(self.pq_subvectors)
+            ])
+        elif self.pq_subvectors:
+            logger.warning(f"PQ disabled: dim {dim} not divisible by {self.pq_subvectors} subvectors")
+
+        with self._file_lock():
+            self._sync()
+            if len(self.ids) < self.min_train_size or self.dim != dim:
+                # Cleared (or closed) while training: the model no longer applies
+                return
+            n = len(self.ids)
+            self.centroids, self.codebooks = centroids, codebooks
+            np.save(os.path.join(self.directory, "centroids.npy"), centroids)
+            codebooks_path = os.path.join(self.directory, "codebooks.npy")
+            if codebooks is not None:
+                np.save(codebooks_path, codebooks)
+            elif os.path.exists(codebooks_path):
+                os.remove(codebooks_path)
+
+            for name in ("assign.i32", "codes.u8"):
+                path = os.path.join(self.directory, name)
+                if os.path.exists(path):
+                    os.remove(path)
+            self._encode(0, n)
+            self._build_lists(np.fromfile(os.path.join(self.directory, "assign.i32"), dtype=np.int32))
+            self.trained_count = n
+            state = json.dumps({"trained_count": n, "n_lists": n_lists}).encode("utf-8")
+            self._replace_file(os.path.join(self.directory, "ivf.json"), state)
+            self._index_state = self._index_marker()
+            logger.info(f"IVF index trained: {n} vectors, {n_lists} lists, PQ={self.codebooks is not None}")
+
+    def _sample(self, size: int) -> np.ndarray:
+        n = len(self.ids)
+        if n <= size:
+            return np.asarray(self._vectors)
+        rows = np.sort(np.random.default_rng(0).choice(n, size=size, replace=False))
+        return np.asarray(self._vectors[rows])
+
+    def _encode(self, start: int, end: int, chunk: int = 8192) -> None:
+        """Append cell assignments (and PQ codes) for rows [start, end)."""
+        for lo in range(start, end, chunk):
+            block = np.asarray(self._vectors[lo:min(end, lo + chunk)])
+            with open(os.path.join(self.directory, "assign.i32"), "ab") as f:
+                f.write(np.argmax(block @ self.centroids.T, axis=1).astype(np.int32).tobytes())
+            if self.codebooks is not None:
+                with open(os.path.join(self.directory, "codes.u8"), "ab") as f:
+                    f.write(self._pq_codes(block).tobytes())
+
+    def _pq_codes(self, block: np.ndarray) -> np.ndarray:
+        m, _, sub = self.codebooks.shape
+        codes = np.empty((len(block), m), dtype=np.uint8)
+        for j in range(m):
+            part = block[:, j * sub:(j + 1) * sub]
+            distances = (self.codebooks[j] ** 2).sum(axis=1) - 2.0 * part @ self.codebooks[j].T
+            codes[:, j] = np.argmin(distances, axis=1)
+        return codes
+
+    def _on_added(self, start: int, end: int) -> None:
+        if self.trained:
+            self._encode(start, end)
+            self._build_lists(np.fromfile(os.path.join(self.directory, "assign.i32"), dtype=np.int32))
+        self._schedule_training()
+
+    def _on_deleted(self, keep: np.ndarray) -> None:
+        if not self.trained:
+            return
+        assign_path = os.path.join(self.directory, "assign.i32")
+        assign = np.fromfile(assign_path, dtype=np.int32)[keep]
+        self._replace_file(assign_path, assign.tobytes())
+        if self.codebooks is not None:
+            codes_path = os.path.join(self.directory, "codes.u8")
+            m = self.codebooks.shape[0]
+            codes = np.fromfile(codes_path, dtype=np.uint8).reshape(-1, m)[keep]
+            self._replace_file(codes_path, codes.tobytes())
+        self._build_lists(assign)
+
+    def _needs_training(self) -> bool:
+        n = len(self.ids)
+        if n < self.min_train_size:
+            return False
+        return not self.trained or n >= 2 * self.trained_count
+
+    def _schedule_training(self) -> None:
+        """Start training if the collection warrants it and none is running."""
+        if self._training or not self._needs_training():
+            return
+        if not self.background:
+            self.train()
+            return
+        if self._trainer is not None and self._trainer.is_alive():
+            return
+        self._trainer = threading.Thread(target=self._train_background, name="ivf-train", daemon=True)
+        self._trainer.start()
+
+    def _train_background(self) -> None:
+        try:
+            self.train()
+        except Exception as e:
+            logger.error(f"IVF training failed; serving exact search: {e}")
+            return
+        with self._lock:
+            # Rows added while k-means ran may already warrant another round
+            if self._needs_training():
+                self._trainer = None
+                self._schedule_training()
+
+    def wait_for_training(self, timeout: Optional[float] = None) -> bool:
+        """Block until background training finishes; True if the index is idle."""
+        trainer = self._trainer
+        while trainer is not None:
+            trainer.join(timeout)
+            if trainer.is_alive():
+                return False
+            if self._trainer is trainer:
+                break
+            trainer = self._trainer
+        return True
+
+    def _search(self, query: np.ndarray, n_results: int, rows: Optional[np.ndarray]) -> tuple:
+        if not self.trained:
+            return super()._search(query, n_results, rows)
+
+        probes = _top_k(self.centroids @ query, self.n_probe)
+        candidates = np.concatenate([self._lists[p] for p in probes])
+        if rows is not None:
+            candidates = np.intersect1d(candidates, rows, assume_unique=True)
+        if not len(candidates):
+            return candidates, np.empty(0, dtype=np.float32)
+
+        if self.codebooks is not None and len(candidates) > n_results * self.rerank:
+            # Asymmetric distance: score codes against per-subspace lookup tables
+            m, _, sub = self.codebooks.shape
+            tables = np.einsum("jkd,jd->jk", self.codebooks, query.reshape(m, sub))
+            codes = np.memmap(
+                os.path.join(self.directory, "codes.u8"), dtype=np.uint8, mode="r", shape=(len(self.ids), m)
+            )[candidates]
+            approx = tables[np.arange(m), codes].sum(axis=1)
+            candidates = candidates[_top_k(approx, n_results * self.rerank)]
+
+        scores = self._vectors[candidates] @ query
+        best = _top_k(scores, n_results)
+        return candidates[best], scores[best]
+
+
+def exact_query(
+    rows: Dict[str, Any],
+    query_embeddings: np.ndarray,
+    n_results: int,
+    include_embeddings: bool = False
+) -> Dict[str, List[Any]]:
+    """
+    Exact cosine top-k over a small set of rows (a `get(..., include_embeddings=True)` result).
+
+    Returns the same shape as `VectorBackend.query`.
+    """
+    queries = _normalize(query_embeddings)
+    result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+    if include_embeddings:
+        result["embeddings"] = []
+    matrix = np.asarray(rows["embeddings"], dtype=np.float32)
+    scores = queries @ _normalize(matrix).T if len(rows["ids"]) else np.empty((len(queries), 0), dtype=np.float32)
+    for q in range(len(queries)):
+        best = _top_k(scores[q], n_results)
+        result["ids"].append([rows["ids"][i] for i in best])
+        result["documents"].append([rows["documents"][i] for i in best])
+        result["metadatas"].append([rows["metadatas"][i] for i in best])
+        result["distances"].append([float(1.0 - scores[q][i]) for i in best])
+        if include_embeddings:
+            result["embeddings"].append(matrix[best])
+    return result
+
+
+BACKENDS = ("chroma", "numpy", "ivf")
+
+
+def create_backend(name: str, persist_directory: str, collection_name: str, **options) -> VectorBackend:
+    """Instantiate the backend `name` for a collection."""
+    if name == "chroma":
+        return ChromaBackend(persist_directory, collection_name)
+    directory = os.path.join(persist_directory, f"{collection_name}.{name}")
+    if name == "numpy":
+        return NumpyBackend(directory)
+    if name == "ivf":
+        return IVFBackend(directory, **options)
+    raise ValueError(f"Unknown vector backend {name!r}; expected one of {BACKENDS}")
@@ -6,6 +6,7 @@ Demonstrates:
 - Latency Tracking
 - Quality Metrics (Faithfulness, Relevance)
 """
+import asyncio
 import streamlit as st
 import time
 import pandas as pd
@@ -64,7 +65,7 @@ def render():
                     st.warning(f"Backend unreachable ({e}). Falling back to local execution...")
                     evaluator = RAGEvaluator(provider="gemini")
                     start_time = time.time()
-                    scores = evaluator.evaluate_response(query, generated_answer, context, ground_truth)
+                    scores = asyncio.run(evaluator.evaluate_response(query, generated_answer, context, ground_truth))
                     latency = time.time() - start_time
                     
                     # Display Results
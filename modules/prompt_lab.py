@@ -10,7 +10,9 @@ import re
 import streamlit as st
 import time
 
+from core.config import settings
 from core.llm_client import LLMClient
+from core.usage import estimate_cost, set_usage_route
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -96,11 +98,10 @@ def render() -> None:
             st.markdown("**Preview:**")
             st.code(final_prompt, language="text")
             
-            # Cost Estimate (Rough)
+            # Cost Estimate (Rough, before the call; real usage is shown after running)
             est_tokens = len(final_prompt) / 4
-            cost = 0.0
-            if provider == "claude":
-                cost = (est_tokens / 1_000_000) * 3.00 # $3/1M input for Sonnet roughly
+            est_model = model or (settings.claude_model if provider == "claude" else settings.gemini_model)
+            cost = estimate_cost(est_model, input_tokens=int(est_tokens))
             st.caption(f"Est. Input Tokens: ~{int(est_tokens)} | Cost: ${cost:.6f}")
 
             if st.button("🚀 Run Experiment", type="primary"):
@@ -113,6 +114,7 @@ def render() -> None:
                             st.error("Provider not configured.")
                         else:
                             with st.spinner("Generating..."):
+                                set_usage_route("ui:prompt_lab")
                                 start = time.time()
                                 response = client.generate(final_prompt)
                                 lat = time.time() - start
@@ -124,7 +126,10 @@ def render() -> None:
                                 st.markdown("---")
                                 st.json({
                                     "model": response.model,
-                                    "tokens_used": response.tokens_used,
+                                    "input_tokens": response.input_tokens,
+                                    "output_tokens": response.output_tokens,
+                                    "cached_tokens": response.cached_tokens,
+                                    "cost_usd": round(response.cost, 6),
                                     "latency_sec": round(lat, 3)
                                 })
                     except Exception as e:
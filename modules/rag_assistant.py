@@ -6,17 +6,15 @@ Demonstrates:
 - Duke LLMOps (Vector Databases)
 - Multi-step reasoning over documents
 """
-import os
-import shutil
-import tempfile
 import streamlit as st
 
 from langchain_core.tools import Tool
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 # Core imports
+from core.embedding_cache import content_hash
+from core.ingestion import IngestionPipeline, iter_pdf_pages_parallel
 from core.rag_engine import VectorStore
+from core.store_registry import get_vector_store
 from core.agents import BaseAgent
 from core.llm_client import get_available_providers
 from utils.logger import get_logger
@@ -67,7 +65,7 @@ def render() -> None:
                             Tool(
                                 name="search_knowledge_base",
                                 func=lambda q: args_wrapper(vs, q),
-                                description="Always use this to search the uploaded documents for specific information."
+                                description="Always use this to search the uploaded documents for specific information. Put several phrasings on separate lines to search them together."
                             )
                         ]
                         
@@ -114,8 +112,9 @@ def render() -> None:
                     
                     # 2. Define Retriever Wrapper
                     # The graph expects a callable that takes a query -> returns docs
+                    # MMR mode drops near-duplicate chunks, so the grader sees distinct evidence
                     def retriever_func(q):
-                        return st.session_state.rag_vector_store.search(q, n_results=5)
+                        return st.session_state.rag_vector_store.search(q, n_results=5, mode="mmr")
                     
                     provider = "gemini" if "gemini" in providers.keys() else "claude"
                     app = create_rag_graph(db_retriever=retriever_func, provider=provider)
@@ -161,49 +160,39 @@ def render() -> None:
                     logger.error(f"RAG Error: {e}")
 
 def args_wrapper(vs, query):
-    """Helper to format search results as string."""
-    results = vs.search(query, n_results=4)
+    """Helper to format search results as string (one query per line)."""
+    queries = [q.strip() for q in query.splitlines() if q.strip()] or [query]
+    # All queries share one embedding call and one vector query
+    seen, results = set(), []
+    for hits in vs.search_many(queries, n_results=4, mode="mmr"):
+        for r in hits:
+            if r.id not in seen:
+                seen.add(r.id)
+                results.append(r)
     return "\n\n".join([f"[Source: {r.source}]\n{r.text}" for r in results])
 
 def _ingest_documents(uploaded_files) -> VectorStore:
-    """Ingest uploaded files into ChromaDB."""
+    """Stream uploaded PDFs into ChromaDB, page by page."""
     try:
-        # Save to temp
-        temp_dir = tempfile.mkdtemp()
-        docs_to_index = []
-        
-        for uploaded_file in uploaded_files:
-            path = os.path.join(temp_dir, uploaded_file.name)
-            with open(path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-            
-            # Load & Split
-            loader = PyPDFLoader(path)
-            raw_docs = loader.load()
-            
-            splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-            chunks = splitter.split_documents(raw_docs)
-            
-            # Extract text and metadata
-            for chunk in chunks:
-                docs_to_index.append({
-                    "text": chunk.page_content,
-                    "metadata": {"source": uploaded_file.name, "page": chunk.metadata.get("page", 0)}
-                })
-        
-        # Index
-        vs = VectorStore(
-            collection_name=f"rag_collection_{len(uploaded_files)}",
+        # One collection per set of file names: re-uploading the same files (even
+        # edited ones) updates it in place, while unrelated uploads never collide
+        names = "\n".join(sorted(f.name for f in uploaded_files))
+        vs = get_vector_store(
+            collection_name=f"rag_{content_hash(names)[:16]}",
             persist_directory="./.chroma_rag"
         )
         
-        texts = [d["text"] for d in docs_to_index]
-        metadatas = [d["metadata"] for d in docs_to_index]
-        
-        vs.add_texts(texts, metadatas=metadatas)
-        
-        # Cleanup
-        shutil.rmtree(temp_dir)
+        # Text extraction fans out across processes; pages arrive in order
+        pages = iter_pdf_pages_parallel(uploaded_files)
+        status = st.empty()
+        pipeline = IngestionPipeline(
+            vs,
+            on_progress=lambda p: status.caption(
+                f"Indexed {p.indexed} new chunks ({p.skipped} unchanged) from {p.pages} pages..."
+            )
+        )
+        pipeline.run(pages)
+        status.empty()
         return vs
 
     except Exception as e:
@@ -13,7 +13,10 @@ import streamlit as st
 import plotly.express as px
 
 # Import our Core components
+from core.embedding_cache import content_hash
+from core.ingestion import IngestionPipeline, iter_pdf_pages
 from core.rag_engine import VectorStore
+from core.store_registry import get_vector_store
 from utils.logger import get_logger
 from core.llm_client import get_available_providers
 from langchain_core.tools import Tool
@@ -168,25 +171,16 @@ def _get_demo_data() -> pd.DataFrame:
     return pd.DataFrame(data)
 
 def _process_context(pdf_file) -> VectorStore:
-    """Process PDF into a temporary vector store."""
+    """Stream a PDF into a temporary vector store."""
+    # Shared store: one directory (and Chroma client) for every uploaded context
+    vs = get_vector_store(
+        collection_name=f"temp_{content_hash(pdf_file.name)[:16]}",
+        persist_directory="./.chroma_temp"
+    )
     try:
-        from pypdf import PdfReader
-        reader = PdfReader(pdf_file)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text()
+        IngestionPipeline(vs).run(iter_pdf_pages(pdf_file, name=pdf_file.name))
     except Exception as e:
         logger.error(f"PDF Error: {e}")
-        text = "Error reading PDF"
-
-    # Create Store
-    vs = VectorStore(
-        collection_name=f"temp_{pdf_file.name}", 
-        persist_directory=f"./.chroma_temp/{pdf_file.name}"
-    )
-    # Chunking
-    chunks = [text[i:i+1000] for i in range(0, len(text), 1000)]
-    vs.add_texts(chunks)
     return vs
 
 def _run_analysis_agent(query: str, df: pd.DataFrame, vector_store: VectorStore = None):
@@ -255,15 +249,16 @@ def _run_analysis_agent(query: str, df: pd.DataFrame, vector_store: VectorStore
         def context_search(q: str):
             """Search business context/definitions."""
             try:
-                results = vector_store.search(q, n_results=2)
-                return "\\n".join([r.text for r in results])
+                queries = [line.strip() for line in q.splitlines() if line.strip()] or [q]
+                texts = dict.fromkeys(r.text for hits in vector_store.search_many(queries, n_results=2) for r in hits)
+                return "\\n".join(texts)
             except Exception:
                 return "No context found."
         
         extra_tools.append(Tool(
             name="lookup_business_context",
             func=context_search,
-            description="Search for business definitions or context in the uploaded PDF."
+            description="Search for business definitions or context in the uploaded PDF. Put several terms on separate lines to look them up together."
         ))
 
     # Create Agent
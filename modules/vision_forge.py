@@ -12,10 +12,7 @@ import json
 import os
 from PIL import Image
 
-from langchain_core.messages import HumanMessage, AIMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_anthropic import ChatAnthropic
-from core.llm_client import get_available_providers
+from core.llm_client import LLMClient, Message, get_available_providers
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -206,44 +203,33 @@ def _file_to_base64(file):
     return base64.b64encode(file.getvalue()).decode('utf-8')
 
 def _run_vision_chat(provider, prompt, b64, mime, history):
-    """Unified Vision Chat Runner."""
-    
-    # Construct Messages
-    # Note: History in LangChain multimodal is tricky. 
-    # For now, we will just send [Image, Prompt] as a fresh call 
-    # but append previous conversation as context TEXT if needed.
-    # To keep it simple and robust: Single turn with history as text context?
-    # Or Multi-turn if supported.
-    
-    # Gemini supports multi-turn with images.
-    
-    messages = []
-    
-    # 1. Add Image to the FIRST message (System/Human)
-    content_block = [
-        {"type": "text", "text": prompt},
-        {"type": "image_url", "image_url": {"url": f"data:{mime};base64,{b64}"}}
-    ]
-    
-    # If we have history, we might want to just append it as text context 
-    # because re-sending base64 every time is expensive/redundant.
-    if history:
-        hist_text = "\n".join([f"{h['role'].upper()}: {h['content']}" for h in history])
-        content_block[0]["text"] = f"Context:\n{hist_text}\n\nCurrent Question: {prompt}"
+    """
+    Unified Vision Chat Runner.
 
-    final_msg = HumanMessage(content=content_block)
-    
-    if provider == "gemini":
-        llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash", google_api_key=os.getenv("GOOGLE_API_KEY"), temperature=0)
-        res = llm.invoke([final_msg])
-        return res.content
-        
-    elif provider == "claude":
-        llm = ChatAnthropic(model="claude-3-5-sonnet-20241022", anthropic_api_key=os.getenv("ANTHROPIC_API_KEY"), temperature=0)
-        res = llm.invoke([final_msg])
-        return res.content
-        
-    return "Error: Provider unavailable."
+    Sends the conversation as real turns with the image attached to the first
+    user message. That message and the end of the prior history are marked as
+    cacheable prefixes, so follow-up questions re-read the image and history
+    from the provider's prompt cache instead of paying for them again.
+    """
+    if not get_available_providers().get(provider):
+        return "Error: Provider unavailable."
+
+    turns = list(history) + [{"role": "user", "content": prompt}]
+    messages = [Message(role=t["role"], content=t["content"]) for t in turns]
+    messages[0] = Message(
+        role="user",
+        content=[
+            {"type": "image", "mime_type": mime, "data": b64},
+            {"type": "text", "text": turns[0]["content"]},
+        ],
+        cache=True,
+    )
+    if len(messages) > 2:
+        messages[-2].cache = True
+
+    response = LLMClient(provider=provider).generate_messages(messages, temperature=0.0)
+    logger.info(f"Vision chat: {response.input_tokens} input tokens ({response.cached_tokens} cached)")
+    return response.content
 
 
 def _run_audio_chat(audio_bytes):
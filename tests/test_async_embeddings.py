@@ -0,0 +1,74 @@
+"""
+Unit tests for non-blocking embedding, evaluation and retrieval paths.
+"""
+import asyncio
+import tempfile
+import time
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from core.embedding_cache import EmbeddingCache
+from core.embeddings import EmbeddingModel
+from core.evals.engine import RAGEvaluator
+from core.rag_engine import VectorStore
+
+
+def google_model() -> EmbeddingModel:
+    with patch.object(EmbeddingModel, "_init_client"):
+        model = EmbeddingModel(provider="google", cache=EmbeddingCache())
+    model._client = MagicMock()
+
+    async def aembed_query(text):
+        await asyncio.sleep(0.05)
+        return [float(len(text)), 1.0]
+
+    model._client.aembed_query = aembed_query
+    model._client.aembed_documents = AsyncMock(side_effect=lambda texts: [[1.0, 0.0] for _ in texts])
+    return model
+
+
+class TestAsyncEmbeddings(unittest.TestCase):
+    def test_native_async_calls_do_not_serialize(self):
+        model = google_model()
+
+        async def run():
+            start = time.perf_counter()
+            vectors = await asyncio.gather(*(model.aembed_query(f"q{i}") for i in range(5)))
+            return vectors, time.perf_counter() - start
+
+        vectors, elapsed = asyncio.run(run())
+        self.assertEqual(vectors[0], [2.0, 1.0])
+        self.assertLess(elapsed, 0.2)
+        model._client.embed_query.assert_not_called()
+
+    def test_async_documents_use_cache(self):
+        model = google_model()
+        asyncio.run(model.aembed_documents(["a", "b"]))
+        self.assertEqual(asyncio.run(model.aembed_documents(["a", "b"])), [[1.0, 0.0], [1.0, 0.0]])
+        model._client.aembed_documents.assert_awaited_once()
+
+
+class TestAsyncEvaluator(unittest.TestCase):
+    def test_similarity_uses_async_embeddings(self):
+        with patch("core.evals.engine.EmbeddingModel", return_value=google_model()), \
+             patch("core.evals.engine.LLMClient") as client_cls:
+            client_cls.return_value.agenerate = AsyncMock(return_value=MagicMock(content="1.0"))
+            evaluator = RAGEvaluator()
+            scores = asyncio.run(evaluator.evaluate_response("q", "abc", "ctx", ground_truth="abc"))
+        self.assertAlmostEqual(scores["correctness"], 1.0, places=5)
+        self.assertEqual(scores["faithfulness"], 1.0)
+
+
+class TestVectorStoreAsearch(unittest.TestCase):
+    def test_asearch_matches_search(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = VectorStore("async_test", EmbeddingModel(provider="local"), persist_directory=tmp)
+            store.add_texts(["revenue grew strongly", "the cat sat"], [{"source": "a"}, {"source": "b"}])
+            sync_ids = [r.id for r in store.search("revenue growth", n_results=2)]
+            async_ids = [r.id for r in asyncio.run(store.asearch("revenue growth", n_results=2))]
+        self.assertEqual(sync_ids, async_ids)
+        self.assertEqual(len(async_ids), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
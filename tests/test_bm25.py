@@ -0,0 +1,93 @@
+"""
+Unit tests for the BM25 keyword index and hybrid retrieval.
+"""
+import os
+import tempfile
+import unittest
+
+from core.bm25 import BM25Index, reciprocal_rank_fusion, tokenize
+from core.embeddings import EmbeddingModel
+from core.rag_engine import VectorStore
+
+DOCS = {
+    "d1": "Quarterly revenue grew twelve percent on strong cloud demand",
+    "d2": "The cat sat on the mat next to another cat",
+    "d3": "Operating margin expanded while revenue was flat",
+}
+
+
+class TestBM25Index(unittest.TestCase):
+    def test_ranking_and_idf(self):
+        index = BM25Index()
+        index.add(list(DOCS), list(DOCS.values()))
+        ranked = [doc_id for doc_id, _ in index.search("cloud revenue")]
+        self.assertEqual(ranked, ["d1", "d3"])
+        self.assertEqual(index.search("zebra"), [])
+        self.assertEqual(tokenize("The Cat, the mat"), ["cat", "mat"])
+
+    def test_persistence_and_incremental_updates(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "kw.sqlite3")
+            index = BM25Index(path)
+            index.add(list(DOCS), list(DOCS.values()))
+            index.remove(["d1"])
+            index.add(["d3"], ["completely different text about a cat"])
+            index.close()
+
+            reopened = BM25Index(path)
+            self.assertEqual(len(reopened), 2)
+            self.assertEqual(reopened.search("revenue"), [])
+            self.assertEqual({d for d, _ in reopened.search("cat")}, {"d2", "d3"})
+
+            # Removal after a reload uses the rebuilt forward map
+            reopened.remove(["d2"])
+            self.assertEqual({d for d, _ in reopened.search("cat")}, {"d3"})
+            self.assertNotIn("mat", reopened._postings)
+            reopened.close()
+
+    def test_reciprocal_rank_fusion(self):
+        fused = reciprocal_rank_fusion([["a", "b"], ["b", "c"]])
+        self.assertEqual(fused[0][0], "b")
+        self.assertEqual({d for d, _ in fused}, {"a", "b", "c"})
+
+
+class TestVectorStoreKeywordModes(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.store = VectorStore("kw_test", EmbeddingModel(provider="local"), persist_directory=self.tmp.name)
+        self.store.add_texts(
+            list(DOCS.values()),
+            [{"source": "finance"}, {"source": "pets"}, {"source": "finance"}],
+            ids=list(DOCS),
+        )
+
+    def test_keyword_search_covers_full_corpus_with_filters(self):
+        results = self.store.search("margin", n_results=3, mode="keyword")
+        self.assertEqual([r.id for r in results], ["d3"])
+        filtered = self.store.search("revenue", n_results=3, mode="keyword", filter_metadata={"source": "pets"})
+        self.assertEqual(filtered, [])
+
+    def test_hybrid_fuses_rankings_and_clear_resets_index(self):
+        results = self.store.search("cloud revenue", n_results=2, mode="hybrid")
+        self.assertEqual(results[0].id, "d1")
+        self.assertTrue(all(0.0 <= r.distance <= 1.0 for r in results))
+
+        self.store.clear()
+        self.assertEqual(len(self.store.keyword_index), 0)
+
+    def test_existing_collection_is_backfilled(self):
+        os.remove(os.path.join(self.tmp.name, "kw_test.bm25.sqlite3"))
+        reopened = VectorStore("kw_test", EmbeddingModel(provider="local"), persist_directory=self.tmp.name)
+        self.assertEqual(len(reopened.keyword_index), 3)
+
+    def test_keyword_search_sees_writes_from_another_store(self):
+        other = VectorStore("kw_test", EmbeddingModel(provider="local"), persist_directory=self.tmp.name)
+        self.assertEqual(self.store.search("bananas", n_results=3, mode="keyword"), [])
+        other.add_texts(["bananas are yellow"], [{"source": "fruit"}], ids=["d4"])
+        self.assertEqual([r.id for r in self.store.search("bananas", n_results=3, mode="keyword")], ["d4"])
+        self.assertEqual(self.store.search("bananas yellow", n_results=1, mode="hybrid")[0].id, "d4")
+
+
+if __name__ == "__main__":
+    unittest.main()
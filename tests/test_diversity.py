@@ -0,0 +1,60 @@
+"""
+Unit tests for MMR reranking and near-duplicate collapsing.
+"""
+import tempfile
+import unittest
+
+import numpy as np
+
+from core.diversity import collapse_near_duplicates, mmr, shingles
+from core.embeddings import EmbeddingModel
+from core.rag_engine import VectorStore
+
+
+class TestDiversity(unittest.TestCase):
+    def test_mmr_trades_relevance_for_diversity(self):
+        query = np.array([1.0, 0.0, 0.0])
+        candidates = np.array([[1.0, 0.1, 0.0], [1.0, 0.11, 0.0], [0.7, 0.0, 0.7]])
+        self.assertEqual(mmr(query, candidates, 2, lambda_mult=1.0), [0, 1])
+        self.assertEqual(mmr(query, candidates, 2, lambda_mult=0.5), [0, 2])
+        self.assertEqual(mmr(query, candidates, 5), [0, 2, 1])
+        self.assertEqual(mmr(query, np.empty((0, 3)), 2), [])
+
+    def test_collapse_near_duplicates(self):
+        base = (
+            "the quarterly revenue grew by twelve percent driven by cloud services and strong renewals "
+            "while operating margin expanded as hosting costs fell and the sales team closed several "
+            "large enterprise deals in the financial services and healthcare verticals during the period"
+        )
+        texts = [
+            base,
+            base.replace("twelve", "12"),       # near-identical edit
+            base[:120],                         # overlap-style prefix, contained in the first
+            "supply chain delays remain the largest operational risk this year",
+        ]
+        self.assertEqual(collapse_near_duplicates(texts), [0, 3])
+        self.assertEqual(collapse_near_duplicates(texts, threshold=1.01), [0, 1, 2, 3])
+        self.assertEqual(shingles("A b"), shingles("a  B"))
+
+
+class TestMMRSearch(unittest.TestCase):
+    def test_mmr_mode_returns_distinct_chunks(self):
+        chunk = "revenue grew strongly in the cloud segment this quarter according to the report"
+        with tempfile.TemporaryDirectory() as tmp:
+            store = VectorStore("mmr", EmbeddingModel(provider="local"), persist_directory=tmp, backend="numpy")
+            store.add_texts(
+                [chunk, chunk + " overall", chunk + " again", "cloud revenue risks include pricing pressure"],
+                [{"source": f"d{i}"} for i in range(4)]
+            )
+            plain = store.search("cloud revenue growth", n_results=3)
+            diverse = store.search("cloud revenue growth", n_results=3, mode="mmr")
+            many = store.search_many(["cloud revenue growth"], n_results=3, mode="mmr")
+
+        self.assertEqual(len({r.source for r in plain} - {"d3"}), 2)
+        # The three near-identical chunks collapse to one, leaving two distinct results
+        self.assertEqual(len(diverse), 2)
+        self.assertIn("d3", {r.source for r in diverse})
+        self.assertEqual([r.id for r in many[0]], [r.id for r in diverse])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+"""
+Unit tests for the content-addressed embedding cache.
+"""
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from core.embedding_cache import EmbeddingCache
+from core.embeddings import EmbeddingModel
+
+
+def make_model(cache: EmbeddingCache) -> EmbeddingModel:
+    with patch.object(EmbeddingModel, "_init_client"):
+        model = EmbeddingModel(cache=cache)
+    model._client = MagicMock()
+    model._client.embed_documents.side_effect = lambda texts: [[float(len(t)), 0.5] for t in texts]
+    model._client.embed_query.side_effect = lambda text: [float(len(text)), 1.0]
+    return model
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "emb.sqlite3")
+
+    def test_persists_across_instances(self):
+        cache = EmbeddingCache(self.path)
+        cache.set_many("google:m:document", ["a", "b"], [[1.0, 2.0], [3.0, 4.0]])
+        cache.close()
+
+        reopened = EmbeddingCache(self.path)
+        self.addCleanup(reopened.close)
+        vectors = reopened.get_many("google:m:document", ["b", "c"])
+        self.assertEqual(vectors[0].tolist(), [3.0, 4.0])
+        self.assertIsNone(vectors[1])
+        self.assertEqual(reopened.stats.disk_hits, 1)
+        self.assertIsNone(reopened.get_many("google:other:document", ["a"])[0])
+
+    def test_memory_lru_eviction(self):
+        cache = EmbeddingCache(max_entries=1)
+        cache.set_many("s", ["a", "b"], [[1.0], [2.0]])
+        self.assertEqual(cache.get_many("s", ["a", "b"])[0], None)
+
+
+class TestEmbeddingModelCaching(unittest.TestCase):
+    def test_only_unseen_text_hits_the_api(self):
+        model = make_model(EmbeddingCache())
+        first = model.embed_documents(["alpha", "beta", "alpha"])
+        second = model.embed_documents(["beta", "gamma"])
+
+        self.assertEqual(first[0], first[2])
+        self.assertEqual(second[0], first[1])
+        calls = [c.args[0] for c in model._client.embed_documents.call_args_list]
+        self.assertEqual(calls, [["alpha", "beta"], ["gamma"]])
+
+    def test_query_and_document_vectors_are_scoped_separately(self):
+        model = make_model(EmbeddingCache())
+        model.embed_documents(["same"])
+        self.assertEqual(model.embed_query("same"), [4.0, 1.0])
+        self.assertEqual(model.embed_query("same"), [4.0, 1.0])
+        model._client.embed_query.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
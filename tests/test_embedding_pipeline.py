@@ -0,0 +1,96 @@
+"""
+Unit tests for the batched, concurrent embedding pipeline.
+"""
+import asyncio
+import threading
+import time
+import unittest
+
+from core.embedding_pipeline import EmbeddingPipeline, split_batches
+from core.rate_limit import RetryPolicy
+
+NO_RETRY = RetryPolicy(max_retries=0, base_delay=0.0, max_delay=0.0)
+
+
+def fake_embed(batch):
+    return [[float(len(text))] for text in batch]
+
+
+class TestSplitBatches(unittest.TestCase):
+    def test_count_and_char_limits(self):
+        self.assertEqual([len(b) for _, b in split_batches(["a"] * 5, batch_size=2)], [2, 2, 1])
+        batches = split_batches(["aaaa", "bb", "cc", "d"], batch_size=10, max_chars=4)
+        self.assertEqual(batches, [(0, ["aaaa"]), (1, ["bb", "cc"]), (3, ["d"])])
+
+
+class TestEmbeddingPipeline(unittest.TestCase):
+    def test_preserves_order_and_runs_concurrently(self):
+        active, peak, lock = [0], [0], threading.Lock()
+
+        def slow_embed(batch):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            return fake_embed(batch)
+
+        texts = ["x" * i for i in range(1, 21)]
+        pipeline = EmbeddingPipeline(slow_embed, batch_size=3, max_workers=4, retry_policy=NO_RETRY)
+        self.assertEqual(pipeline.run(texts).tolist(), fake_embed(texts))
+        self.assertGreater(peak[0], 1)
+
+    def test_failed_batch_is_split_to_isolate_bad_input(self):
+        calls = []
+
+        def picky_embed(batch):
+            calls.append(list(batch))
+            if "bad" in batch and len(batch) > 1:
+                raise ValueError("payload rejected")
+            return fake_embed(batch)
+
+        pipeline = EmbeddingPipeline(picky_embed, batch_size=4, max_workers=1, retry_policy=NO_RETRY)
+        self.assertEqual(pipeline.run(["a", "bad", "ccc", "dd"]).tolist(), fake_embed(["a", "bad", "ccc", "dd"]))
+        self.assertIn(["bad"], calls)
+
+    def test_transient_and_auth_errors_are_not_bisected(self):
+        class ProviderError(Exception):
+            def __init__(self, status_code):
+                super().__init__(f"HTTP {status_code}")
+                self.status_code = status_code
+
+        for status in (401, 503):
+            calls = []
+
+            def failing_embed(batch):
+                calls.append(list(batch))
+                raise ProviderError(status)
+
+            pipeline = EmbeddingPipeline(failing_embed, batch_size=4, max_workers=1, retry_policy=NO_RETRY)
+            with self.assertRaises(ProviderError):
+                pipeline.run(["a", "b", "c", "d"])
+            self.assertEqual(len(calls), 1)
+
+            with self.assertRaises(ProviderError):
+                asyncio.run(pipeline.arun(["a", "b", "c", "d"]))
+            self.assertEqual(len(calls), 2)
+
+    def test_async_variant_bounds_concurrency(self):
+        active, peak = [0], [0]
+
+        async def aembed(batch):
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            await asyncio.sleep(0.01)
+            active[0] -= 1
+            return fake_embed(batch)
+
+        texts = ["t" * i for i in range(1, 11)]
+        pipeline = EmbeddingPipeline(fake_embed, aembed_fn=aembed, batch_size=1, max_workers=3)
+        self.assertEqual(asyncio.run(pipeline.arun(texts)).tolist(), fake_embed(texts))
+        self.assertEqual(peak[0], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
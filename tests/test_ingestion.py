@@ -0,0 +1,185 @@
+"""
+Unit tests for the streaming ingestion pipeline.
+"""
+import io
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from core import ingestion
+from core.embeddings import EmbeddingModel
+from core.ingestion import IngestionPipeline, Page, iter_pdf_pages, iter_pdf_pages_parallel
+from core.rag_engine import VectorStore
+
+
+def pages(n: int):
+    for i in range(n):
+        yield Page(text=f"page {i} alpha. page {i} beta.", metadata={"source": "doc.pdf", "page": i})
+
+
+def make_pdf(texts):
+    """Minimal uncompressed PDF with one line of Helvetica text per page."""
+    objs = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in texts:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objs.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objs.append(
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objs)} 0 R >>"
+        )
+        kids.append(f"{len(objs)} 0 R")
+    objs[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+    out, offsets = b"%PDF-1.4\n", []
+    for i, body in enumerate(objs, start=1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{body}\nendobj\n".encode()
+    xref = len(out)
+    out += f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+    out += f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return out
+
+
+class TestPdfParsing(unittest.TestCase):
+    def test_parallel_matches_serial_order_and_metadata(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "a.pdf")
+            with open(path, "wb") as f:
+                f.write(make_pdf([f"alpha page {i}" for i in range(7)]))
+            upload = io.BytesIO(make_pdf([f"beta page {i}" for i in range(5)]))
+            upload.name = "b.pdf"
+
+            serial = list(iter_pdf_pages(path)) + list(iter_pdf_pages(upload))
+            contexts = []
+            real_executor = ingestion.ProcessPoolExecutor
+
+            def recording_executor(*args, **kwargs):
+                contexts.append(kwargs.get("mp_context"))
+                return real_executor(*args, **kwargs)
+
+            with patch("core.ingestion.ProcessPoolExecutor", recording_executor):
+                parallel = list(iter_pdf_pages_parallel([path, upload], max_workers=2, pages_per_task=2))
+
+        # Workers are spawned, never forked from this multithreaded process
+        self.assertEqual([c.get_start_method() for c in contexts], ["spawn"])
+
+        self.assertEqual([(p.text, p.metadata) for p in parallel], [(p.text, p.metadata) for p in serial])
+        self.assertEqual(parallel[7].metadata, {"source": "b.pdf", "page": 0})
+        self.assertEqual(len(parallel), 12)
+
+
+class TestIngestionPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = VectorStore("ingest", EmbeddingModel(provider="local"), persist_directory=self.tmp.name, backend="numpy")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_indexes_in_batches_with_progress(self):
+        seen = []
+        pipeline = IngestionPipeline(
+            self.store,
+            splitter=lambda text: text.split(". "),
+            batch_size=8,
+            on_progress=lambda p: seen.append((p.indexed, p.batches, threading.current_thread()))
+        )
+        result = pipeline.run(pages(10))
+
+        self.assertEqual((result.pages, result.chunks, result.indexed, result.batches), (10, 20, 20, 3))
+        self.assertEqual([s[:2] for s in seen], [(8, 1), (16, 2), (20, 3)])
+        self.assertTrue(all(s[2] is threading.current_thread() for s in seen))
+        self.assertEqual(self.store.backend.count(), 20)
+        hit = self.store.search("page 7 beta", n_results=1)[0]
+        self.assertEqual(hit.metadata["page"], 7)
+
+    def test_backpressure_bounds_pages_read_ahead(self):
+        read = []
+
+        def lazy_pages():
+            for page in pages(200):
+                read.append(page)
+                yield page
+
+        def slow_progress(p):
+            # Read-ahead is capped by the two queues, one batch being embedded and one pending page
+            self.assertLessEqual(len(read) - p.indexed, 4 * 2 + 4 * 2 + 4 + 1)
+
+        IngestionPipeline(self.store, splitter=lambda t: [t], batch_size=4, queue_size=2,
+                          on_progress=slow_progress).run(lazy_pages())
+        self.assertEqual(self.store.backend.count(), 200)
+
+    def test_errors_propagate_and_stop_stages(self):
+        def broken():
+            yield from pages(3)
+            raise ValueError("corrupt page")
+
+        with self.assertRaises(ValueError):
+            IngestionPipeline(self.store, splitter=lambda t: [t], batch_size=2).run(broken())
+
+        def fail(p):
+            raise RuntimeError("ui gone")
+
+        with self.assertRaises(RuntimeError):
+            IngestionPipeline(self.store, splitter=lambda t: [t], batch_size=1, queue_size=1,
+                              on_progress=fail).run(pages(500))
+
+
+class TestIncrementalIngestion(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = VectorStore("incr", EmbeddingModel(provider="local"), persist_directory=self.tmp.name, backend="numpy")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_pages(self, texts, source="doc.pdf"):
+        pages = [Page(text=t, metadata={"source": source, "page": i}) for i, t in enumerate(texts)]
+        return IngestionPipeline(self.store, splitter=lambda t: [t], batch_size=2).run(pages)
+
+    def test_reingest_skips_embedding_and_replaces_stale_chunks(self):
+        first = self.run_pages(["one", "two", "three", "two"])
+        self.assertEqual((first.indexed, first.skipped), (4, 0))
+
+        with patch.object(self.store.embedding_model, "embed_documents_array") as embed:
+            again = self.run_pages(["one", "two", "three", "two"])
+        embed.assert_not_called()
+        self.assertEqual((again.indexed, again.skipped, again.removed), (0, 4, 0))
+
+        changed = self.run_pages(["one", "two", "four"])
+        self.assertEqual((changed.indexed, changed.skipped, changed.removed), (1, 2, 2))
+        self.assertEqual(sorted(self.store.backend.get()["documents"]), ["four", "one", "two"])
+        self.assertEqual(self.store.search("three", n_results=5, mode="keyword"), [])
+
+        # Other sources are untouched by a source's re-ingest
+        self.run_pages(["other"], source="b.pdf")
+        self.run_pages(["one", "two", "four"])
+        self.assertEqual(self.store.backend.count(), 4)
+
+    def test_same_text_on_two_pages_keeps_both(self):
+        # A chunk repeated on one page is stored once; on another page it is a separate row
+        first = IngestionPipeline(self.store, splitter=lambda t: t.split(" | "), batch_size=8).run([
+            Page(text="Confidential | revenue up", metadata={"source": "doc.pdf", "page": 0}),
+            Page(text="Confidential | costs down | Confidential", metadata={"source": "doc.pdf", "page": 1}),
+        ])
+        self.assertEqual((first.indexed, first.skipped), (4, 1))
+        pages = [m["page"] for m in self.store.backend.get(where={"source": "doc.pdf"})["metadatas"]]
+        self.assertEqual(sorted(pages), [0, 0, 1, 1])
+        hits = self.store.search("Confidential", n_results=5, mode="keyword")
+        self.assertEqual(sorted(h.metadata["page"] for h in hits if h.text == "Confidential"), [0, 1])
+
+    def test_upsert_texts(self):
+        result = self.store.upsert_texts(["a", "b", "a"], [{"source": "x"}] * 3)
+        self.assertEqual((result.added, result.skipped), (2, 1))
+        self.assertEqual(result.ids[0], result.ids[2])
+        self.assertEqual(self.store.upsert_texts(["a", "b"], [{"source": "x"}] * 2).added, 0)
+        self.assertEqual(self.store.upsert_texts(["a"], [{"source": "y"}]).added, 1)
+        paged = self.store.upsert_texts(["a", "a"], [{"source": "x", "page": 1}, {"source": "x", "page": 2}])
+        self.assertEqual((paged.added, len(set(paged.ids))), (2, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
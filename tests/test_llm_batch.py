@@ -0,0 +1,53 @@
+"""
+Unit tests for LLMClient.agenerate_many batched fan-out.
+"""
+import asyncio
+import unittest
+
+from core.llm_client import LLMClient, LLMProvider, LLMResponse
+
+
+class TestAgenerateMany(unittest.TestCase):
+    def setUp(self):
+        self.client = LLMClient(provider="claude", model="claude-test")
+        self.in_flight = 0
+        self.peak = 0
+
+        async def fake_agenerate(prompt, **kwargs):
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            try:
+                # Later prompts finish first to prove ordering is preserved
+                await asyncio.sleep(0.01 * (10 - int(prompt)))
+                if prompt == "3":
+                    raise RuntimeError("provider exploded")
+                return LLMResponse(
+                    content=f"answer {prompt}",
+                    provider=LLMProvider.CLAUDE,
+                    model="claude-test",
+                    tokens_used=10,
+                )
+            finally:
+                self.in_flight -= 1
+
+        self.client.agenerate = fake_agenerate
+
+    def test_order_errors_and_concurrency(self):
+        prompts = [str(i) for i in range(6)]
+        result = asyncio.run(self.client.agenerate_many(prompts, concurrency=2))
+
+        self.assertEqual([item.index for item in result.items], list(range(6)))
+        self.assertEqual(result.responses[0].content, "answer 0")
+        self.assertIsNone(result.responses[3])
+        self.assertIsInstance(result.items[3].error, RuntimeError)
+        self.assertLessEqual(self.peak, 2)
+
+        stats = result.stats()
+        self.assertEqual(stats["total"], 6)
+        self.assertEqual(stats["failed"], 1)
+        self.assertEqual(stats["tokens_used"], 50)
+        self.assertGreaterEqual(stats["latency_p95"], stats["latency_p50"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+Unit tests for the LLM response cache.
+"""
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from core.llm_cache import InMemoryResponseCache, ResponseCache, TieredResponseCache, make_cache_key
+from core.llm_client import LLMClient, LLMProvider, LLMResponse
+
+
+class TestInMemoryResponseCache(unittest.TestCase):
+    def test_lru_eviction(self):
+        cache = InMemoryResponseCache(max_entries=2, ttl=60)
+        cache.set("a", {"v": 1})
+        cache.set("b", {"v": 2})
+        cache.get("a")  # refresh "a" so "b" is least recently used
+        cache.set("c", {"v": 3})
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), {"v": 1})
+        self.assertEqual(len(cache), 2)
+
+    def test_ttl_expiry(self):
+        cache = InMemoryResponseCache(max_entries=10, ttl=-1)
+        cache.set("a", {"v": 1})
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats.misses, 1)
+
+    def test_key_depends_on_all_inputs(self):
+        base = make_cache_key("claude", "m", None, "hi", 0.0, 100)
+        self.assertEqual(base, make_cache_key("claude", "m", None, "hi", 0.0, 100))
+        self.assertNotEqual(base, make_cache_key("claude", "m", "sys", "hi", 0.0, 100))
+        self.assertNotEqual(base, make_cache_key("claude", "m", None, "hi", 0.0, 200))
+
+
+class TestTieredResponseCache(unittest.TestCase):
+    def test_read_through_memory_tier(self):
+        local = InMemoryResponseCache(max_entries=10, ttl=60)
+        shared = InMemoryResponseCache(max_entries=10, ttl=60)
+        shared.set("k", {"v": 1})
+        cache = TieredResponseCache(local, shared)
+
+        self.assertEqual(cache.get("k"), {"v": 1})
+        self.assertEqual(local.get("k"), {"v": 1})  # copied into memory on the way back
+        shared.clear()
+        self.assertEqual(asyncio.run(cache.aget("k")), {"v": 1})
+
+        cache.set("n", {"v": 2})
+        self.assertEqual(shared.get("n"), {"v": 2})
+
+    def test_shared_outage_degrades_to_memory(self):
+        shared = InMemoryResponseCache(max_entries=10, ttl=60)
+        shared._get = MagicMock(side_effect=ConnectionError("redis down"))
+        shared._set = MagicMock(side_effect=ConnectionError("redis down"))
+        cache = TieredResponseCache(InMemoryResponseCache(max_entries=10, ttl=60), shared)
+        cache.set("k", {"v": 1})
+        self.assertEqual(cache.get("k"), {"v": 1})
+        self.assertIsNone(cache.get("missing"))
+        self.assertEqual(shared.stats.errors, 2)
+
+    def test_base_class_is_abstract(self):
+        with self.assertRaises(TypeError):
+            ResponseCache()
+
+
+class TestLLMClientCaching(unittest.TestCase):
+    def setUp(self):
+        self.cache = InMemoryResponseCache(max_entries=10, ttl=60)
+        self.client = LLMClient(provider="claude", model="claude-test", cache=self.cache)
+        self.client.is_available = MagicMock(return_value=True)
+        self.client._generate_claude = MagicMock(return_value=LLMResponse(
+            content="cached answer", provider=LLMProvider.CLAUDE, model="claude-test"
+        ))
+
+    def test_deterministic_requests_are_cached(self):
+        first = self.client.generate("question", temperature=0.0)
+        second = self.client.generate("question", temperature=0.0)
+        self.assertEqual(first.content, second.content)
+        self.client._generate_claude.assert_called_once()
+        self.assertEqual(self.cache.stats.hits, 1)
+
+    def test_sampling_bypasses_cache_unless_forced(self):
+        self.client.generate("question", temperature=0.7)
+        self.client.generate("question", temperature=0.7)
+        self.assertEqual(self.client._generate_claude.call_count, 2)
+
+        self.client.generate("question", temperature=0.7, force_cache=True)
+        self.client.generate("question", temperature=0.7, force_cache=True)
+        self.assertEqual(self.client._generate_claude.call_count, 3)
+
+    def test_async_path_shares_cache(self):
+        self.client._agenerate_uncached = AsyncMock(return_value=LLMResponse(
+            content="async answer", provider=LLMProvider.CLAUDE, model="claude-test"
+        ))
+
+        async def run():
+            await self.client.agenerate("q", temperature=0.0)
+            return await self.client.agenerate("q", temperature=0.0)
+
+        response = asyncio.run(run())
+        self.assertEqual(response.content, "async answer")
+        self.client._agenerate_uncached.assert_awaited_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+"""
+Unit tests for the multi-turn messages API and prompt-cache markers.
+"""
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from core.llm_client import LLMClient, Message, _claude_payload, _gemini_contents
+from core.usage import UsageLedger
+
+IMAGE = {"type": "image", "mime_type": "image/png", "data": "aGVsbG8="}
+
+
+def claude_reply(cache_read: int = 0) -> SimpleNamespace:
+    return SimpleNamespace(
+        content=[SimpleNamespace(text="ok")],
+        stop_reason="end_turn",
+        usage=SimpleNamespace(
+            input_tokens=10, output_tokens=2,
+            cache_read_input_tokens=cache_read, cache_creation_input_tokens=0
+        ),
+    )
+
+
+class TestClaudePayload(unittest.TestCase):
+    def test_cache_markers_and_blocks(self):
+        messages = [
+            Message("user", [IMAGE, {"type": "text", "text": "what is this?"}], cache=True),
+            Message("assistant", "a cat"),
+            Message("user", "what colour?"),
+        ]
+        payload = _claude_payload(messages, "Be brief.", cache_system=True)
+        self.assertEqual(payload["system"][0]["cache_control"], {"type": "ephemeral"})
+        first = payload["messages"][0]["content"]
+        self.assertEqual(first[0]["source"]["media_type"], "image/png")
+        self.assertIn("cache_control", first[-1])
+        self.assertNotIn("cache_control", payload["messages"][2]["content"][-1])
+
+    def test_breakpoints_are_capped_keeping_latest(self):
+        messages = [Message("user", str(i), cache=True) for i in range(6)]
+        payload = _claude_payload(messages, None, cache_system=True)
+        marked = [i for i, m in enumerate(payload["messages"]) if "cache_control" in m["content"][-1]]
+        self.assertEqual(marked, [3, 4, 5])
+
+    def test_gemini_roles_and_inline_data(self):
+        contents = _gemini_contents([Message("user", [IMAGE]), Message("assistant", "hi")])
+        self.assertEqual(contents[0]["parts"][0]["data"], b"hello")
+        self.assertEqual(contents[1]["role"], "model")
+
+
+class TestGenerateMessages(unittest.TestCase):
+    def test_claude_reports_cache_reads(self):
+        client = LLMClient(provider="claude", model="claude-3-5-sonnet-20241022")
+        client._client = MagicMock()
+        client._client.messages.create.return_value = claude_reply(cache_read=500)
+        with patch("core.llm_client.usage_ledger", UsageLedger(sinks=[])):
+            response = client.generate_messages([Message("user", "hi", cache=True)], temperature=0.0)
+        self.assertEqual(response.cached_tokens, 500)
+        self.assertEqual(response.input_tokens, 510)
+        sent = client._client.messages.create.call_args.kwargs
+        self.assertEqual(sent["messages"][0]["content"][0]["cache_control"], {"type": "ephemeral"})
+
+    def test_async_claude_path(self):
+        client = LLMClient(provider="claude", model="claude-3-5-sonnet-20241022")
+        client._async_client = MagicMock()
+        client._async_client.messages.create = AsyncMock(return_value=claude_reply())
+        with patch("core.llm_client.usage_ledger", UsageLedger(sinks=[])):
+            response = asyncio.run(client.agenerate_messages([
+                Message("user", "hi"), Message("assistant", "hello"), Message("user", "again"),
+            ]))
+        self.assertEqual(response.content, "ok")
+        roles = [m["role"] for m in client._async_client.messages.create.call_args.kwargs["messages"]]
+        self.assertEqual(roles, ["user", "assistant", "user"])
+
+
+if __name__ == "__main__":
+    unittest.main()
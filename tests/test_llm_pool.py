@@ -0,0 +1,64 @@
+"""
+Unit tests for the pooled provider client registry.
+"""
+import asyncio
+import unittest
+from unittest.mock import MagicMock, patch
+
+from core.llm_client import LLMClient
+from core.llm_pool import ClientRegistry
+
+
+class TestClientRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = ClientRegistry()
+
+    def tearDown(self):
+        self.registry.close()
+
+    def test_sync_client_reused_per_key(self):
+        a = self.registry.get_client("claude", "claude-test", "sk-ant-one")
+        b = self.registry.get_client("claude", "claude-test", "sk-ant-one")
+        c = self.registry.get_client("claude", "claude-test", "sk-ant-two")
+        self.assertIs(a, b)
+        self.assertIsNot(a, c)
+        self.assertEqual(self.registry.stats()["sync"], 2)
+
+    def test_async_client_scoped_to_event_loop(self):
+        async def acquire():
+            first = self.registry.get_async_client("claude", "claude-test", "sk-ant-one")
+            second = self.registry.get_async_client("claude", "claude-test", "sk-ant-one")
+            self.assertIs(first, second)
+            return first
+
+        first_loop_client = asyncio.run(acquire())
+        second_loop_client = asyncio.run(acquire())
+        self.assertIsNot(first_loop_client, second_loop_client)
+        # The client of the closed loop is pruned on next acquisition
+        self.assertEqual(self.registry.stats()["async"], 1)
+
+    def test_gemini_system_models_reused_and_bounded(self):
+        fake_genai = MagicMock()
+        fake_genai.GenerativeModel.side_effect = lambda model, **kwargs: object()
+        google = MagicMock(generativeai=fake_genai)
+        with patch.dict("sys.modules", {"google": google, "google.generativeai": fake_genai}), \
+                patch("core.llm_pool.MAX_GEMINI_SYSTEM_MODELS", 2):
+            first = self.registry.get_gemini_model("gemini-test", "key", "Be terse.")
+            self.assertIs(self.registry.get_gemini_model("gemini-test", "key", "Be terse."), first)
+            self.registry.get_gemini_model("gemini-test", "key", "Be formal.")
+            self.registry.get_gemini_model("gemini-test", "key", "Be kind.")
+        self.assertEqual(fake_genai.GenerativeModel.call_count, 3)
+        self.assertEqual(self.registry.stats()["gemini_system_models"], 2)
+
+    def test_llm_clients_share_pooled_client(self):
+        with patch("core.llm_client.settings.anthropic_api_key", "sk-ant-test"), \
+             patch("core.llm_client.client_registry", self.registry):
+            first = LLMClient(provider="claude", model="claude-test")
+            second = LLMClient(provider="claude", model="claude-test")
+            self.assertTrue(first.is_available())
+            self.assertTrue(second.is_available())
+            self.assertIs(first._client, second._client)
+
+
+if __name__ == "__main__":
+    unittest.main()
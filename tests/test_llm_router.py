@@ -0,0 +1,131 @@
+"""
+Unit tests for provider failover and hedged requests.
+"""
+import asyncio
+import unittest
+from unittest.mock import MagicMock, patch
+
+from core.llm_client import LLMClient, LLMProvider, LLMResponse
+from core.llm_router import LatencyTracker, LLMRouter, build_llm_client
+
+
+def _client(provider, delay=0.0, error=None, chunks=("a", "b")):
+    client = LLMClient(provider=provider, model=f"{provider}-test")
+    client.cancelled = False
+
+    async def agenerate(prompt, **kwargs):
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            client.cancelled = True
+            raise
+        if error:
+            raise error
+        return LLMResponse(content=f"{provider} answer", provider=client.provider, model=client.model)
+
+    async def astream(prompt, **kwargs):
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            client.cancelled = True
+            raise
+        if error:
+            raise error
+        for chunk in chunks:
+            yield f"{provider}:{chunk}"
+
+    client.agenerate = agenerate
+    client.astream = astream
+    return client
+
+
+class TestLLMRouter(unittest.TestCase):
+    def test_failover_on_error(self):
+        router = LLMRouter([_client("gemini", error=RuntimeError("down")), _client("claude")], hedge=False)
+        response = asyncio.run(router.agenerate("hi"))
+        self.assertEqual(response.content, "claude answer")
+
+    def test_sync_failover(self):
+        primary = LLMClient(provider="gemini")
+        primary.generate = MagicMock(side_effect=RuntimeError("down"))
+        secondary = LLMClient(provider="claude")
+        secondary.generate = MagicMock(return_value=LLMResponse("ok", LLMProvider.CLAUDE, "m"))
+        self.assertEqual(LLMRouter([primary, secondary]).generate("hi").content, "ok")
+
+    def test_hedge_wins_and_cancels_slow_primary(self):
+        slow, fast = _client("gemini", delay=1.0), _client("claude")
+        router = LLMRouter([slow, fast], hedge=True)
+        router.hedge_deadline = lambda client, op: 0.01
+        response = asyncio.run(router.agenerate("hi"))
+        self.assertEqual(response.content, "claude answer")
+        self.assertTrue(slow.cancelled)
+
+    def test_stream_hedge_on_first_token(self):
+        slow, fast = _client("gemini", delay=1.0), _client("claude")
+        router = LLMRouter([slow, fast], hedge=True)
+        router.hedge_deadline = lambda client, op: 0.01
+
+        async def consume():
+            return [chunk async for chunk in router.astream("hi")]
+
+        self.assertEqual(asyncio.run(consume()), ["claude:a", "claude:b"])
+        self.assertTrue(slow.cancelled)
+
+    def test_cancelled_hedge_losers_are_recorded(self):
+        tracker = LatencyTracker()
+        slow, fast = _client("gemini", delay=1.0), _client("claude")
+        router = LLMRouter([slow, fast], hedge=True)
+        router.hedge_deadline = lambda client, op: 0.05
+        with patch("core.llm_router.latency_tracker", tracker):
+            asyncio.run(router.agenerate("hi"))
+            asyncio.run(self._drain(router.astream("hi")))
+        for op in ("generate", "ttft"):
+            samples = list(tracker._samples[f"gemini:gemini-test:{op}"])
+            self.assertEqual(len(samples), 1)
+            self.assertGreaterEqual(samples[0], 0.05)
+
+    @staticmethod
+    async def _drain(stream):
+        return [chunk async for chunk in stream]
+
+    def test_stream_early_exit_closes_inner_stream(self):
+        client = _client("claude", chunks=("a", "b", "c"))
+        closed = []
+        inner = client.astream
+
+        async def tracked(prompt, **kwargs):
+            try:
+                async for chunk in inner(prompt, **kwargs):
+                    yield chunk
+            finally:
+                closed.append(True)
+
+        client.astream = tracked
+        router = LLMRouter([client], hedge=False)
+
+        async def first_only():
+            stream = router.astream("hi")
+            chunk = await stream.__anext__()
+            await stream.aclose()
+            return chunk
+
+        self.assertEqual(asyncio.run(first_only()), "claude:a")
+        self.assertEqual(closed, [True])
+
+    def test_stream_failover_before_first_chunk(self):
+        router = LLMRouter([_client("gemini", error=RuntimeError("down")), _client("claude")])
+
+        async def consume():
+            return [chunk async for chunk in router.astream("hi")]
+
+        self.assertEqual(asyncio.run(consume()), ["claude:a", "claude:b"])
+
+    def test_build_llm_client(self):
+        self.assertIsInstance(build_llm_client("gemini", fallback_providers=[]), LLMClient)
+        router = build_llm_client("gemini", fallback_providers=["gemini", "claude"])
+        self.assertIsInstance(router, LLMRouter)
+        self.assertEqual([c.provider.value for c in router.clients], ["gemini", "claude"])
+
+
+if __name__ == "__main__":
+    unittest.main()
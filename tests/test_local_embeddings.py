@@ -0,0 +1,44 @@
+"""
+Unit tests for the offline hashing embedding provider.
+"""
+import unittest
+
+import numpy as np
+
+from core.embeddings import EmbeddingModel
+from core.local_embeddings import HashingEmbedder
+
+
+class TestHashingEmbedder(unittest.TestCase):
+    def test_unit_vectors_and_similarity_ordering(self):
+        embedder = HashingEmbedder(dim=256)
+        matrix = embedder.embed_array([
+            "quarterly revenue growth accelerated",
+            "revenue growth in the last quarter accelerated",
+            "the cat sat on the mat",
+            "",
+        ])
+        self.assertEqual(matrix.shape, (4, 256))
+        self.assertEqual(matrix.dtype, np.float32)
+        np.testing.assert_allclose(np.linalg.norm(matrix[:3], axis=1), 1.0, rtol=1e-5)
+        self.assertFalse(matrix[3].any())
+        self.assertGreater(matrix[0] @ matrix[1], matrix[0] @ matrix[2])
+
+    def test_batch_matches_single_and_is_deterministic(self):
+        embedder = HashingEmbedder(dim=64)
+        batch = embedder.embed_documents(["alpha beta", "gamma"])
+        self.assertEqual(batch[1], embedder.embed_query("gamma"))
+        self.assertEqual(batch, HashingEmbedder(dim=64).embed_documents(["alpha beta", "gamma"]))
+
+
+class TestLocalEmbeddingModel(unittest.TestCase):
+    def test_selectable_without_api_key(self):
+        model = EmbeddingModel(provider="local")
+        self.assertIsNone(model.cache)
+        vectors = model.embed_documents(["one", "two"])
+        self.assertEqual(len(vectors), 2)
+        self.assertEqual(len(model.embed_query("one")), len(vectors[0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
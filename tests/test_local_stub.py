@@ -0,0 +1,107 @@
+"""
+Unit tests for the deterministic local stub provider.
+"""
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from langchain_core.messages import HumanMessage, ToolMessage
+from langchain_core.tools import tool
+
+from core.llm_client import LLMClient
+from core.local_stub import LocalStubEngine, StubChatModel, StubConfig, StubProviderError
+from core.rate_limit import RetryPolicy, is_retryable
+from core.usage import UsageLedger
+
+
+def fast_config(**overrides) -> StubConfig:
+    values = dict(latency_ms=0.0, latency_distribution="fixed", tokens_per_second=0.0,
+                  response_tokens=8, error_rate=0.0, seed=7)
+    values.update(overrides)
+    return StubConfig(**values)
+
+
+@tool
+def search_web(query: str) -> str:
+    """Search the web."""
+    return "results"
+
+
+class TestLocalStubEngine(unittest.TestCase):
+    def test_content_is_deterministic(self):
+        a = LocalStubEngine("m", fast_config()).generate("hello")
+        b = LocalStubEngine("m", fast_config(seed=99)).generate("hello")
+        self.assertEqual(a["content"], b["content"])
+        self.assertEqual(a["usage"]["output_tokens"], 8)
+        self.assertNotEqual(a["content"], LocalStubEngine("m", fast_config()).generate("other")["content"])
+
+    def test_latency_sampling_is_seeded(self):
+        config = fast_config(latency_ms=100.0, latency_distribution="lognormal", latency_jitter=0.5)
+        first = [LocalStubEngine("m", config)._sample_latency() for _ in range(3)]
+        second = [LocalStubEngine("m", config)._sample_latency() for _ in range(3)]
+        self.assertEqual(first, second)
+
+    def test_injected_errors_are_retryable(self):
+        engine = LocalStubEngine("m", fast_config(error_rate=1.0))
+        with self.assertRaises(StubProviderError) as ctx:
+            engine.generate("hello")
+        self.assertTrue(is_retryable(ctx.exception))
+
+    def test_stream_fills_usage(self):
+        usage = {}
+        chunks = list(LocalStubEngine("m", fast_config()).stream("hello", usage=usage))
+        self.assertEqual(len(chunks), 8)
+        self.assertEqual(usage["output_tokens"], 8)
+
+
+class TestLocalStubClient(unittest.TestCase):
+    def setUp(self):
+        self.engine = LocalStubEngine("local-stub-test", fast_config())
+        self.patcher = patch("core.llm_client.get_stub_engine", return_value=self.engine)
+        self.patcher.start()
+        self.addCleanup(self.patcher.stop)
+
+    def test_sync_async_and_stream_paths(self):
+        client = LLMClient(provider="local_stub", model="local-stub-test")
+        with patch("core.llm_client.usage_ledger", UsageLedger(sinks=[])) as ledger:
+            response = client.generate("hello")
+            streamed = "".join(client.stream("hello"))
+
+            async def run():
+                text = "".join([chunk async for chunk in client.astream("hello")])
+                return (await client.agenerate("hello")).content, text
+
+            async_content, async_stream = asyncio.run(run())
+            self.assertEqual(ledger.summary()[0]["requests"], 4)
+        self.assertEqual(response.content, streamed)
+        self.assertEqual(async_content, async_stream)
+        self.assertEqual(response.output_tokens, 8)
+
+    def test_retries_injected_errors(self):
+        self.engine.config.error_rate = 0.5
+        client = LLMClient(
+            provider="local_stub", model="local-stub-test",
+            retry_policy=RetryPolicy(max_retries=10, base_delay=0.0, max_delay=0.0)
+        )
+        with patch("core.llm_client.usage_ledger", UsageLedger(sinks=[])):
+            self.assertTrue(client.generate("hello").content)
+
+
+class TestStubChatModel(unittest.TestCase):
+    def test_tool_call_then_answer(self):
+        model = StubChatModel(model="local-stub-tools").bind_tools([search_web])
+        with patch("core.local_stub.get_stub_engine", return_value=LocalStubEngine("m", fast_config())):
+            call = model.invoke([HumanMessage(content="find AI news")])
+            self.assertEqual(call.tool_calls[0]["name"], "search_web")
+            self.assertEqual(call.tool_calls[0]["args"], {"query": "find AI news"})
+
+            answer = model.invoke([
+                HumanMessage(content="find AI news"), call,
+                ToolMessage(content="results", tool_call_id=call.tool_calls[0]["id"]),
+            ])
+        self.assertFalse(answer.tool_calls)
+        self.assertEqual(answer.usage_metadata["output_tokens"], 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
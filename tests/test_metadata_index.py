@@ -0,0 +1,115 @@
+"""
+Unit tests for metadata secondary indexes and pre-filtered search.
+"""
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from core.embeddings import EmbeddingModel
+from core.metadata_index import MetadataIndex
+from core.rag_engine import VectorStore
+
+
+class TestMetadataIndex(unittest.TestCase):
+    def test_planning_and_persistence(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "meta.sqlite3")
+            index = MetadataIndex(["source", "page"], path)
+            index.add(["a", "b", "c"], [
+                {"source": "x.pdf", "page": 1, "other": 5},
+                {"source": "x.pdf", "page": 7},
+                {"source": "y.pdf", "page": 2},
+            ])
+            self.assertEqual(index.candidates({"source": "x.pdf"}), {"a", "b"})
+            self.assertEqual(index.candidates({"page": {"$gte": 2, "$lt": 8}}), {"b", "c"})
+            self.assertEqual(index.candidates({"source": {"$in": ["y.pdf", "z.pdf"]}}), {"c"})
+            self.assertEqual(index.candidates({"$and": [{"source": "x.pdf"}, {"other": 5}]}), {"a", "b"})
+            self.assertEqual(index.candidates({"$or": [{"source": "y.pdf"}, {"page": 1}]}), {"a", "c"})
+            self.assertIsNone(index.candidates({"$or": [{"source": "y.pdf"}, {"other": 5}]}))
+            self.assertIsNone(index.candidates({"source": {"$ne": "x.pdf"}}))
+            self.assertIsNone(index.candidates(None))
+
+            index.remove(["a"])
+            index.close()
+            reopened = MetadataIndex(["source", "page"], path)
+            self.assertEqual(reopened.candidates({"source": "x.pdf"}), {"b"})
+            self.assertEqual(len(reopened), 2)
+
+
+class TestPrefilteredSearch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = VectorStore("meta", EmbeddingModel(provider="local"), persist_directory=self.tmp.name, backend="ivf")
+        self.store.backend.min_train_size = 100
+        texts = [f"report {i} revenue section {i % 7}" for i in range(400)]
+        metas = [{"source": "big.pdf" if i < 396 else "small.pdf", "page": i} for i in range(400)]
+        self.store.add_texts(texts, metas)
+
+    def tearDown(self):
+        self.store.backend.wait_for_training()
+        self.tmp.cleanup()
+
+    def test_selective_filter_returns_complete_results(self):
+        with patch.object(self.store.backend, "query", wraps=self.store.backend.query) as query:
+            results = self.store.search("revenue", n_results=4, filter_metadata={"source": "small.pdf"})
+            ranged = self.store.search("revenue", n_results=10, filter_metadata={
+                "$and": [{"source": "big.pdf"}, {"page": {"$gte": 10, "$lt": 15}}]
+            })
+        query.assert_not_called()
+        self.assertEqual(sorted(r.metadata["page"] for r in results), [396, 397, 398, 399])
+        self.assertEqual(sorted(r.metadata["page"] for r in ranged), [10, 11, 12, 13, 14])
+
+        # Ranking matches the exact backend score
+        exact = self.store.backend.get(ids=[r.id for r in results], include_embeddings=True)
+        query_vec = self.store.embedding_model.embed_query_array("revenue")
+        scores = dict(zip(exact["ids"], exact["embeddings"] @ query_vec))
+        self.assertEqual([r.id for r in results], sorted(scores, key=scores.get, reverse=True))
+
+    def test_broad_filters_use_the_backend_and_index_tracks_writes(self):
+        with patch("core.rag_engine.settings.prefilter_max_candidates", 10), \
+                patch.object(self.store.backend, "query", wraps=self.store.backend.query) as query:
+            self.store.search("revenue", n_results=3, filter_metadata={"source": "big.pdf"})
+        query.assert_called_once()
+
+        self.store.delete([r.id for r in self.store.search("x", n_results=4, filter_metadata={"source": "small.pdf"})])
+        self.assertEqual(self.store.search("revenue", n_results=4, filter_metadata={"source": "small.pdf"}), [])
+        self.assertEqual(len(self.store.metadata_index), 396)
+        self.assertTrue(np.isfinite(self.store.search("revenue", n_results=1, mode="mmr",
+                                                      filter_metadata={"page": 3})[0].distance))
+
+
+class TestPrefilterAcrossStores(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def store(self) -> VectorStore:
+        return VectorStore("two", EmbeddingModel(provider="local"), persist_directory=self.tmp.name, backend="chroma")
+
+    def test_empty_candidates_and_writes_from_another_store(self):
+        writer, reader = self.store(), self.store()
+        writer.add_texts(["apple pie recipe"], [{"source": "apple.pdf", "page": 0}])
+
+        # No candidates: answered from the index without an (invalid) empty Chroma get
+        self.assertEqual(reader.search("tart", n_results=3, filter_metadata={"source": "cherry.pdf"}), [])
+        self.assertEqual(len(reader.metadata_index), 1)
+
+        writer.add_texts(["cherry tart recipe"], [{"source": "cherry.pdf", "page": 0}])
+        hits = reader.search("tart", n_results=3, filter_metadata={"source": "cherry.pdf"})
+        self.assertEqual([h.source for h in hits], ["cherry.pdf"])
+        self.assertEqual(len(reader.metadata_index), 2)
+
+        # The writer's own index stayed in sync without a reload
+        with patch.object(writer.metadata_index, "reload") as reload:
+            self.assertEqual(len(writer.search("pie", n_results=3, filter_metadata={"source": "apple.pdf"})), 1)
+        reload.assert_not_called()
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+"""
+Unit tests for latency histograms and streaming instrumentation.
+"""
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from fastapi.testclient import TestClient
+
+from api.main import app
+from core.llm_client import LLMClient
+from core.metrics import Histogram, MetricsRegistry, StreamTimer
+
+
+class TestHistogram(unittest.TestCase):
+    def test_quantiles_and_buckets(self):
+        hist = Histogram(buckets=(0.1, 1.0, 10.0))
+        for value in (0.05, 0.5, 0.5, 5.0):
+            hist.observe(value)
+        snap = hist.snapshot()
+        self.assertEqual(snap["count"], 4)
+        self.assertEqual(snap["buckets"]["+Inf"], 4)
+        self.assertEqual(hist.quantile(0.5), 1.0)
+        self.assertEqual(hist.quantile(0.95), 10.0)
+
+
+class TestStreamTimer(unittest.TestCase):
+    def test_records_ttft_gaps_and_duration(self):
+        registry = MetricsRegistry()
+        timer = StreamTimer("gemini", "gemini-test", registry=registry)
+        for chunk in ("a", "b", "c"):
+            timer.chunk(chunk)
+        timer.finish(output_tokens=3)
+
+        names = {entry["name"]: entry for entry in registry.snapshot()}
+        self.assertEqual(names["llm_stream_ttft_seconds"]["count"], 1)
+        self.assertEqual(names["llm_stream_inter_chunk_seconds"]["count"], 2)
+        self.assertEqual(names["llm_stream_duration_seconds"]["labels"]["status"], "ok")
+        self.assertIn("llm_stream_tokens_per_second", names)
+
+    def test_client_stream_is_instrumented(self):
+        registry = MetricsRegistry()
+        client = LLMClient(provider="gemini", model="gemini-test")
+        client._client = MagicMock()
+        client._client.generate_content.return_value = [
+            SimpleNamespace(text="x", usage_metadata=None),
+            SimpleNamespace(text="y", usage_metadata=None),
+        ]
+        with patch("core.metrics.metrics_registry", registry):
+            self.assertEqual(list(client.stream("hi")), ["x", "y"])
+        ttft = registry.snapshot(prefix="llm_stream_ttft")[0]
+        self.assertEqual(ttft["labels"], {"provider": "gemini", "model": "gemini-test"})
+
+
+class TestMetricsAPI(unittest.TestCase):
+    def test_prometheus_exposition(self):
+        registry = MetricsRegistry()
+        registry.observe("llm_stream_ttft_seconds", 0.2, provider="claude", model="m")
+        with patch("api.routes.metrics.metrics_registry", registry):
+            response = TestClient(app).get("/metrics/prometheus")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('llm_stream_ttft_seconds_count{model="m",provider="claude"} 1', response.text)
+
+    def test_response_histogram_is_labelled_by_route_template(self):
+        registry = MetricsRegistry()
+        with patch("api.main.metrics_registry", registry):
+            client = TestClient(app)
+            for cid in ("a1", "b2", "c3"):
+                client.get(f"/usage/correlation/{cid}")
+            client.get("/probe/one")
+            client.get("/probe/two")
+        paths = sorted(entry["labels"]["path"] for entry in registry.snapshot())
+        self.assertEqual(paths, ["/usage/correlation/{correlation_id}", "unmatched"])
+
+
+if __name__ == "__main__":
+    unittest.main()
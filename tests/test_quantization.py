@@ -0,0 +1,51 @@
+"""
+Unit tests for compact embedding matrices and quantization.
+"""
+import unittest
+
+import numpy as np
+
+from core.embedding_cache import EmbeddingCache
+from core.embeddings import EmbeddingModel
+from core.quantization import QuantizedEmbeddings, cosine_similarity
+
+
+class TestQuantizedEmbeddings(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.matrix = rng.normal(size=(50, 64)).astype(np.float32)
+        self.query = rng.normal(size=64).astype(np.float32)
+
+    def test_storage_sizes(self):
+        sizes = {d: QuantizedEmbeddings.quantize(self.matrix, d).nbytes for d in ("float32", "float16", "int8")}
+        self.assertEqual(sizes["float32"], 50 * 64 * 4)
+        self.assertEqual(sizes["float16"], 50 * 64 * 2)
+        self.assertEqual(sizes["int8"], 50 * 64 + 50 * 4)
+
+    def test_int8_similarity_tracks_float32(self):
+        exact = QuantizedEmbeddings.quantize(self.matrix, "float32").cosine(self.query)
+        approx = QuantizedEmbeddings.quantize(self.matrix, "int8").cosine(self.query)
+        np.testing.assert_allclose(approx, exact, atol=0.02)
+        self.assertEqual(int(np.argmax(approx)), int(np.argmax(exact)))
+
+    def test_zero_rows_and_bad_dtype(self):
+        quantized = QuantizedEmbeddings.quantize(np.zeros((2, 4)), "int8")
+        self.assertFalse(quantized.cosine(np.ones(4)).any())
+        self.assertEqual(cosine_similarity(np.zeros(3), np.ones(3)), 0.0)
+        with self.assertRaises(ValueError):
+            QuantizedEmbeddings.quantize(self.matrix, "int4")
+
+
+class TestEmbeddingModelArrays(unittest.TestCase):
+    def test_array_api_is_contiguous_float32(self):
+        model = EmbeddingModel(provider="local", cache=EmbeddingCache())
+        matrix = model.embed_documents_array(["alpha", "beta", "alpha"])
+        self.assertEqual(matrix.dtype, np.float32)
+        self.assertTrue(matrix.flags["C_CONTIGUOUS"])
+        np.testing.assert_array_equal(matrix[0], matrix[2])
+        self.assertEqual(model.embed_query_array("alpha").shape, (matrix.shape[1],))
+        self.assertEqual(model.embed_documents_quantized(["alpha"], "int8").dtype, "int8")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+Unit tests for provider rate limiting and retry policies.
+"""
+import asyncio
+import unittest
+from unittest.mock import MagicMock
+
+from core.rate_limit import (
+    RateLimiter,
+    RetryPolicy,
+    TokenBucket,
+    acall_with_retry,
+    aretry_stream,
+    call_with_retry,
+    is_retryable,
+    retry_after_seconds,
+)
+
+
+class ProviderError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = MagicMock(headers=headers or {})
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_reserve_returns_wait_once_exhausted(self):
+        bucket = TokenBucket(rate_per_minute=60, capacity=2)
+        self.assertEqual(bucket.reserve(1), 0.0)
+        self.assertEqual(bucket.reserve(1), 0.0)
+        wait = bucket.reserve(1)
+        self.assertGreater(wait, 0.9)
+        self.assertLessEqual(wait, 1.0)
+
+    def test_reconcile_refunds_overestimate(self):
+        limiter = RateLimiter(tokens_per_minute=1000)
+        limiter.acquire(800)
+        limiter.reconcile(estimated=800, actual=100)
+        self.assertGreater(limiter.tokens.available, 900)
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def setUp(self):
+        self.policy = RetryPolicy(max_retries=3, base_delay=0.0, max_delay=0.0)
+
+    def test_classification(self):
+        self.assertTrue(is_retryable(ProviderError(429)))
+        self.assertTrue(is_retryable(ProviderError(529)))
+        self.assertFalse(is_retryable(ProviderError(400)))
+
+    def test_retry_after_header_is_honored(self):
+        self.assertEqual(retry_after_seconds(ProviderError(429, {"retry-after": "7"})), 7.0)
+        policy = RetryPolicy(max_retries=1, base_delay=1.0, max_delay=5.0)
+        self.assertEqual(policy.delay_for(0, ProviderError(429, {"retry-after": "7"})), 5.0)
+
+    def test_transient_errors_are_retried(self):
+        fn = MagicMock(side_effect=[ProviderError(529), ProviderError(429), "ok"])
+        self.assertEqual(call_with_retry(fn, self.policy), "ok")
+        self.assertEqual(fn.call_count, 3)
+
+    def test_permanent_errors_raise_immediately(self):
+        fn = MagicMock(side_effect=ProviderError(401))
+        with self.assertRaises(ProviderError):
+            call_with_retry(fn, self.policy)
+        fn.assert_called_once()
+
+    def test_async_retry(self):
+        attempts = []
+
+        async def flaky():
+            attempts.append(1)
+            if len(attempts) < 2:
+                raise ProviderError(503)
+            return "done"
+
+        self.assertEqual(asyncio.run(acall_with_retry(flaky, self.policy)), "done")
+        self.assertEqual(len(attempts), 2)
+
+    def test_stream_not_retried_after_first_chunk(self):
+        opened = []
+
+        async def factory():
+            opened.append(1)
+            yield "partial"
+            raise ProviderError(529)
+
+        async def consume():
+            return [chunk async for chunk in aretry_stream(factory, self.policy)]
+
+        with self.assertRaises(ProviderError):
+            asyncio.run(consume())
+        self.assertEqual(len(opened), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+"""
+Unit tests for the VectorStore search result cache.
+"""
+import asyncio
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from core.embeddings import EmbeddingModel
+from core.rag_engine import SearchResultCache, VectorStore
+
+
+class TestSearchResultCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = VectorStore("cache", EmbeddingModel(provider="local"), persist_directory=self.tmp.name, backend="numpy")
+        self.store.add_texts(["revenue grew strongly", "the cat sat"], [{"source": "a"}, {"source": "b"}])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_repeat_queries_skip_embedding_and_index(self):
+        first = self.store.search("Revenue  growth", n_results=1, mode="hybrid")
+        with patch.object(self.store.embedding_model, "embed_query_array") as embed, \
+                patch.object(self.store.backend, "query") as query:
+            again = self.store.search("revenue growth", n_results=1, mode="hybrid")
+            again_async = asyncio.run(self.store.asearch("revenue growth", n_results=1, mode="hybrid"))
+            many = self.store.search_many(["revenue growth"], n_results=1, mode="hybrid")
+        embed.assert_not_called()
+        query.assert_not_called()
+        self.assertEqual([r.id for r in again], [r.id for r in first])
+        self.assertEqual([r.id for r in again_async], [r.id for r in many[0]])
+        self.assertEqual(self.store.result_cache.stats.hits, 3)
+
+        # Callers get copies, so mutating a result cannot poison the cache
+        again[0].distance = 99.0
+        self.assertNotEqual(self.store.search("revenue growth", n_results=1, mode="hybrid")[0].distance, 99.0)
+
+    def test_options_are_part_of_the_key(self):
+        self.store.search("cat", n_results=1)
+        with patch.object(self.store, "_search_by_embedding", wraps=self.store._search_by_embedding) as run:
+            self.store.search("cat", n_results=2)
+            self.store.search("cat", n_results=1, filter_metadata={"source": "b"})
+        self.assertEqual(run.call_count, 2)
+
+    def test_writes_invalidate(self):
+        self.assertEqual(len(self.store.search("dog barked", n_results=5, mode="keyword")), 0)
+        self.store.add_texts(["the dog barked"], [{"source": "c"}])
+        self.assertEqual(self.store.search("dog barked", n_results=5, mode="keyword")[0].source, "c")
+
+        self.store.delete(self.store.backend.get()["ids"])
+        self.assertEqual(self.store.search("dog barked", n_results=5, mode="keyword"), [])
+        self.assertEqual(len(self.store.result_cache), 1)
+
+    def test_writes_through_another_store_invalidate(self):
+        # Two stores on one Chroma collection share the client, so B sees A's rows
+        a = VectorStore("shared", EmbeddingModel(provider="local"), persist_directory=self.tmp.name, backend="chroma")
+        b = VectorStore("shared", EmbeddingModel(provider="local"), persist_directory=self.tmp.name, backend="chroma")
+        a.add_texts(["apple pie recipe"], [{"source": "apple"}])
+        self.assertEqual(b.search("cherry tart", n_results=1)[0].source, "apple")
+
+        a.add_texts(["cherry tart recipe"], [{"source": "cherry"}])
+        self.assertEqual(b.search("cherry tart", n_results=1)[0].source, "cherry")
+        self.assertEqual(a.version, b.version)
+
+    def test_lru_bound_and_disable(self):
+        cache = SearchResultCache(max_entries=2)
+        for i in range(3):
+            cache.set(SearchResultCache.key(0, f"q{i}", 4, None, "semantic"), [])
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(SearchResultCache.key(0, "q0", 4, None, "semantic")))
+
+        disabled = SearchResultCache(max_entries=0)
+        disabled.set(("k",), [])
+        self.assertIsNone(disabled.get(("k",)))
+
+
+if __name__ == "__main__":
+    unittest.main()
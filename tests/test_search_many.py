@@ -0,0 +1,47 @@
+"""
+Unit tests for batched multi-query search on VectorStore.
+"""
+import asyncio
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from core.embeddings import EmbeddingModel
+from core.rag_engine import VectorStore
+
+DOCS = ["quarterly revenue grew strongly", "the cat sat on the mat", "risk factors include supply chain delays"]
+
+
+class TestSearchMany(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = VectorStore("many", EmbeddingModel(provider="local"), persist_directory=self.tmp.name, backend="numpy")
+        self.store.add_texts(DOCS, [{"source": f"d{i}"} for i in range(len(DOCS))])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_matches_single_searches_with_one_backend_query(self):
+        queries = ["revenue growth", "cat on a mat", "supply chain risk"]
+        expected = [[r.id for r in self.store.search(q, n_results=2)] for q in queries]
+        self.store.result_cache.clear()
+        with patch.object(self.store.backend, "query", wraps=self.store.backend.query) as query, \
+                patch.object(self.store.embedding_model, "embed_queries_array",
+                             wraps=self.store.embedding_model.embed_queries_array) as embed:
+            batches = self.store.search_many(queries, n_results=2)
+        self.assertEqual([[r.id for r in hits] for hits in batches], expected)
+        self.assertEqual(query.call_count, 1)
+        self.assertEqual(embed.call_count, 1)
+        self.assertEqual(query.call_args[0][0].shape[0], 3)
+
+    def test_modes_and_async(self):
+        for mode in ("keyword", "hybrid"):
+            batches = self.store.search_many(["cat", "revenue"], n_results=1, mode=mode)
+            self.assertEqual([hits[0].source for hits in batches], ["d1", "d0"])
+        batches = asyncio.run(self.store.asearch_many(["supply chain", "cat"], n_results=1))
+        self.assertEqual([hits[0].source for hits in batches], ["d2", "d1"])
+        self.assertEqual(self.store.search_many([]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+"""
+Unit tests for single-flight coalescing of identical in-flight LLM calls.
+"""
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from core.llm_client import LLMClient
+from core.local_stub import LocalStubEngine, StubConfig
+from core.singleflight import SingleFlight
+from core.usage import UsageLedger
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_calls_share_one_upstream_call(self):
+        flights = SingleFlight()
+        calls = []
+
+        async def upstream():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "result"
+
+        async def run():
+            return await asyncio.gather(*(flights.do("k", upstream) for _ in range(5)))
+
+        self.assertEqual(asyncio.run(run()), ["result"] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual((flights.started, flights.shared), (1, 4))
+
+    def test_errors_reach_every_waiter(self):
+        flights = SingleFlight()
+
+        async def upstream():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        async def run():
+            return await asyncio.gather(*(flights.do("k", upstream) for _ in range(3)), return_exceptions=True)
+
+        results = asyncio.run(run())
+        self.assertTrue(all(isinstance(r, ValueError) for r in results))
+
+    def test_stream_fan_out_replays_to_late_subscribers(self):
+        flights = SingleFlight()
+        opened = []
+
+        async def source():
+            opened.append(1)
+            for chunk in ("a", "b", "c"):
+                await asyncio.sleep(0.005)
+                yield chunk
+
+        async def consume(delay):
+            await asyncio.sleep(delay)
+            return "".join([c async for c in flights.stream("k", source)])
+
+        async def run():
+            return await asyncio.gather(consume(0), consume(0.008))
+
+        self.assertEqual(asyncio.run(run()), ["abc", "abc"])
+        self.assertEqual(len(opened), 1)
+
+    def test_upstream_cancelled_when_all_subscribers_leave(self):
+        flights = SingleFlight()
+        closed = []
+
+        async def source():
+            try:
+                for i in range(100):
+                    await asyncio.sleep(0.001)
+                    yield str(i)
+            finally:
+                closed.append(1)
+
+        async def run():
+            stream = flights.stream("k", source)
+            await stream.__anext__()
+            await stream.aclose()
+            await asyncio.sleep(0.01)
+            return flights.in_flight()
+
+        self.assertEqual(asyncio.run(run()), 0)
+        self.assertEqual(closed, [1])
+
+
+class TestClientCoalescing(unittest.TestCase):
+    def setUp(self):
+        config = StubConfig(latency_ms=10.0, latency_distribution="fixed", tokens_per_second=0.0,
+                            response_tokens=4, error_rate=0.0, seed=1)
+        patcher = patch("core.llm_client.get_stub_engine", return_value=LocalStubEngine("m", config))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_agenerate_and_astream_meter_one_call(self):
+        client = LLMClient(provider="local_stub", model="local-stub-coalesce")
+
+        async def stream_text():
+            return "".join([c async for c in client.astream("same", coalesce=True)])
+
+        async def run():
+            generated = await asyncio.gather(*(client.agenerate("same", temperature=0) for _ in range(4)))
+            streamed = await asyncio.gather(*(stream_text() for _ in range(3)))
+            return generated, streamed
+
+        with patch("core.llm_client.usage_ledger", UsageLedger(sinks=[])) as ledger:
+            generated, streamed = asyncio.run(run())
+            self.assertEqual(ledger.summary()[0]["requests"], 2)
+        self.assertEqual(len({r.content for r in generated}), 1)
+        self.assertEqual(streamed[0], generated[0].content)
+        self.assertEqual(len(set(streamed)), 1)
+
+    def test_sampled_requests_are_not_coalesced(self):
+        client = LLMClient(provider="local_stub", model="local-stub-sampled")
+
+        async def run():
+            return await asyncio.gather(*(client.agenerate("same", temperature=0.7) for _ in range(4)))
+
+        with patch("core.llm_client.usage_ledger", UsageLedger(sinks=[])) as ledger:
+            asyncio.run(run())
+            self.assertEqual(ledger.summary()[0]["requests"], 4)
+
+    def test_batch_stats_count_tokens_once_per_flight(self):
+        client = LLMClient(provider="local_stub", model="local-stub-batch")
+        with patch("core.llm_client.usage_ledger", UsageLedger(sinks=[])):
+            result = asyncio.run(client.agenerate_many(["same"] * 3 + ["other"], temperature=0))
+        responses = result.responses
+        self.assertIs(responses[0], responses[1])
+        expected = responses[0].tokens_used + responses[3].tokens_used
+        self.assertEqual(result.stats()["tokens_used"], expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+"""
+Unit tests for the shared vector store registry.
+"""
+import gc
+import os
+import tempfile
+import unittest
+
+from core.embeddings import EmbeddingModel, get_embedding_model
+from core.store_registry import StoreRegistry
+from core.vector_backends import ChromaBackend
+
+
+class TestStoreRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.model = EmbeddingModel(provider="local")
+        self.registry = StoreRegistry(idle_seconds=60, max_open=2)
+
+    def tearDown(self):
+        self.registry.close_all()
+        self.tmp.cleanup()
+
+    def get(self, name):
+        return self.registry.get(name, self.tmp.name, backend="numpy", embedding_model=self.model)
+
+    def test_reuses_stores_and_opens_lazily(self):
+        store = self.get("docs")
+        self.assertIs(self.get("docs"), store)
+        self.assertIsNot(self.get("other"), store)
+        self.assertFalse(store.is_open)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, "docs.numpy")))
+
+        store.add_texts(["alpha beta"], [{"source": "a"}])
+        self.assertTrue(store.is_open)
+
+    def test_idle_eviction_releases_but_store_stays_usable(self):
+        store = self.get("docs")
+        store.add_texts(["alpha beta", "gamma delta"], [{"source": "a"}, {"source": "b"}])
+        self.assertEqual(self.registry.evict(now=store.last_used + 61), 1)
+        self.assertFalse(store.is_open)
+        self.assertEqual(len(self.registry), 0)
+
+        # A caller still holding the store reopens it transparently
+        self.assertEqual(store.search("gamma", n_results=1, mode="keyword")[0].source, "b")
+        self.assertEqual(store.search("gamma", n_results=1)[0].source, "b")
+
+    def test_open_store_cap(self):
+        first = self.get("one")
+        first.add_texts(["x"], [{"source": "x"}])
+        self.get("two")
+        self.get("three")
+        self.assertEqual(len(self.registry), 2)
+        self.assertFalse(first.is_open)
+
+    def test_evicted_store_is_handed_back_while_held(self):
+        store = self.get("one")
+        self.get("two")
+        self.get("three")
+        self.assertFalse(store.is_open)
+        self.assertIs(self.get("one"), store)
+        self.assertEqual(len(self.registry), 2)
+
+        # Once nobody holds it, the registry forgets it
+        self.registry.close_all()
+        del store
+        gc.collect()
+        self.assertEqual(len(self.registry._released), 0)
+
+    def test_shared_clients_and_models(self):
+        a = ChromaBackend(self.tmp.name, "coll_a")
+        b = ChromaBackend(self.tmp.name, "coll_b")
+        self.assertIs(a._client, b._client)
+        self.assertIs(get_embedding_model("local"), get_embedding_model("local"))
+
+
+if __name__ == "__main__":
+    unittest.main()
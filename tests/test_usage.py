@@ -0,0 +1,94 @@
+"""
+Unit tests for token accounting and the usage ledger.
+"""
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from fastapi.testclient import TestClient
+
+from api.main import app
+from core.llm_client import LLMClient
+from core.usage import UsageLedger, UsageRecord, estimate_cost
+
+
+class TestUsageLedger(unittest.TestCase):
+    def test_aggregation_and_flush(self):
+        sink = MagicMock()
+        ledger = UsageLedger(flush_interval=3600, sinks=[sink])
+        ledger.record(UsageRecord("claude", "claude-3-5-sonnet-x", 1000, 100, route="/a", correlation_id="c1"))
+        ledger.record(UsageRecord("claude", "claude-3-5-sonnet-x", 500, 50, route="/a", correlation_id="c1"))
+        ledger.record(UsageRecord("gemini", "gemini-1.5-flash", 10, 10, route="/b", correlation_id="c2"))
+
+        rows = ledger.summary(route="/a")
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["requests"], 2)
+        self.assertEqual(rows[0]["input_tokens"], 1500)
+        self.assertEqual(ledger.for_correlation_id("c1")["output_tokens"], 150)
+
+        sink.assert_not_called()
+        self.assertEqual(len(ledger.flush()), 3)
+        sink.assert_called_once()
+
+    def test_cached_tokens_are_discounted(self):
+        full = estimate_cost("claude-3-5-sonnet-20241022", input_tokens=1_000_000)
+        cached = estimate_cost("claude-3-5-sonnet-20241022", input_tokens=1_000_000, cached_tokens=1_000_000)
+        self.assertAlmostEqual(full, 3.00)
+        self.assertAlmostEqual(cached, 0.30)
+        self.assertEqual(estimate_cost("unknown-model", 100, 100), 0.0)
+
+
+class TestClientTokenCapture(unittest.TestCase):
+    def test_claude_usage_includes_input_and_cache(self):
+        client = LLMClient(provider="claude", model="claude-3-5-sonnet-20241022")
+        client._client = MagicMock()
+        client._client.messages.create.return_value = SimpleNamespace(
+            content=[SimpleNamespace(text="hi")],
+            stop_reason="end_turn",
+            usage=SimpleNamespace(
+                input_tokens=20, output_tokens=5,
+                cache_read_input_tokens=80, cache_creation_input_tokens=0
+            ),
+        )
+        with patch("core.llm_client.usage_ledger", UsageLedger(sinks=[])) as ledger:
+            response = client.generate("hello", temperature=0.0)
+            self.assertEqual(response.input_tokens, 100)
+            self.assertEqual(response.cached_tokens, 80)
+            self.assertEqual(response.tokens_used, 105)
+            self.assertEqual(ledger.summary()[0]["output_tokens"], 5)
+
+    def test_gemini_stream_usage_from_last_chunk(self):
+        client = LLMClient(provider="gemini", model="gemini-1.5-flash")
+        client._client = MagicMock()
+        meta = SimpleNamespace(prompt_token_count=12, candidates_token_count=3, cached_content_token_count=0)
+        client._client.generate_content.return_value = [
+            SimpleNamespace(text="a", usage_metadata=None),
+            SimpleNamespace(text="b", usage_metadata=meta),
+        ]
+        with patch("core.llm_client.usage_ledger", UsageLedger(sinks=[])) as ledger:
+            self.assertEqual("".join(client.stream("hello")), "ab")
+            self.assertEqual(ledger.summary()[0]["input_tokens"], 12)
+
+
+class TestUsageAPI(unittest.TestCase):
+    def test_summary_endpoint(self):
+        ledger = UsageLedger(sinks=[])
+        ledger.record(UsageRecord("gemini", "gemini-1.5-flash", 10, 5, route="POST /chat/stream"))
+        with patch("api.routes.usage.usage_ledger", ledger):
+            response = TestClient(app).get("/usage/summary", params={"route": "POST /chat/stream"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["total_tokens"], 15)
+
+    def test_usage_route_uses_the_route_template(self):
+        with patch("api.main.set_usage_route") as set_route:
+            TestClient(app).get("/usage/correlation/abc123")
+            TestClient(app).get("/no/such/path")
+        self.assertEqual(
+            [c.args[0] for c in set_route.call_args_list],
+            # Middleware default, refined once routed; a 404 never gets past the default
+            ["GET unmatched", "GET /usage/correlation/{correlation_id}", "GET unmatched"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
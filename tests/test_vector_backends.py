@@ -0,0 +1,172 @@
+"""
+Unit tests for the pluggable vector backends.
+"""
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from core.embeddings import EmbeddingModel
+from core import vector_backends
+from core.rag_engine import VectorStore
+from core.vector_backends import IVFBackend, NumpyBackend, matches_where
+
+
+def clustered(n: int, dim: int = 32, clusters: int = 16, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    return (centers[rng.integers(0, clusters, n)] + 0.3 * rng.normal(size=(n, dim))).astype(np.float32)
+
+
+def fill(backend, vectors: np.ndarray) -> None:
+    ids = [f"id{i}" for i in range(len(vectors))]
+    metas = [{"source": f"s{i % 3}", "page": i} for i in range(len(vectors))]
+    backend.add(ids, [f"doc {i}" for i in ids], vectors, metas)
+
+
+class TestWhereMatcher(unittest.TestCase):
+    def test_operators(self):
+        meta = {"source": "a.pdf", "page": 3}
+        self.assertTrue(matches_where(meta, {"source": "a.pdf"}))
+        self.assertTrue(matches_where(meta, {"page": {"$gte": 3, "$lt": 5}}))
+        self.assertTrue(matches_where(meta, {"$or": [{"source": "b"}, {"page": {"$in": [1, 3]}}]}))
+        self.assertFalse(matches_where(meta, {"$and": [{"source": "a.pdf"}, {"page": {"$ne": 3}}]}))
+        self.assertFalse(matches_where(meta, {"missing": {"$gt": 1}}))
+
+
+class TestNumpyBackend(unittest.TestCase):
+    def test_exact_search_filters_and_persistence(self):
+        vectors = clustered(200)
+        with tempfile.TemporaryDirectory() as tmp:
+            backend = NumpyBackend(tmp)
+            fill(backend, vectors)
+            fill(backend, vectors[:5])  # existing ids are skipped
+            self.assertEqual(backend.count(), 200)
+
+            result = backend.query(vectors[7:8], n_results=3)
+            self.assertEqual(result["ids"][0][0], "id7")
+            self.assertAlmostEqual(result["distances"][0][0], 0.0, places=5)
+
+            filtered = backend.query(vectors[7:8], n_results=5, where={"source": "s0"})
+            self.assertTrue(all(m["source"] == "s0" for m in filtered["metadatas"][0]))
+
+            reopened = NumpyBackend(tmp)
+            self.assertEqual(reopened.get(ids=["id3"])["documents"], ["doc id3"])
+            self.assertEqual(reopened.query(vectors[7:8], 1)["ids"], [["id7"]])
+
+            reopened.delete(["id7", "id8", "missing"])
+            self.assertEqual(reopened.count(), 198)
+            self.assertNotIn("id7", reopened.query(vectors[7:8], 5)["ids"][0])
+            self.assertEqual(NumpyBackend(tmp).query(vectors[9:10], 1)["ids"], [["id9"]])
+
+            reopened.clear()
+            self.assertEqual(NumpyBackend(tmp).count(), 0)
+
+    def test_instances_sharing_a_directory_stay_aligned(self):
+        vectors = clustered(30)
+        with tempfile.TemporaryDirectory() as tmp:
+            a, b = NumpyBackend(tmp), NumpyBackend(tmp)
+            a.add(["x0"], ["doc x0"], vectors[0:1], [{}])
+            b.add(["x1", "x0"], ["doc x1", "doc x0"], vectors[1:3], [{}, {}])  # x0 is already stored
+            a.add(["x2"], ["doc x2"], vectors[2:3], [{}])
+            for backend in (a, b):
+                self.assertEqual(backend.count(), 3)
+                for i in range(3):
+                    hit = backend.query(vectors[i:i + 1], 1)
+                    self.assertEqual(hit["ids"], [[f"x{i}"]])
+                    self.assertAlmostEqual(hit["distances"][0][0], 0.0, places=5)
+
+            # A compaction by one instance is picked up by the other
+            b.delete(["x1"])
+            self.assertEqual(a.get()["ids"], ["x0", "x2"])
+            self.assertEqual(a.query(vectors[2:3], 1)["ids"], [["x2"]])
+
+
+class TestIVFBackend(unittest.TestCase):
+    def recall(self, backend: IVFBackend, exact: NumpyBackend, queries: np.ndarray, k: int = 10) -> float:
+        hits = 0
+        approx = backend.query(queries, k)["ids"]
+        truth = exact.query(queries, k)["ids"]
+        for a, t in zip(approx, truth):
+            hits += len(set(a) & set(t))
+        return hits / (k * len(queries))
+
+    def test_recall_with_and_without_pq(self):
+        vectors, queries = clustered(3000), clustered(20, seed=1)
+        with tempfile.TemporaryDirectory() as tmp:
+            exact = NumpyBackend(f"{tmp}/exact")
+            fill(exact, vectors)
+            # PQ scores are compressed approximations, so the bar is lower
+            for pq, floor in ((0, 0.95), (8, 0.8)):
+                ivf = IVFBackend(f"{tmp}/ivf{pq}", n_lists=32, n_probe=8, pq_subvectors=pq, min_train_size=500)
+                fill(ivf, vectors)
+                self.assertTrue(ivf.wait_for_training(timeout=30))
+                self.assertGreaterEqual(self.recall(ivf, exact, queries), floor)
+                self.assertTrue(ivf.trained)
+
+    def test_incremental_adds_after_training_survive_reload(self):
+        vectors = clustered(1200)
+        with tempfile.TemporaryDirectory() as tmp:
+            ivf = IVFBackend(tmp, n_lists=8, n_probe=8, min_train_size=500)
+            fill(ivf, vectors[:1000])
+            ivf.wait_for_training(timeout=30)
+            ivf.add(["new"], ["new doc"], vectors[1100:1101] * 5, [{"source": "x"}])
+
+            reopened = IVFBackend(tmp, n_lists=8, n_probe=8, min_train_size=500)
+            self.assertTrue(reopened.trained)
+            self.assertEqual(reopened.query(vectors[1100:1101], 1)["ids"], [["new"]])
+
+            reopened.delete(["new", "id3"])
+            self.assertEqual(reopened.query(vectors[5:6], 1)["ids"], [["id5"]])
+            self.assertNotIn("id3", reopened.query(vectors[3:4], 3)["ids"][0])
+
+    def test_training_runs_off_the_query_path(self):
+        vectors = clustered(600)
+        release = threading.Event()
+        real_kmeans = vector_backends._kmeans
+
+        def slow_kmeans(*args, **kwargs):
+            release.wait(timeout=30)
+            return real_kmeans(*args, **kwargs)
+
+        with tempfile.TemporaryDirectory() as tmp, patch("core.vector_backends._kmeans", slow_kmeans):
+            ivf = IVFBackend(tmp, n_lists=8, n_probe=2, min_train_size=500, background=True)
+            fill(ivf, vectors)
+            # k-means is still blocked: queries are answered exactly, without waiting
+            self.assertFalse(ivf.trained)
+            self.assertEqual(ivf.query(vectors[42:43], 1)["ids"], [["id42"]])
+            self.assertFalse(ivf.wait_for_training(timeout=0.01))
+
+            release.set()
+            self.assertTrue(ivf.wait_for_training(timeout=30))
+            self.assertTrue(ivf.trained)
+            self.assertEqual(ivf.trained_count, 600)
+
+    def test_instances_adopt_each_others_training(self):
+        vectors = clustered(700)
+        with tempfile.TemporaryDirectory() as tmp:
+            a = IVFBackend(tmp, n_lists=8, n_probe=8, min_train_size=500, background=False)
+            b = IVFBackend(tmp, n_lists=8, n_probe=8, min_train_size=500, background=False)
+            fill(a, vectors[:600])
+            self.assertTrue(a.trained)
+            b.add(["late"], ["late doc"], vectors[650:651] * 3, [{}])
+            self.assertTrue(b.trained)
+            self.assertEqual(a.query(vectors[650:651], 1)["ids"], [["late"]])
+            self.assertEqual(b.query(vectors[5:6], 1)["ids"], [["id5"]])
+
+
+class TestVectorStoreBackends(unittest.TestCase):
+    def test_numpy_backend_search_modes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = VectorStore("np", EmbeddingModel(provider="local"), persist_directory=tmp, backend="numpy")
+            store.add_texts(["revenue grew strongly", "the cat sat"], [{"source": "a"}, {"source": "b"}])
+            self.assertEqual(store.search("revenue growth", n_results=1)[0].source, "a")
+            self.assertEqual(store.search("cat", n_results=1, mode="hybrid")[0].source, "b")
+            with self.assertRaises(ValueError):
+                VectorStore("bad", EmbeddingModel(provider="local"), persist_directory=tmp, backend="faiss")
+
+
+if __name__ == "__main__":
+    unittest.main()